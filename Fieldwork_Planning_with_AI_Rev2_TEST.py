@@ -7,15 +7,41 @@ Created on Thu Jun 11 15:55:25 2026
 
 # fieldwork_planner_app_updated.py
 
+import hashlib
 import json
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, date
 from io import BytesIO
 
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import streamlit as st
 
+from fieldwork_scheduling import (
+    SimulationModel,
+    backward_pass,
+    distance_matrix,
+    downstream_mask,
+    find_cycle,
+    grid_clusters,
+    kmeans_clusters,
+    optimise_route,
+    parse_dependencies,
+    reschedule_downstream,
+    resource_constrained_schedule,
+    route_length,
+    simulate_schedule,
+    simulate_schedule_chunk,
+    topological_levels,
+    working_calendar,
+    working_day_dates,
+    working_day_numbers,
+)
+
 # Optional mapping dependencies:
 # pip install pyproj folium streamlit-folium
 try:
@@ -52,7 +78,7 @@ def default_subcontractors():
 
 def default_subcontractor_rates():
     return pd.DataFrame([
-        {"Subcontractor_ID": "DRILLER01", "Subcontractor_Name": "Example Drilling Contractor", "Subcontractor_Type": "Driller", "Item": "Drilling", "Unit": "m", "Production_per_day": 20.0, "Daily_Rate": 2500.0, "Unit_Rate": 0.0, "Rate_Type": "Daily", "Notes": "Used for borehole drilling duration/cost."},
+        {"Subcontractor_ID": "DRILLER01", "Subcontractor_Name": "Example Drilling Contractor", "Subcontractor_Type": "Driller", "Item": "Drilling", "Unit": "m", "Production_per_day": 20.0, "Production_min": 10.0, "Production_max": 30.0, "Daily_Rate": 2500.0, "Unit_Rate": 0.0, "Rate_Type": "Daily", "Notes": "Used for borehole drilling duration/cost."},
         {"Subcontractor_ID": "DRILLER01", "Subcontractor_Name": "Example Drilling Contractor", "Subcontractor_Type": "Driller", "Item": "Traffic Control", "Unit": "day", "Production_per_day": 1.0, "Daily_Rate": 1500.0, "Unit_Rate": 0.0, "Rate_Type": "Daily", "Notes": "Example traffic control allowance."},
         {"Subcontractor_ID": "LAB01", "Subcontractor_Name": "Example Laboratory", "Subcontractor_Type": "Laboratory", "Item": "Moisture Content (AS 1289.2.1.1)", "Unit": "test", "Production_per_day": 0.0, "Daily_Rate": 0.0, "Unit_Rate": 25.0, "Rate_Type": "Unit", "Notes": "Example lab test rate."},
     ])
@@ -248,6 +274,7 @@ def normalize_tasks_df(df: pd.DataFrame) -> pd.DataFrame:
         "Easting": 0.0,
         "Northing": 0.0,
         "Access_Notes": "",
+        "Work_Package": "",
     }
 
     df = df.copy()
@@ -266,7 +293,7 @@ def normalize_tasks_df(df: pd.DataFrame) -> pd.DataFrame:
     if "Estimated_Cost" in df.columns:
         df["Estimated_Cost"] = pd.to_numeric(df["Estimated_Cost"], errors="coerce").fillna(0.0)
 
-    for col in ["Task_ID", "Task_Type", "Location_ID", "Investigation_Type", "Depends_On", "Assigned_Subcontractor", "Rate_Item", "Bar_Color", "Access_Notes"]:
+    for col in ["Task_ID", "Task_Type", "Location_ID", "Investigation_Type", "Depends_On", "Assigned_Subcontractor", "Rate_Item", "Bar_Color", "Access_Notes", "Work_Package"]:
         df[col] = df[col].fillna("").astype(str)
 
     # Do not force Task_Type here because production items are user-editable in the rates table.
@@ -288,6 +315,8 @@ def normalize_rates_df(df: pd.DataFrame) -> pd.DataFrame:
         "Item": "",
         "Unit": "day",
         "Production_per_day": 1.0,
+        "Production_min": 0.0,
+        "Production_max": 0.0,
         "Daily_Rate": 0.0,
     }
 
@@ -297,8 +326,8 @@ def normalize_rates_df(df: pd.DataFrame) -> pd.DataFrame:
 
     df["Item"] = df["Item"].fillna("").astype(str)
     df["Unit"] = df["Unit"].fillna("").astype(str)
-    df["Production_per_day"] = pd.to_numeric(df["Production_per_day"], errors="coerce").fillna(0.0)
-    df["Daily_Rate"] = pd.to_numeric(df["Daily_Rate"], errors="coerce").fillna(0.0)
+    for col in ["Production_per_day", "Production_min", "Production_max", "Daily_Rate"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0.0)
 
     ordered_cols = list(required_defaults.keys())
     extra_cols = [c for c in df.columns if c not in ordered_cols]
@@ -381,6 +410,8 @@ def normalize_subcontractor_rates_df(df: pd.DataFrame) -> pd.DataFrame:
         "Item": "",
         "Unit": "day",
         "Production_per_day": 0.0,
+        "Production_min": 0.0,
+        "Production_max": 0.0,
         "Daily_Rate": 0.0,
         "Unit_Rate": 0.0,
         "Rate_Type": "Daily",
@@ -392,7 +423,7 @@ def normalize_subcontractor_rates_df(df: pd.DataFrame) -> pd.DataFrame:
 
     for col in ["Subcontractor_ID", "Subcontractor_Name", "Subcontractor_Type", "Item", "Unit", "Rate_Type", "Notes"]:
         df[col] = df[col].fillna("").astype(str)
-    for col in ["Production_per_day", "Daily_Rate", "Unit_Rate"]:
+    for col in ["Production_per_day", "Production_min", "Production_max", "Daily_Rate", "Unit_Rate"]:
         df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0.0)
 
     df.loc[~df["Rate_Type"].isin(["Daily", "Unit", "Allowance"]), "Rate_Type"] = "Daily"
@@ -407,10 +438,13 @@ def sync_rates_from_subcontractor_rates(subcontractor_rates_df: pd.DataFrame) ->
     production = rates[rates["Production_per_day"] > 0].copy()
     if production.empty:
         return default_rates()
+    # 0 means "not given", so it must not win the min/max across subcontractors
+    for col in ["Production_min", "Production_max"]:
+        production[col] = production[col].where(production[col] > 0)
 
     grouped = (
         production.groupby(["Item", "Unit"], dropna=False)
-        .agg({"Production_per_day": "max", "Daily_Rate": "mean"})
+        .agg({"Production_per_day": "max", "Production_min": "min", "Production_max": "max", "Daily_Rate": "mean"})
         .reset_index()
     )
     return normalize_rates_df(grouped)
@@ -722,6 +756,9 @@ def _easter_sunday(year: int) -> date:
     return date(year, month, day)
 
 
+EASTER_SUNDAYS = {year: _easter_sunday(year) for year in range(2000, 2101)}
+
+
 def fallback_au_public_holidays(year: int, state_code: str) -> dict:
     """
     Built-in fallback holidays so the chart still shades public holidays even
@@ -732,7 +769,7 @@ def fallback_au_public_holidays(year: int, state_code: str) -> dict:
     `holidays` package or enter custom holidays manually.
     """
     state_code = (state_code or "VIC").upper()
-    easter = _easter_sunday(year)
+    easter = EASTER_SUNDAYS.get(year) or _easter_sunday(year)
 
     h = {
         _observed_date(date(year, 1, 1)): "New Year's Day",
@@ -805,162 +842,699 @@ def parse_custom_holidays(custom_holidays_text: str) -> dict:
     return holidays_dict
 
 
-def get_public_holidays(start_date, finish_date, state_code: str, custom_holidays_text: str) -> dict:
-    """Return public holidays as {date: name}."""
-    chart_start = pd.to_datetime(start_date).date()
-    chart_finish = pd.to_datetime(finish_date).date()
-    year_list = list(range(chart_start.year, chart_finish.year + 1))
+# Holiday calendars per (source, state, year), kept on disk so a restarted
+# server starts warm. The file lives in the user cache directory unless
+# FIELDWORK_HOLIDAY_CACHE names another path; delete it to rebuild.
+HOLIDAY_CACHE_PATH = os.getenv("FIELDWORK_HOLIDAY_CACHE") or os.path.join(
+    os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "fieldwork_planning",
+    "holiday_cache.json",
+)
+HOLIDAY_CACHE_MAX_ENTRIES = 256  # state-years kept on disk
+HOLIDAY_ARRAYS_MAX_ENTRIES = 64  # state-years and custom lists kept in memory, least recently used dropped first
+_HOLIDAY_CACHE = None  # {key: {"dates": [iso dates], "names": [...]}}, loaded on first use
+_HOLIDAY_ARRAYS = OrderedDict()  # key -> (sorted datetime64[D] dates, names)
+_HOLIDAY_CACHE_LOCK = threading.Lock()
+
+
+def _holiday_source() -> str:
+    """Which holiday list is used, so installing/upgrading `holidays` invalidates old entries."""
+    try:
+        import holidays  # optional dependency: pip install holidays
+    except ImportError:
+        return "fallback"
+    return f"holidays-{getattr(holidays, '__version__', '')}"
+
+
+def _load_holiday_cache() -> dict:
+    try:
+        with open(HOLIDAY_CACHE_PATH, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
 
+def _save_holiday_cache(cache: dict) -> None:
+    tmp_path = HOLIDAY_CACHE_PATH + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(HOLIDAY_CACHE_PATH) or ".", exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, HOLIDAY_CACHE_PATH)
+    except OSError:
+        pass  # read-only home: the cache just stays in memory
+
+
+def build_public_holidays(years: list[int], state_code: str) -> dict:
+    """Public holidays for whole years as {date: name}."""
     holidays_dict = {}
 
     try:
         import holidays  # optional dependency: pip install holidays
-        au_holidays = holidays.AU(subdiv=state_code, years=year_list)
+        au_holidays = holidays.AU(subdiv=state_code, years=years)
         for holiday_date, holiday_name in au_holidays.items():
             holidays_dict[holiday_date] = holiday_name
     except Exception:
         # Built-in fallback so red shading still works without installing holidays.
-        for y in year_list:
+        for y in years:
             holidays_dict.update(fallback_au_public_holidays(y, state_code))
 
-    # User-entered holidays override/add to the automatic list.
-    holidays_dict.update(parse_custom_holidays(custom_holidays_text))
+    return holidays_dict
+
 
-    return {
-        h_date: h_name
-        for h_date, h_name in holidays_dict.items()
-        if chart_start <= h_date <= chart_finish
-    }
+def _holiday_arrays(holidays_dict: dict) -> tuple[np.ndarray, np.ndarray]:
+    ordered = sorted(holidays_dict.items())
+    return (
+        np.array([d.isoformat() for d, _ in ordered], dtype="datetime64[D]"),
+        np.array([str(n) for _, n in ordered], dtype=object),
+    )
+
+
+def _cached_holiday_arrays(key: str, build) -> tuple[np.ndarray, np.ndarray]:
+    """In-memory LRU lookup of holiday arrays; build() makes them on a miss. Call with the lock held."""
+    arrays = _HOLIDAY_ARRAYS.get(key)
+    if arrays is None:
+        arrays = build()
+        _HOLIDAY_ARRAYS[key] = arrays
+        while len(_HOLIDAY_ARRAYS) > HOLIDAY_ARRAYS_MAX_ENTRIES:
+            _HOLIDAY_ARRAYS.popitem(last=False)
+    else:
+        _HOLIDAY_ARRAYS.move_to_end(key)
+    return arrays
+
+
+def _year_holidays(state_code: str, year: int) -> tuple[np.ndarray, np.ndarray]:
+    """Holidays of one state and year, from the disk cache when present. Call with the lock held."""
+    key = f"{_holiday_source()}|{state_code}|{year}"
+
+    def build():
+        global _HOLIDAY_CACHE
+        if _HOLIDAY_CACHE is None:
+            _HOLIDAY_CACHE = _load_holiday_cache()
+        entry = _HOLIDAY_CACHE.get(key)
+        if entry is None:
+            dates, names = _holiday_arrays(build_public_holidays([year], state_code))
+            _HOLIDAY_CACHE[key] = {"dates": [str(d) for d in dates], "names": names.tolist()}
+            while len(_HOLIDAY_CACHE) > HOLIDAY_CACHE_MAX_ENTRIES:
+                del _HOLIDAY_CACHE[next(iter(_HOLIDAY_CACHE))]
+            _save_holiday_cache(_HOLIDAY_CACHE)
+            return dates, names
+        return np.array(entry["dates"], dtype="datetime64[D]"), np.array(entry["names"], dtype=object)
+
+    return _cached_holiday_arrays(key, build)
+
+
+def holiday_calendar(start_date, finish_date, state_code: str, custom_holidays_text: str):
+    """
+    Public holidays from start_date to finish_date as sorted datetime64[D] dates
+    and their names, ready for working_calendar and the Gantt shading.
+    """
+    chart_start = np.datetime64(pd.to_datetime(start_date).date(), "D")
+    chart_finish = np.datetime64(pd.to_datetime(finish_date).date(), "D")
+    first_year = int(str(chart_start)[:4])
+    last_year = int(str(chart_finish)[:4])
+    custom_hash = hashlib.sha1((custom_holidays_text or "").encode("utf-8")).hexdigest()[:16]
+
+    with _HOLIDAY_CACHE_LOCK:
+        years = [_year_holidays(state_code, year) for year in range(first_year, last_year + 1)]
+        custom_dates, custom_names = _cached_holiday_arrays(
+            f"custom|{custom_hash}", lambda: _holiday_arrays(parse_custom_holidays(custom_holidays_text))
+        )
+
+    dates = np.concatenate([d for d, _ in years] + [np.array([], dtype="datetime64[D]")])
+    names = np.concatenate([n for _, n in years] + [np.array([], dtype=object)])
+    if len(custom_dates):
+        # User-entered holidays override/add to the automatic list.
+        keep = ~np.isin(dates, custom_dates)
+        dates = np.concatenate([dates[keep], custom_dates])
+        names = np.concatenate([names[keep], custom_names])
+    order = np.argsort(dates, kind="stable")
+    dates, names = dates[order], names[order]
+
+    lo = np.searchsorted(dates, chart_start, side="left")
+    hi = np.searchsorted(dates, chart_finish, side="right")
+    return dates[lo:hi], names[lo:hi]
+
+
+def get_public_holidays(start_date, finish_date, state_code: str, custom_holidays_text: str) -> dict:
+    """Return public holidays as {date: name}."""
+    dates, names = holiday_calendar(start_date, finish_date, state_code, custom_holidays_text)
+    return dict(zip(dates.astype(object), names))
 
 # --------------------------------------------------
 # Scheduling logic
 # --------------------------------------------------
 
-def is_working_day(current_date, work_weekends):
-    return True if work_weekends else current_date.weekday() < 5
+def scheduling_holidays(start_date, n_working_days, state_code, custom_holidays_text) -> np.ndarray:
+    """Public holidays (datetime64[D]) that can fall within a program of n working days from start_date."""
+    # Weekends and holiday runs fit well inside 2n + 14 calendar days
+    horizon = pd.to_datetime(start_date) + pd.Timedelta(days=2 * n_working_days + 14)
+    return holiday_calendar(start_date, horizon, state_code, custom_holidays_text)[0]
 
 
-def next_working_day(current_date, work_weekends):
-    while not is_working_day(current_date, work_weekends):
-        current_date += timedelta(days=1)
-    return current_date
+# Production rate per normalised item key, one entry per rates table version
+_PRODUCTION_INDEX_CACHE = {}
+_PRODUCTION_INDEX_LOCK = threading.Lock()
+MAX_REPORTED_ERRORS = 20
 
 
-def add_working_days(start_date, duration_days, work_weekends):
-    current = start_date
-    added = 0
+def normalized_item_key(values: pd.Series) -> pd.Series:
+    return values.fillna("").astype(str).str.strip().str.lower()
 
-    while added < duration_days:
-        if is_working_day(current, work_weekends):
-            added += 1
-        if added < duration_days:
-            current += timedelta(days=1)
 
-    return current
+PRODUCTION_COLUMNS = ["Production_per_day", "Production_min", "Production_max"]
 
 
-def estimate_task_duration(task, rates_df):
-    task_type = str(task.get("Task_Type", "")).strip()
-    manual_duration = float(task.get("Duration_days", 0) or 0)
+def production_index(rates_df: pd.DataFrame) -> pd.DataFrame:
+    """Production columns indexed by normalised item name (first row wins), cached per rates content."""
+    rates = rates_df.reindex(columns=["Item"] + PRODUCTION_COLUMNS)
+    key = int(pd.util.hash_pandas_object(rates.astype(str), index=False).sum())
+    with _PRODUCTION_INDEX_LOCK:
+        production = _PRODUCTION_INDEX_CACHE.get(key)
+        if production is None:
+            production = rates[PRODUCTION_COLUMNS].apply(pd.to_numeric, errors="coerce").fillna(0.0)
+            production.index = normalized_item_key(rates["Item"])
+            production = production[~production.index.duplicated()]
+            _PRODUCTION_INDEX_CACHE.clear()  # only the current rates table is worth keeping
+            _PRODUCTION_INDEX_CACHE[key] = production
+    return production
 
-    # If user specifies duration, use it directly.
-    if manual_duration > 0:
-        return max(1, int(round(manual_duration)))
 
-    # Non-production tasks, including "Fieldwork", must use a manual duration.
-    if task_type in NON_PRODUCTION_TASK_TYPES:
-        raise ValueError(
-            f"{task['Task_ID']}: Duration_days must be specified for non-production task type '{task_type}'."
-        )
+def estimate_task_durations(tasks: pd.DataFrame, rates_df: pd.DataFrame) -> np.ndarray:
+    """
+    Working days for every task in one vectorised pass.
 
-    # If duration is blank/0, Task_Type must match a production item.
-    depth = float(task.get("Depth_m", 0) or 0)
+    A manual Duration_days is used as entered (rounded, at least 1). Otherwise
+    the Task_Type must be a production item and the duration is Depth_m divided
+    by its Production_per_day, rounded up. All problems are reported together.
+    """
+    task_ids = tasks["Task_ID"].astype(str)
+    task_type = tasks["Task_Type"].fillna("").astype(str).str.strip()
+    manual = pd.to_numeric(tasks["Duration_days"], errors="coerce").fillna(0.0).to_numpy()
+    depth = pd.to_numeric(tasks["Depth_m"], errors="coerce").fillna(0.0).to_numpy()
+    production = normalized_item_key(task_type).map(production_index(rates_df)["Production_per_day"]).to_numpy(dtype=float)
+
+    auto = manual <= 0
+    non_production = auto & task_type.isin(NON_PRODUCTION_TASK_TYPES).to_numpy()
+    no_depth = auto & ~non_production & (depth <= 0)
+    unknown = auto & ~non_production & ~no_depth & np.isnan(production)
+    no_rate = auto & ~non_production & ~no_depth & ~unknown & (production <= 0)
+
+    errors = []
+    for mask, message in [
+        (non_production, "{id}: Duration_days must be specified for non-production task type '{type}'."),
+        (no_depth, "{id}: Depth_m must be greater than 0 when Duration_days is blank or 0."),
+        (unknown, "{id}: Task_Type '{type}' is not a production item. "
+                  "Either select a production item from Task_Type or enter Duration_days manually."),
+        (no_rate, "{id}: Production_per_day must be greater than 0."),
+    ]:
+        errors += [message.format(id=i, type=t) for i, t in zip(task_ids[mask], task_type[mask])]
+    if errors:
+        more = len(errors) - MAX_REPORTED_ERRORS
+        raise ValueError(" ".join(errors[:MAX_REPORTED_ERRORS]) + (f" ... and {more} more." if more > 0 else ""))
 
-    if depth <= 0:
-        raise ValueError(
-            f"{task['Task_ID']}: Depth_m must be greater than 0 when Duration_days is blank or 0."
-        )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # +0.499 then round: up to the next whole day, as the single-task estimate always did
+        computed = np.round(depth / production + 0.499)
+    durations = np.where(auto, computed, np.round(manual))
+    return np.maximum(1, durations).astype(np.int64)
 
-    match = rates_df[rates_df["Item"].astype(str).str.lower() == task_type.lower()]
 
-    if match.empty:
-        raise ValueError(
-            f"{task['Task_ID']}: Task_Type '{task_type}' is not a production item. "
-            "Either select a production item from Task_Type or enter Duration_days manually."
-        )
+# Task types done in the office; every other task needs field staff on site.
+OFFICE_TASK_TYPES = ["Preliminaries", "Laboratory Testing", "Reporting", "Other"]
+RESOURCE_POOLS = ["Field_Staff", "Field_Crew"]
 
-    production = float(match.iloc[0]["Production_per_day"])
 
-    if production <= 0:
-        raise ValueError(f"{task['Task_ID']}: Production_per_day must be greater than 0.")
+def task_resource_needs(tasks: pd.DataFrame, rates_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Resource pools each task occupies while it runs.
 
-    return max(1, int(round(depth / production + 0.499)))
+    Field tasks need one internal field staff member. Field tasks that are a
+    production item (e.g. Drilling) or have an assigned subcontractor also need
+    one external crew/rig.
+    """
+    field = ~tasks["Task_Type"].isin(OFFICE_TASK_TYPES)
+    production_items = set(rates_df["Item"].astype(str).str.strip().str.lower()) if rates_df is not None else set()
+    external = (
+        tasks["Task_Type"].str.strip().str.lower().isin(production_items)
+        | (tasks["Assigned_Subcontractor"].str.strip() != "")
+    )
+    return pd.DataFrame({"Field_Staff": field, "Field_Crew": field & external}, index=tasks.index)
 
 
-def generate_program(tasks_df, rates_df, start_date, work_weekends):
+def validated_tasks(tasks_df: pd.DataFrame) -> pd.DataFrame:
+    """Normalised task table with non-blank, unique Task_IDs (stripped)."""
     tasks = normalize_tasks_df(tasks_df)
+    tasks["Task_ID"] = tasks["Task_ID"].str.strip()
+    tasks["Depends_On"] = tasks["Depends_On"].str.strip()
+
+    if (tasks["Task_ID"] == "").any():
+        raise ValueError("Every task must have a Task_ID.")
+    duplicated = tasks["Task_ID"][tasks["Task_ID"].duplicated()]
+    if not duplicated.empty:
+        raise ValueError(f"Duplicate Task_ID found: {duplicated.iloc[0]}.")
+    return tasks
+
+
+def dependency_graph(task_ids: pd.Series, depends_on: pd.Series):
+    """Parsed Depends_On edges and their topological levels; raises on bad links or cycles."""
+    dependencies, errors = parse_dependencies(task_ids.tolist(), depends_on.tolist())
+    if errors:
+        raise ValueError(" ".join(errors))
+    levels = topological_levels(len(task_ids), dependencies)
+    if (levels < 0).any():
+        cycle = task_ids.iloc[find_cycle(levels, dependencies)]
+        raise ValueError(f"Circular Depends_On: {' -> '.join(cycle)}. Remove one of these dependencies.")
+    return dependencies, levels
+
+
+def program_calendar(start_date, work_weekends, n_working_days, holiday_state=None, custom_holidays_text=""):
+    """Business-day calendar covering a program of n working days."""
+    holidays = []
+    if holiday_state:
+        holidays = scheduling_holidays(start_date, n_working_days, holiday_state, custom_holidays_text)
+    return working_calendar(work_weekends, holidays)
+
+
+def resource_labels(units: np.ndarray) -> dict:
+    """Field_Staff/Field_Crew columns ("Staff 2", "Crew 1", "" when not needed) from unit numbers."""
+    labels = {}
+    for pool_index, (pool, label) in enumerate(zip(RESOURCE_POOLS, ["Staff", "Crew"])):
+        unit = units[:, pool_index]
+        labels[pool] = np.where(unit > 0, [f"{label} {u}" for u in unit], "")
+    return labels
+
+
+def generate_program(
+    tasks_df,
+    rates_df,
+    start_date,
+    work_weekends,
+    internal_resources=0,
+    external_resources=0,
+    holiday_state: str | None = None,
+    custom_holidays_text: str = "",
+):
+    """
+    Rule-based program from the task table.
+
+    Tasks are list-scheduled on the available internal field staff and external
+    crews (0 = not limited): a task starts once all its Depends_On links are met
+    (finish-to-start by default, or SS, with optional lags, e.g. "PRE01, BH01 SS+1")
+    and a unit of each resource it needs is free, ready tasks going in Order.
+    Total float is from a backward pass over the dependencies; zero-float tasks
+    form the critical path.
+    When holiday_state is given, that state's public holidays (plus any custom
+    holidays) are non-working days.
+    """
+    tasks = validated_tasks(tasks_df)
+    task_ids = tasks["Task_ID"]
+    durations = estimate_task_durations(tasks, rates_df)
+    dependencies, levels = dependency_graph(task_ids, tasks["Depends_On"])
+
+    needs = task_resource_needs(tasks, rates_df)
+    starts, units = resource_constrained_schedule(
+        durations,
+        dependencies,
+        needs[RESOURCE_POOLS].to_numpy(),
+        [int(internal_resources or 0), int(external_resources or 0)],
+        priority=tasks["Order"].to_numpy(),
+    )
+    _, total_float = backward_pass(durations, dependencies, levels, starts)
+
+    # Working-day numbers -> dates in one vectorised pass over the business-day calendar
+    finish_days = starts + durations - 1
+    calendar = program_calendar(start_date, work_weekends, int(finish_days.max()) + 1, holiday_state, custom_holidays_text)
+    start_dates = working_day_dates(start_date, starts, calendar)
+    finish_plot = working_day_dates(start_date, finish_days, calendar) + np.timedelta64(1, "D")
+
+    program = pd.DataFrame({
+        "Order": tasks["Order"].astype(int),
+        "Task_ID": task_ids,
+        "Task_Type": tasks["Task_Type"],
+        "Location_ID": tasks["Location_ID"],
+        "Investigation_Type": tasks["Investigation_Type"],
+        "Depth_m": tasks["Depth_m"],
+        "Duration_days": durations,
+        "Depends_On": tasks["Depends_On"],
+        "Assigned_Subcontractor": tasks["Assigned_Subcontractor"],
+        "Rate_Item": tasks["Rate_Item"],
+        "Start": start_dates.astype(object),
+        "Finish": finish_plot.astype(object),
+        "Bar_Color": tasks["Bar_Color"],
+        "Easting": tasks["Easting"],
+        "Northing": tasks["Northing"],
+        "Access_Notes": tasks["Access_Notes"],
+        "Work_Package": tasks["Work_Package"],
+    })
+    program["Total_Float_days"] = total_float
+    program["Critical"] = total_float <= 0
+    for pool, labels in resource_labels(units).items():
+        program[pool] = labels
+    return program
+
+
+# Task columns that move dates; the rest only change what the program displays
+SCHEDULE_COLUMNS = ["Order", "Task_Type", "Depth_m", "Duration_days", "Depends_On", "Assigned_Subcontractor"]
+PROGRAM_TASK_COLUMNS = [
+    "Order", "Task_ID", "Task_Type", "Location_ID", "Investigation_Type", "Depth_m", "Depends_On",
+    "Assigned_Subcontractor", "Rate_Item", "Bar_Color", "Easting", "Northing", "Access_Notes",
+    "Work_Package",
+]
 
-    scheduled = {}
-    rows = []
 
-    for _, task in tasks.iterrows():
-        task_id = str(task["Task_ID"]).strip()
-        depends_on = str(task.get("Depends_On", "")).strip()
+def reschedule_program(
+    program_df,
+    previous_tasks_df,
+    tasks_df,
+    rates_df,
+    start_date,
+    work_weekends,
+    internal_resources=0,
+    external_resources=0,
+    holiday_state: str | None = None,
+    custom_holidays_text: str = "",
+):
+    """
+    Incrementally update a program generated from previous_tasks_df after edits.
 
-        if not task_id:
-            raise ValueError("Every task must have a Task_ID.")
+    The edited task table is diffed against the previous one by Task_ID. Only
+    changed tasks get new durations, and only they and their downstream
+    dependants get new dates (with limited crews the fast list scheduler is
+    re-run instead, since freeing a crew can move unrelated tasks). Changed rows
+    are patched into a copy of the program.
 
-        if task_id in scheduled:
-            raise ValueError(f"Duplicate Task_ID found: {task_id}.")
+    Returns (program, Task_IDs with changed schedule or cost inputs, e.g. depth
+    or duration) or None when the edit adds, removes or renames tasks and the
+    program has to be regenerated in full.
+    """
+    tasks = validated_tasks(tasks_df)
+    previous = validated_tasks(previous_tasks_df)
+    if program_df is None or len(program_df) != len(tasks) or len(previous) != len(tasks):
+        return None
+    task_ids = tasks["Task_ID"]
+    previous = previous.set_index("Task_ID").reindex(task_ids)
+    program = program_df.set_index(program_df["Task_ID"].astype(str).str.strip()).reindex(task_ids)
+    if previous["Order"].isna().any() or program["Start"].isna().any():
+        return None
+    previous = previous.reset_index()
+    program = program.reset_index(drop=True)
+
+    edited = np.zeros(len(tasks), dtype=bool)
+    for col in PROGRAM_TASK_COLUMNS:
+        edited |= (tasks[col] != previous[col]).to_numpy()
+    changed = np.zeros(len(tasks), dtype=bool)
+    for col in SCHEDULE_COLUMNS:
+        changed |= (tasks[col] != previous[col]).to_numpy()
+    if not (edited | changed).any():
+        return program, []
+
+    # Durations are only re-estimated for the changed tasks
+    durations = program["Duration_days"].to_numpy(dtype=np.int64).copy()
+    durations[changed] = estimate_task_durations(tasks[changed], rates_df)
+    duration_changed = changed & (durations != program["Duration_days"].to_numpy(dtype=np.int64))
+
+    dependencies, levels = dependency_graph(task_ids, tasks["Depends_On"])
+    old_starts = working_day_numbers(
+        start_date,
+        pd.to_datetime(program["Start"]).to_numpy(),
+        program_calendar(start_date, work_weekends, len(pd.date_range(start_date, pd.to_datetime(program["Finish"]).max())),
+                         holiday_state, custom_holidays_text),
+    )
 
-        duration = estimate_task_duration(task, rates_df)
+    needs = task_resource_needs(tasks, rates_df)[RESOURCE_POOLS].to_numpy()
+    capacities = [int(internal_resources or 0), int(external_resources or 0)]
+    limited = any(capacity > 0 and needs[:, pool].any() for pool, capacity in enumerate(capacities))
+    units = None
+    if limited:
+        starts, units = resource_constrained_schedule(
+            durations, dependencies, needs, capacities, priority=tasks["Order"].to_numpy(),
+        )
+    else:
+        affected = downstream_mask(len(tasks), dependencies, np.flatnonzero(changed))
+        starts = reschedule_downstream(durations, dependencies, levels, old_starts, affected)
+    _, total_float = backward_pass(durations, dependencies, levels, starts)
+
+    moved = (starts != old_starts) | duration_changed
+    for col in PROGRAM_TASK_COLUMNS:
+        program.loc[edited, col] = tasks.loc[edited, col]
+    if moved.any():
+        finish_days = starts + durations - 1
+        calendar = program_calendar(start_date, work_weekends, int(finish_days.max()) + 1, holiday_state, custom_holidays_text)
+        program["Start"] = program["Start"].astype(object)
+        program["Finish"] = program["Finish"].astype(object)
+        program.loc[moved, "Start"] = working_day_dates(start_date, starts[moved], calendar).astype(object)
+        program.loc[moved, "Finish"] = (
+            working_day_dates(start_date, finish_days[moved], calendar) + np.timedelta64(1, "D")
+        ).astype(object)
+    program["Duration_days"] = durations
+    program["Total_Float_days"] = total_float
+    program["Critical"] = total_float <= 0
+    if units is not None:
+        for pool, labels in resource_labels(units).items():
+            program[pool] = labels
+    return program, task_ids[changed].tolist()
 
-        if depends_on and depends_on not in tasks["Task_ID"].astype(str).values:
-            raise ValueError(f"{task_id}: Depends_On references unknown Task_ID '{depends_on}'.")
 
-        if depends_on and depends_on in scheduled:
-            earliest_start = scheduled[depends_on]["Finish_Actual"] + timedelta(days=1)
-        elif depends_on and depends_on not in scheduled:
-            raise ValueError(
-                f"{task_id}: Depends_On '{depends_on}' has not been scheduled yet. "
-                f"Move the dependent task below its prerequisite task."
-            )
-        else:
-            earliest_start = start_date
+# --------------------------------------------------
+# Schedule risk (Monte Carlo)
+# --------------------------------------------------
 
-        # Independent tasks start on the project start date.
-        # Only tasks with Depends_On are delayed by their prerequisite.
-        current_start = next_working_day(earliest_start, work_weekends)
+RISK_PERCENTILES = [50, 80, 90]
 
-        finish_actual = add_working_days(current_start, duration, work_weekends)
-        finish_plot = finish_actual + timedelta(days=1)
 
-        scheduled[task_id] = {
-            "Start": current_start,
-            "Finish_Actual": finish_actual,
-            "Finish_Plot": finish_plot,
-        }
+def task_daily_costs(cost_df: pd.DataFrame, task_ids: pd.Series) -> np.ndarray:
+    """Time-related (daily-rate) cost per working day of each task, from the program cost table."""
+    if cost_df is None or cost_df.empty:
+        return np.zeros(len(task_ids))
+    daily = cost_df[
+        (cost_df["Cost_Type"] == "Task Cost Item")
+        & ((cost_df["Rate_Type"] == "Daily") | cost_df["Unit"].astype(str).str.strip().str.lower().isin(["day", "days"]))
+    ]
+    per_task = pd.to_numeric(daily["Rate"], errors="coerce").fillna(0.0).groupby(daily["Task_ID"].astype(str).str.strip()).sum()
+    return task_ids.map(per_task).fillna(0.0).to_numpy()
+
+
+def schedule_risk_model(tasks_df, rates_df, cost_df, internal_resources=0, external_resources=0,
+                        manual_spread=(0.9, 1.25)) -> SimulationModel:
+    """
+    Monte Carlo inputs for the task table.
 
+    Production tasks sample their production per day from a triangular
+    Production_min / Production_per_day / Production_max distribution (0 = no
+    variation). Manual durations are scaled by a factor between the
+    manual_spread best and worst cases.
+    """
+    tasks = validated_tasks(tasks_df)
+    durations = estimate_task_durations(tasks, rates_df)
+    dependencies, levels = dependency_graph(tasks["Task_ID"], tasks["Depends_On"])
+
+    manual = pd.to_numeric(tasks["Duration_days"], errors="coerce").fillna(0.0).to_numpy() > 0
+    ranges = production_index(rates_df).reindex(normalized_item_key(tasks["Task_Type"]))
+    mode = ranges["Production_per_day"].to_numpy()
+    low = np.where(ranges["Production_min"].to_numpy() > 0, ranges["Production_min"].to_numpy(), mode)
+    high = np.where(ranges["Production_max"].to_numpy() > 0, ranges["Production_max"].to_numpy(), mode)
+
+    # Manual tasks: work is the entered duration and the "rate" a productivity factor around 1
+    best, worst = manual_spread
+    depth = tasks["Depth_m"].to_numpy(dtype=float)
+    needs = task_resource_needs(tasks, rates_df)[RESOURCE_POOLS].to_numpy()
+    return SimulationModel(
+        work=np.where(manual, durations, depth).astype(float),
+        rate_low=np.where(manual, 1 / worst, low),
+        rate_mode=np.where(manual, 1.0, mode),
+        rate_high=np.where(manual, 1 / best, high),
+        dependencies=dependencies,
+        levels=levels,
+        resource_needs=needs,
+        capacities=[int(internal_resources or 0), int(external_resources or 0)],
+        priority=tasks["Order"].to_numpy(),
+        daily_cost=task_daily_costs(cost_df, tasks["Task_ID"]),
+    )
+
+
+def schedule_risk(tasks_df, rates_df, cost_df, settings: dict, n_runs=1000, manual_spread=(0.9, 1.25),
+                  workers=None, seed=None) -> tuple[pd.DataFrame, pd.Series]:
+    """
+    Simulate n_runs programs on a process pool and summarise the finish date
+    and cost at each of RISK_PERCENTILES next to the deterministic program.
+
+    settings are the generate_program keyword arguments (see program_settings).
+    Returns the summary table and the simulated finish dates.
+    """
+    model = schedule_risk_model(
+        tasks_df, rates_df, cost_df, settings["internal_resources"], settings["external_resources"], manual_spread,
+    )
+    finish_days, extra_cost = simulate_schedule(model, int(n_runs), workers=workers, seed=seed)
+    base_finish, base_extra = simulate_schedule_chunk(model._replace(rate_low=model.rate_mode, rate_high=model.rate_mode), 1, seed)
+    base_cost = float(cost_df["Total_Cost"].sum()) if cost_df is not None and not cost_df.empty else 0.0
+    costs = base_cost + extra_cost
+
+    # Finish day n is the exclusive end, so the last working day is n - 1
+    start_date = settings["start_date"]
+    calendar = program_calendar(start_date, settings["work_weekends"], int(finish_days.max()),
+                                settings["holiday_state"], settings["custom_holidays_text"])
+    finish_dates = pd.Series(pd.to_datetime(working_day_dates(start_date, finish_days - 1, calendar)), name="Finish")
+
+    rows = [{
+        "Scenario": "Deterministic",
+        "Finish": working_day_dates(start_date, base_finish - 1, calendar)[0].astype(object),
+        "Working_Days": int(base_finish[0]),
+        "Total_Cost": base_cost + float(base_extra[0]),
+    }]
+    for pct in RISK_PERCENTILES:
+        days = int(np.ceil(np.percentile(finish_days, pct)))
+        rows.append({
+            "Scenario": f"P{pct}",
+            "Finish": working_day_dates(start_date, days - 1, calendar).astype(object),
+            "Working_Days": days,
+            "Total_Cost": float(np.percentile(costs, pct)),
+        })
+    return pd.DataFrame(rows), finish_dates
+
+
+# --------------------------------------------------
+# Scenario comparison
+# --------------------------------------------------
+
+SCENARIO_INPUTS = ["tasks_df", "rates_df", "subcontractor_rates_df", "soil_lab_df", "rock_lab_df", "task_cost_items_df"]
+SCENARIO_COLUMNS = ["Scenario", "Start", "Finish", "Calendar_Days", "Total_Cost", "Finish_vs_Base_days", "Cost_vs_Base"]
+
+
+def base_scenario(settings: dict, **inputs) -> dict:
+    """Scenario dict: name, generate_program settings and the SCENARIO_INPUTS tables."""
+    return {"name": "Base", "settings": settings, **{name: inputs[name] for name in SCENARIO_INPUTS}}
+
+
+def assign_subcontractor(tasks_df, task_cost_items_df, subcontractor_rates_df, subcontractor: str):
+    """
+    Tasks and cost items with subcontracted work moved to another subcontractor.
+
+    Tasks with an assigned subcontractor, and cost items whose rate item the new
+    subcontractor prices, are reassigned; the items' rates are cleared so
+    calculate_task_cost_items looks them up in the new subcontractor's schedule.
+    """
+    tasks = tasks_df.copy()
+    tasks.loc[tasks["Assigned_Subcontractor"].str.strip() != "", "Assigned_Subcontractor"] = subcontractor
+    rates = normalize_subcontractor_rates_df(subcontractor_rates_df)
+    priced = set(normalized_item_key(rates.loc[rates["Subcontractor_Name"].astype(str).str.strip() == subcontractor, "Item"]))
+    items = normalize_task_cost_items_df(task_cost_items_df)
+    moved = normalized_item_key(items["Rate_Item"]).isin(priced)
+    items.loc[moved, ["Subcontractor_ID", "Subcontractor_Type", "Unit", "Rate_Type"]] = ""
+    items.loc[moved, "Subcontractor_Name"] = subcontractor
+    items.loc[moved, "Rate"] = 0.0
+    return tasks, items
+
+
+def scenario_variant(base: dict, name: str, work_weekends=None, internal_resources=None,
+                     external_resources=None, subcontractor: str = "") -> dict:
+    """
+    A scenario that differs from base only in the given settings (None/"" =
+    as base). Unchanged tables are the base's own objects, not copies.
+    """
+    scenario = dict(base, name=name)
+    overrides = {
+        "work_weekends": work_weekends,
+        "internal_resources": internal_resources,
+        "external_resources": external_resources,
+    }
+    overrides = {key: value for key, value in overrides.items() if value is not None}
+    if overrides:
+        scenario["settings"] = {**base["settings"], **overrides}
+    if subcontractor:
+        scenario["tasks_df"], scenario["task_cost_items_df"] = assign_subcontractor(
+            base["tasks_df"], base["task_cost_items_df"], base["subcontractor_rates_df"], subcontractor
+        )
+    return scenario
+
+
+def run_scenario(scenario: dict) -> dict:
+    """generate_program + estimate_program_cost for one scenario (no session state, so thread-safe)."""
+    program_df = generate_program(scenario["tasks_df"], scenario["rates_df"], **scenario["settings"])
+    cost_df, cost_summary_df = estimate_program_cost(
+        program_df,
+        scenario["rates_df"],
+        scenario["soil_lab_df"],
+        scenario["rock_lab_df"],
+        scenario["task_cost_items_df"],
+        scenario["subcontractor_rates_df"],
+    )
+    return {"program_df": program_df, "cost_df": cost_df, "cost_summary_df": cost_summary_df}
+
+
+def run_scenarios(scenarios: list[dict], workers=None) -> dict:
+    """
+    Run the scenarios on a thread pool. Returns {name: result}, the result
+    being run_scenario's tables or {"error": message} for an invalid scenario.
+    """
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {scenario["name"]: pool.submit(run_scenario, scenario) for scenario in scenarios}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except ValueError as e:
+                results[name] = {"error": str(e)}
+    return results
+
+
+def compare_scenarios(results: dict, base_name: str = "Base") -> pd.DataFrame:
+    """Finish date and total cost of each scenario side by side, with the change from the base."""
+    rows = []
+    for name, result in results.items():
+        if "error" in result:
+            rows.append({"Scenario": f"{name} (error: {result['error']})"})
+            continue
+        program = result["program_df"]
+        start = pd.to_datetime(program["Start"]).min()
+        finish = pd.to_datetime(program["Finish"]).max() - pd.Timedelta(days=1)  # Finish is the exclusive bar end
         rows.append({
-            "Order": int(task["Order"]),
-            "Task_ID": task_id,
-            "Task_Type": task["Task_Type"],
-            "Location_ID": task["Location_ID"],
-            "Investigation_Type": task["Investigation_Type"],
-            "Depth_m": task["Depth_m"],
-            "Duration_days": duration,
-            "Depends_On": depends_on,
-            "Assigned_Subcontractor": task.get("Assigned_Subcontractor", ""),
-            "Rate_Item": task.get("Rate_Item", ""),
-            "Start": current_start,
-            "Finish": finish_plot,
-            "Bar_Color": task.get("Bar_Color", "blue"),
-            "Easting": task.get("Easting", 0.0),
-            "Northing": task.get("Northing", 0.0),
-            "Access_Notes": task["Access_Notes"],
+            "Scenario": name,
+            "Start": start.date(),
+            "Finish": finish.date(),
+            "Calendar_Days": (finish - start).days + 1,
+            "Total_Cost": float(result["cost_df"]["Total_Cost"].sum()) if not result["cost_df"].empty else 0.0,
         })
 
-    return pd.DataFrame(rows)
+    comparison = pd.DataFrame(rows, columns=SCENARIO_COLUMNS)
+    base = comparison[comparison["Scenario"] == base_name]
+    if not base.empty:
+        comparison["Finish_vs_Base_days"] = (
+            pd.to_datetime(comparison["Finish"]) - pd.to_datetime(base["Finish"].iloc[0])
+        ).dt.days
+        comparison["Cost_vs_Base"] = comparison["Total_Cost"] - base["Total_Cost"].iloc[0]
+    return comparison
+
+
+def default_scenarios() -> pd.DataFrame:
+    return pd.DataFrame([
+        {"Scenario": "Weekend work", "Work_Weekends": "Yes", "Internal_Resources": None, "External_Resources": None, "Subcontractor": ""},
+        {"Scenario": "3 rigs", "Work_Weekends": "", "Internal_Resources": None, "External_Resources": 3, "Subcontractor": ""},
+    ])
+
+
+def scenarios_from_table(base: dict, scenarios_df: pd.DataFrame) -> list[dict]:
+    """Base scenario plus one variant per named row of the scenario table (blank cells = as base)."""
+    def optional_int(value):
+        value = pd.to_numeric(value, errors="coerce")
+        return None if pd.isna(value) else int(value)
+
+    scenarios = [base]
+    for _, row in scenarios_df.iterrows():
+        name = str(row.get("Scenario", "") or "").strip()
+        if not name or name in [s["name"] for s in scenarios]:
+            continue
+        weekends = str(row.get("Work_Weekends", "") or "").strip()
+        scenarios.append(scenario_variant(
+            base,
+            name,
+            work_weekends={"Yes": True, "No": False}.get(weekends),
+            internal_resources=optional_int(row.get("Internal_Resources")),
+            external_resources=optional_int(row.get("External_Resources")),
+            subcontractor=str(row.get("Subcontractor", "") or "").strip(),
+        ))
+    return scenarios
 
 
 # --------------------------------------------------
@@ -975,23 +1549,8 @@ def dataframe_to_excel_bytes(dfs):
     return output.getvalue()
 
 
-def estimate_program_cost(
-    program_df: pd.DataFrame,
-    rates_df: pd.DataFrame,
-    soil_lab_df: pd.DataFrame,
-    rock_lab_df: pd.DataFrame,
-    task_cost_items_df: pd.DataFrame | None = None,
-) -> tuple[pd.DataFrame, pd.DataFrame]:
-    """Estimate cost from editable multi-item cost build-up plus selected lab tests."""
-    if task_cost_items_df is None:
-        task_cost_items_df = st.session_state.get("task_cost_items_df", pd.DataFrame())
-
-    cost_items = calculate_task_cost_items(
-        task_cost_items_df,
-        st.session_state.get("subcontractor_rates_df", pd.DataFrame()),
-        program_df,
-    )
-
+def task_cost_rows(cost_items: pd.DataFrame) -> list[dict]:
+    """Program cost rows for calculated task cost build-up items."""
     cost_rows = []
     for _, row in cost_items.iterrows():
         cost_rows.append({
@@ -1009,6 +1568,43 @@ def estimate_program_cost(
             "Total_Cost": float(row.get("Amount", 0.0) or 0.0),
             "Notes": row.get("Notes", ""),
         })
+    return cost_rows
+
+
+def summarize_program_cost(cost_df: pd.DataFrame, cost_items: pd.DataFrame) -> pd.DataFrame:
+    """Totals per cost type plus a subtotal per subcontractor for the task cost items."""
+    summary_df = (
+        cost_df.groupby("Cost_Type", dropna=False)["Total_Cost"]
+        .sum()
+        .reset_index()
+        .sort_values("Cost_Type")
+    ) if not cost_df.empty else pd.DataFrame(columns=["Cost_Type", "Total_Cost"])
+
+    # Also show subcontractor subtotal for task cost items.
+    if not cost_items.empty:
+        sub_summary = summarize_cost_items(cost_items)
+        if not sub_summary.empty:
+            summary_df = pd.concat([summary_df, sub_summary], ignore_index=True)
+    return summary_df
+
+
+def estimate_program_cost(
+    program_df: pd.DataFrame,
+    rates_df: pd.DataFrame,
+    soil_lab_df: pd.DataFrame,
+    rock_lab_df: pd.DataFrame,
+    task_cost_items_df: pd.DataFrame | None = None,
+    subcontractor_rates_df: pd.DataFrame | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Estimate cost from editable multi-item cost build-up plus selected lab tests."""
+    if task_cost_items_df is None:
+        task_cost_items_df = st.session_state.get("task_cost_items_df", pd.DataFrame())
+    if subcontractor_rates_df is None:
+        subcontractor_rates_df = st.session_state.get("subcontractor_rates_df", pd.DataFrame())
+
+    cost_items = calculate_task_cost_items(task_cost_items_df, subcontractor_rates_df, program_df)
+
+    cost_rows = task_cost_rows(cost_items)
 
     lab_rows = []
     for lab_type, lab_df in [("Soil Lab", soil_lab_df), ("Rock Lab", rock_lab_df)]:
@@ -1039,22 +1635,128 @@ def estimate_program_cost(
             "Item", "Quantity", "Unit", "Rate", "Rate_Type", "Total_Cost", "Notes"
         ])
 
-    summary_df = (
-        cost_df.groupby("Cost_Type", dropna=False)["Total_Cost"]
-        .sum()
-        .reset_index()
-        .sort_values("Cost_Type")
-    ) if not cost_df.empty else pd.DataFrame(columns=["Cost_Type", "Total_Cost"])
-
-    # Also show subcontractor subtotal for task cost items.
-    if not cost_items.empty:
-        sub_summary = summarize_cost_items(cost_items)
-        if not sub_summary.empty:
-            summary_df = pd.concat([summary_df, sub_summary], ignore_index=True)
+    summary_df = summarize_program_cost(cost_df, cost_items)
 
     return cost_df, summary_df
 
 
+def patch_program_cost(
+    cost_df: pd.DataFrame,
+    program_df: pd.DataFrame,
+    task_ids: list,
+    task_cost_items_df: pd.DataFrame,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Recalculate only the task cost items of the given tasks (e.g. after their
+    depth or duration changed) and splice them into an existing program cost table.
+    """
+    items = normalize_task_cost_items_df(task_cost_items_df)
+    changed_items = items[items["Task_ID"].astype(str).str.strip().isin(task_ids)]
+    if not changed_items.empty:
+        changed_rows = pd.DataFrame(task_cost_rows(calculate_task_cost_items(
+            changed_items,
+            st.session_state.get("subcontractor_rates_df", pd.DataFrame()),
+            program_df[program_df["Task_ID"].isin(changed_items["Task_ID"])],
+        )), columns=cost_df.columns)
+        is_task_item = cost_df["Cost_Type"] == "Task Cost Item"
+        stale = is_task_item & cost_df["Task_ID"].astype(str).str.strip().isin(task_ids)
+        # Recalculated rows go after the other task items, ahead of the lab tests
+        cost_df = pd.concat([cost_df[is_task_item & ~stale], changed_rows, cost_df[~is_task_item]], ignore_index=True)
+
+    task_rows = cost_df[cost_df["Cost_Type"] == "Task Cost Item"]
+    cost_items = task_rows.rename(columns={"Item": "Rate_Item", "Total_Cost": "Amount"})
+    return cost_df, summarize_program_cost(cost_df, cost_items)
+
+
+def frame_content_key(df: pd.DataFrame | None) -> int:
+    """Content hash of a table (0 when missing or empty)."""
+    if df is None or df.empty:
+        return 0
+    return int(pd.util.hash_pandas_object(df.astype(str), index=False).sum())
+
+
+def cost_inputs_key(program_df, task_cost_items_df, subcontractor_rates_df, soil_lab_df, rock_lab_df) -> tuple:
+    """Content hash of everything the program cost depends on, so unchanged costs are not recalculated."""
+    frames = [
+        program_df.reindex(columns=["Task_ID", "Depth_m", "Duration_days"]),
+        task_cost_items_df, subcontractor_rates_df, soil_lab_df, rock_lab_df,
+    ]
+    return tuple(frame_content_key(df) for df in frames)
+
+
+def program_rates_key() -> tuple:
+    """Content hash of the rate tables a rule-based program's durations and costs were built from."""
+    return frame_content_key(st.session_state.rates_df), frame_content_key(st.session_state.subcontractor_rates_df)
+
+
+def program_settings() -> dict:
+    """generate_program/reschedule_program settings from the Project Setup tab."""
+    info = st.session_state.project_info
+    return {
+        "start_date": datetime.strptime(info["start_date"], "%Y-%m-%d").date(),
+        "work_weekends": info["work_weekends"],
+        "internal_resources": info.get("internal_fieldwork_resources", 0),
+        "external_resources": info.get("external_fieldwork_resources", 0),
+        "holiday_state": info.get("public_holiday_state", "VIC") if info.get("schedule_around_public_holidays", True) else None,
+        "custom_holidays_text": info.get("custom_public_holidays", ""),
+    }
+
+
+def store_program(program_df, cost, tasks_df=None, settings=None):
+    """Save a program and its cost; tasks_df/settings record the basis of a rule-based program."""
+    st.session_state.program_df = program_df
+    st.session_state.cost_df, st.session_state.cost_summary_df = cost
+    st.session_state.cost_inputs_key = cost_inputs_key(
+        program_df, st.session_state.task_cost_items_df, st.session_state.subcontractor_rates_df,
+        st.session_state.soil_lab_df, st.session_state.rock_lab_df,
+    )
+    st.session_state.program_basis = (
+        {"tasks_df": tasks_df.copy(), "settings": settings, "rates_key": program_rates_key()}
+        if tasks_df is not None else None
+    )
+
+
+def update_rule_based_program():
+    """
+    Keep a generated rule-based program in step with edits to the task table:
+    changed tasks and their dependants are rescheduled and their cost items
+    recalculated, falling back to a full regeneration for added/removed tasks,
+    changed project settings or edited rate tables.
+    """
+    basis = st.session_state.get("program_basis")
+    tasks_df = st.session_state.tasks_df
+    if not basis or st.session_state.program_df.empty or tasks_df.equals(basis["tasks_df"]):
+        return
+
+    settings = program_settings()
+    try:
+        result = None
+        if (
+            settings == basis["settings"]
+            and basis.get("rates_key") == program_rates_key()
+            and not st.session_state.cost_df.empty
+        ):
+            result = reschedule_program(
+                st.session_state.program_df, basis["tasks_df"], tasks_df, st.session_state.rates_df, **settings
+            )
+        if result is None:
+            program_df = generate_program(tasks_df, st.session_state.rates_df, **settings)
+            cost = estimate_program_cost(
+                program_df,
+                st.session_state.rates_df,
+                st.session_state.soil_lab_df,
+                st.session_state.rock_lab_df,
+                st.session_state.task_cost_items_df,
+            )
+        else:
+            program_df, changed_task_ids = result
+            cost = patch_program_cost(st.session_state.cost_df, program_df, changed_task_ids, st.session_state.task_cost_items_df)
+    except ValueError as e:
+        st.warning(f"Program not updated from the task table: {e}")
+        return
+    store_program(program_df, cost, tasks_df, settings)
+
+
 def save_project_json(project_data):
     return json.dumps(project_data, indent=2, default=str).encode("utf-8")
 
@@ -1082,6 +1784,144 @@ def move_row(df, selected_task_id, direction):
     return df
 
 
+def crew_units(program: pd.DataFrame) -> pd.Series:
+    """Crew unit that carries out each located field task ("Crew 2", else "Staff 1"; "" when none)."""
+    unit = program["Field_Crew"].where(program["Field_Crew"] != "", program["Field_Staff"])
+    located = (program["Easting"] != 0) & (program["Northing"] != 0)
+    return unit.where(located, "")
+
+
+def crew_travel_km(program: pd.DataFrame) -> pd.Series:
+    """Distance each crew unit travels between its located tasks, in start order."""
+    units = crew_units(program)
+    travel = {}
+    for unit, visits in program[units != ""].groupby(units, sort=True):
+        visits = visits.sort_values(["Start", "Order"], kind="stable")
+        xy = visits[["Easting", "Northing"]].to_numpy(dtype=float)
+        travel[unit] = round(float(np.hypot(*np.diff(xy, axis=0).T).sum()) / 1000, 2)
+    return pd.Series(travel, dtype=float)
+
+
+def sequence_tasks_by_travel(tasks_df: pd.DataFrame, rates_df: pd.DataFrame, settings: dict, time_budget: float = 2.0):
+    """
+    Reorder the located tasks of each crew unit to shorten its travel.
+
+    The program is generated with settings (see program_settings) to find the
+    crew unit (Field_Crew, else Field_Staff) that carries out each task. Each
+    unit's tasks are routed from its first task, and the unit's Order numbers
+    are handed out along the route. Units are handed out again when the program
+    is regenerated, so the summary gives each unit's travel in start order from
+    the program before and after; if the new order travels further in total,
+    the tasks are returned unchanged.
+
+    Without a limit on field staff or crews every task starts as soon as its
+    dependencies allow, so no crew works through a sequence; the tasks are then
+    returned unchanged with an empty summary.
+    """
+    columns = ["Crew", "Tasks", "Travel_Before_km", "Travel_After_km"]
+    tasks = normalize_tasks_df(tasks_df)
+    program = generate_program(tasks, rates_df, **settings)
+    program = program.set_index("Task_ID", drop=False).reindex(tasks["Task_ID"].str.strip()).set_index(tasks.index)
+    units = crew_units(program)
+    if not (units != "").any():
+        return tasks, pd.DataFrame(columns=columns)
+
+    sequenced = tasks.copy()
+    groups = program[units != ""].groupby(units, sort=True)
+    budget = time_budget / max(1, groups.ngroups)
+    for _, visits in groups:
+        if len(visits) < 2:
+            continue
+        visits = visits.sort_values(["Start", "Order"], kind="stable")
+        route = optimise_route(visits[["Easting", "Northing"]].to_numpy(dtype=float), start=0, time_budget=budget)
+        sequenced.loc[visits.index[route], "Order"] = visits["Order"].to_numpy()
+
+    before = crew_travel_km(program)
+    after = crew_travel_km(generate_program(sequenced, rates_df, **settings))
+    summary = pd.DataFrame({"Crew": before.index.union(after.index)})
+    summary["Tasks"] = summary["Crew"].map(units.value_counts()).fillna(0).astype(int)
+    summary["Travel_Before_km"] = summary["Crew"].map(before).fillna(0.0)
+    summary["Travel_After_km"] = summary["Crew"].map(after).fillna(0.0)
+    if after.sum() >= before.sum():
+        summary["Travel_After_km"] = summary["Travel_Before_km"]
+        return tasks, summary[columns]
+    return sequenced.sort_values("Order", kind="stable").reset_index(drop=True), summary[columns]
+
+
+WORK_PACKAGE_ITEM_PATTERN = r"^WP\d+-EST\d+$"
+
+
+def propose_work_packages(tasks_df: pd.DataFrame, method: str = "Grid", size: float = 500.0, seed: int = 0):
+    """
+    Group located tasks into work packages of nearby test locations.
+
+    "Grid" puts tasks in the same size x size metre MGA square into one package;
+    "K-means" splits them into round(size) packages. Packages are labelled
+    WP01, WP02... by their first task in Order, and the located tasks' Order
+    numbers are handed out package by package so generate_program works through
+    one package before moving to the next. Returns the tasks and a per-package
+    summary.
+    """
+    tasks = normalize_tasks_df(tasks_df)
+    tasks["Work_Package"] = ""
+    located = tasks[(tasks["Easting"] != 0) & (tasks["Northing"] != 0)].sort_values("Order", kind="stable")
+    columns = ["Work_Package", "Tasks", "First_Task", "Centre_Easting", "Centre_Northing", "Radius_m"]
+    if located.empty:
+        return tasks, pd.DataFrame(columns=columns)
+
+    xy = located[["Easting", "Northing"]].to_numpy(dtype=float)
+    if method == "K-means":
+        labels = kmeans_clusters(xy, int(round(size)), seed=seed)
+    else:
+        labels = grid_clusters(xy, float(size))
+
+    # Labels are numbered by first point, and the points are in Order
+    names = np.array([f"WP{i + 1:02d}" for i in range(labels.max() + 1)])
+    tasks.loc[located.index, "Work_Package"] = names[labels]
+    package_order = np.argsort(labels, kind="stable")
+    tasks.loc[located.index[package_order], "Order"] = located["Order"].to_numpy()
+
+    counts = np.bincount(labels)
+    centres = np.column_stack([np.bincount(labels, weights=xy[:, axis]) / counts for axis in range(2)])
+    radius = np.zeros(len(counts))
+    np.maximum.at(radius, labels, np.hypot(*(xy - centres[labels]).T))
+    first = np.unique(labels, return_index=True)[1]
+    summary = pd.DataFrame({
+        "Work_Package": names,
+        "Tasks": counts,
+        "First_Task": located["Task_ID"].to_numpy()[first],
+        "Centre_Easting": centres[:, 0].round(1),
+        "Centre_Northing": centres[:, 1].round(1),
+        "Radius_m": radius.round(1),
+    }, columns=columns)
+    return tasks.sort_values("Order", kind="stable").reset_index(drop=True), summary
+
+
+def work_package_cost_items(task_cost_items_df: pd.DataFrame, package_summary: pd.DataFrame, rate_items: list[str]) -> pd.DataFrame:
+    """
+    Replace the shared work package cost rows: one Quantity 1 row per package and
+    rate item (e.g. establishment, traffic control), charged to the package's
+    first task. Rate, unit and subcontractor are filled by calculate_task_cost_items.
+    """
+    items = normalize_task_cost_items_df(task_cost_items_df)
+    items = items[~items["Cost_Item_ID"].str.match(WORK_PACKAGE_ITEM_PATTERN)]
+    rows = [
+        {
+            "Task_ID": package["First_Task"],
+            "Cost_Item_ID": f"{package['Work_Package']}-EST{n:02d}",
+            "Rate_Item": item,
+            "Quantity": 1.0,
+            "Rate_Type": "",
+            "AI_Selected": False,
+            "User_Confirmed": True,
+            "Notes": f"Shared by work package {package['Work_Package']} ({package['Tasks']} tasks)",
+        }
+        for _, package in package_summary.iterrows()
+        for n, item in enumerate(rate_items, start=1)
+    ]
+    return normalize_task_cost_items_df(pd.concat([items, pd.DataFrame(rows)], ignore_index=True))
+
+
 
 # --------------------------------------------------
 # Rate schedule import / AI extraction helpers
@@ -1715,6 +2555,10 @@ if "task_cost_items_df" not in st.session_state:
     st.session_state.task_cost_items_df = default_task_cost_items()
 if "ai_task_cost_items_df" not in st.session_state:
     st.session_state.ai_task_cost_items_df = pd.DataFrame()
+if "scenarios_df" not in st.session_state:
+    st.session_state.scenarios_df = default_scenarios()
+if "scenario_results" not in st.session_state:
+    st.session_state.scenario_results = {}
 
 st.session_state.subcontractors_df = normalize_subcontractors_df(st.session_state.subcontractors_df)
 st.session_state.subcontractor_rates_df = normalize_subcontractor_rates_df(st.session_state.subcontractor_rates_df)
@@ -1745,14 +2589,14 @@ with tab1:
             min_value=0,
             step=1,
             value=int(st.session_state.project_info.get("internal_fieldwork_resources", 1)),
-            help="Number of internal field engineers/field staff available for the program.",
+            help="Number of internal field engineers/field staff available for the program. 0 = not limited.",
         )
         external_fieldwork_resources = st.number_input(
             "External Fieldwork Resources / Crews Available",
             min_value=0,
             step=1,
             value=int(st.session_state.project_info.get("external_fieldwork_resources", 1)),
-            help="Number of subcontractor field crews available, e.g. drill rigs, CPT rigs or test pit crews.",
+            help="Number of subcontractor field crews available, e.g. drill rigs, CPT rigs or test pit crews. 0 = not limited.",
         )
 
     with col2:
@@ -1760,6 +2604,11 @@ with tab1:
             "Shade Public Holidays on Gantt Chart",
             value=bool(st.session_state.project_info.get("shade_public_holidays", True)),
         )
+        schedule_around_public_holidays = st.checkbox(
+            "Public Holidays Are Non-Working Days",
+            value=bool(st.session_state.project_info.get("schedule_around_public_holidays", True)),
+            help="Rule-based program skips the selected state's public holidays and any custom holidays below.",
+        )
         public_holiday_state = st.selectbox(
             "Australian Public Holiday State/Territory",
             ["VIC", "NSW", "QLD", "SA", "WA", "TAS", "ACT", "NT"],
@@ -1824,6 +2673,7 @@ with tab1:
         "internal_fieldwork_resources": internal_fieldwork_resources,
         "external_fieldwork_resources": external_fieldwork_resources,
         "shade_public_holidays": shade_public_holidays,
+        "schedule_around_public_holidays": schedule_around_public_holidays,
         "public_holiday_state": public_holiday_state,
         "custom_public_holidays": custom_public_holidays,
         "gda2020_mga_zone": gda2020_mga_zone,
@@ -1924,6 +2774,12 @@ with tab2:
                     "Item": st.column_config.TextColumn("Rate Item", required=True),
                     "Unit": st.column_config.TextColumn("Unit"),
                     "Production_per_day": st.column_config.NumberColumn("Production per day", min_value=0.0),
+                    "Production_min": st.column_config.NumberColumn(
+                        "Production min", min_value=0.0, help="Worst-case production per day for schedule risk (0 = no variation)."
+                    ),
+                    "Production_max": st.column_config.NumberColumn(
+                        "Production max", min_value=0.0, help="Best-case production per day for schedule risk (0 = no variation)."
+                    ),
                     "Daily_Rate": st.column_config.NumberColumn("Daily rate", min_value=0.0),
                     "Unit_Rate": st.column_config.NumberColumn("Unit rate", min_value=0.0),
                     "Rate_Type": st.column_config.SelectboxColumn("Rate Type", options=["Daily", "Unit", "Allowance"]),
@@ -1989,7 +2845,8 @@ with tab3:
         st.session_state.tasks_df = normalize_tasks_df(st.session_state.tasks_df)
 
     st.info(
-        "Use Order to control general sequence. Use Depends_On to force a task to start after another task. "
+        "Use Order to control general sequence. Use Depends_On to force a task to start after one or more other "
+        "tasks (comma separated; add SS for start-to-start and +/- days for a lag, e.g. BH01 SS+1). "
         "If Duration_days is 0, Task_Type must match a production item in the rates table. "
         "Non-production task types, including Fieldwork, require manual Duration_days."
     )
@@ -2005,8 +2862,61 @@ with tab3:
         if st.button("Move Down"):
             st.session_state.tasks_df = move_row(st.session_state.tasks_df, selected_task, "down")
 
+    if st.button(
+        "Sequence Tasks by Travel Distance",
+        help="Reorders the tasks with coordinates that each field staff member / crew works through into a "
+             "short travel route. Needs a limit on field staff or crews in Project Setup.",
+    ):
+        try:
+            st.session_state.tasks_df, travel_summary_df = sequence_tasks_by_travel(
+                st.session_state.tasks_df, st.session_state.rates_df, program_settings()
+            )
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            if travel_summary_df.empty:
+                st.info(
+                    "No crew works through a sequence of located tasks. Set the number of internal field staff "
+                    "or external crews in Project Setup: with unlimited crews every task runs in parallel."
+                )
+            else:
+                if travel_summary_df["Travel_After_km"].sum() >= travel_summary_df["Travel_Before_km"].sum():
+                    st.info("The current order already gives the crews the shortest travel found; tasks unchanged.")
+                st.dataframe(travel_summary_df, use_container_width=True, hide_index=True)
+
+    with st.expander("Work Packages"):
+        st.caption(
+            "Groups nearby test locations into work packages, orders the tasks package by package, "
+            "and adds one shared cost row per package for each selected rate item."
+        )
+        wp_col1, wp_col2, wp_col3 = st.columns([1, 1, 2])
+        with wp_col1:
+            package_method = st.radio("Clustering", ["Grid", "K-means"], key="work_package_method")
+        with wp_col2:
+            if package_method == "Grid":
+                package_size = st.number_input("Cell Size (m)", min_value=10.0, value=500.0, step=50.0, key="work_package_cell")
+            else:
+                package_size = st.number_input("Number of Packages", min_value=1, value=4, step=1, key="work_package_count")
+        with wp_col3:
+            package_items = st.multiselect(
+                "Shared Rate Items per Package",
+                [item for item in get_rate_item_options() if item],
+                key="work_package_items",
+                help="E.g. mobilisation/establishment or traffic control, charged once per package.",
+            )
+        if st.button("Propose Work Packages"):
+            st.session_state.tasks_df, package_summary_df = propose_work_packages(
+                st.session_state.tasks_df, package_method, package_size
+            )
+            if package_summary_df.empty:
+                st.info("No tasks have Easting/Northing to group into work packages.")
+            else:
+                st.session_state.task_cost_items_df = work_package_cost_items(
+                    st.session_state.task_cost_items_df, package_summary_df, package_items
+                )
+                st.dataframe(package_summary_df, use_container_width=True, hide_index=True)
+
     task_type_options = get_task_type_options(st.session_state.rates_df)
-    dependency_options = [""] + st.session_state.tasks_df["Task_ID"].dropna().astype(str).unique().tolist()
     subcontractor_options = get_subcontractor_options()
     rate_item_options = get_rate_item_options()
 
@@ -2014,7 +2924,7 @@ with tab3:
         st.session_state.tasks_df.sort_values("Order"),
         num_rows="dynamic",
         use_container_width=True,
-        column_order=["Order", "Task_ID", "Task_Type", "Location_ID", "Investigation_Type", "Depth_m", "Duration_days", "Depends_On", "Bar_Color", "Easting", "Northing", "Access_Notes"],
+        column_order=["Order", "Task_ID", "Task_Type", "Location_ID", "Investigation_Type", "Depth_m", "Duration_days", "Depends_On", "Bar_Color", "Easting", "Northing", "Access_Notes", "Work_Package"],
         column_config={
             "Order": st.column_config.NumberColumn("Order", min_value=1, step=1),
             "Task_ID": st.column_config.TextColumn("Task ID", required=True),
@@ -2023,14 +2933,19 @@ with tab3:
             "Investigation_Type": st.column_config.SelectboxColumn("Investigation Type", options=INVESTIGATION_TYPE_OPTIONS, required=True),
             "Depth_m": st.column_config.NumberColumn("Depth m / Quantity", min_value=0.0),
             "Duration_days": st.column_config.NumberColumn("Duration days", min_value=0.0),
-            "Depends_On": st.column_config.SelectboxColumn("Depends On", options=dependency_options),
+            "Depends_On": st.column_config.TextColumn(
+                "Depends On",
+                help="Task IDs separated by commas, optionally with SS/FS and a lag in days, e.g. PRE01, BH01 SS+1.",
+            ),
             "Bar_Color": st.column_config.SelectboxColumn("Bar Color", options=COLOR_OPTIONS),
             "Easting": st.column_config.NumberColumn("Easting", min_value=0.0),
             "Northing": st.column_config.NumberColumn("Northing", min_value=0.0),
             "Access_Notes": st.column_config.TextColumn("Access Notes"),
+            "Work_Package": st.column_config.TextColumn("Work Package"),
         },
     )
     st.session_state.tasks_df = normalize_tasks_df(edited_tasks_df)
+    update_rule_based_program()
 
     st.subheader("Task Cost Build-Up Items")
     st.caption(
@@ -2231,6 +3146,7 @@ with tab4:
 
         if st.button("Use AI Preliminary Program for Gantt Chart"):
             st.session_state.program_df = normalize_ai_program_df(st.session_state.ai_program_df)
+            st.session_state.program_basis = None  # not rule-based, so task edits leave it alone
             st.session_state.task_cost_items_df = normalize_task_cost_items_df(st.session_state.ai_task_cost_items_df)
             st.session_state.cost_df, st.session_state.cost_summary_df = estimate_program_cost(
                 st.session_state.program_df,
@@ -2253,20 +3169,16 @@ with tab5:
     with col_a:
         if st.button("Generate Rule-Based Program"):
             try:
-                start = datetime.strptime(st.session_state.project_info["start_date"], "%Y-%m-%d").date()
-                st.session_state.program_df = generate_program(
-                    st.session_state.tasks_df,
-                    st.session_state.rates_df,
-                    start,
-                    st.session_state.project_info["work_weekends"],
-                )
-                st.session_state.cost_df, st.session_state.cost_summary_df = estimate_program_cost(
-                    st.session_state.program_df,
+                settings = program_settings()
+                program_df = generate_program(st.session_state.tasks_df, st.session_state.rates_df, **settings)
+                cost = estimate_program_cost(
+                    program_df,
                     st.session_state.rates_df,
                     st.session_state.soil_lab_df,
                     st.session_state.rock_lab_df,
                     st.session_state.task_cost_items_df,
                 )
+                store_program(program_df, cost, st.session_state.tasks_df, settings)
                 st.success("Rule-based program generated.")
             except ValueError as e:
                 st.error(str(e))
@@ -2276,6 +3188,7 @@ with tab5:
                 st.warning("No AI preliminary program is available yet.")
             else:
                 st.session_state.program_df = normalize_ai_program_df(st.session_state.ai_program_df)
+                st.session_state.program_basis = None  # not rule-based, so task edits leave it alone
                 st.session_state.task_cost_items_df = normalize_task_cost_items_df(st.session_state.ai_task_cost_items_df)
                 st.session_state.cost_df, st.session_state.cost_summary_df = estimate_program_cost(
                     st.session_state.program_df,
@@ -2295,12 +3208,15 @@ with tab5:
             use_container_width=True,
             column_order=[
                 "Order", "Task_ID", "Task_Type", "Location_ID", "Investigation_Type", "Depth_m", "Duration_days",
-                "Depends_On", "Start", "Finish", "Bar_Color", "Easting", "Northing", "Access_Notes",
-                "Planning_Notes", "Traffic_Management", "Services_Risk", "Groundwater_Risk",
+                "Depends_On", "Start", "Finish", "Total_Float_days", "Critical", "Field_Staff", "Field_Crew",
+                "Bar_Color", "Easting", "Northing", "Work_Package",
+                "Access_Notes", "Planning_Notes", "Traffic_Management", "Services_Risk", "Groundwater_Risk",
             ],
             column_config={
                 "Start": st.column_config.DateColumn("Start"),
                 "Finish": st.column_config.DateColumn("Finish"),
+                "Total_Float_days": st.column_config.NumberColumn("Total Float days", disabled=True),
+                "Critical": st.column_config.CheckboxColumn("Critical", disabled=True),
                 "Bar_Color": st.column_config.SelectboxColumn("Bar Color", options=COLOR_OPTIONS),
             },
         )
@@ -2332,13 +3248,20 @@ with tab5:
             st.session_state.subcontractor_rates_df,
             st.session_state.program_df,
         )
-        st.session_state.cost_df, st.session_state.cost_summary_df = estimate_program_cost(
-            st.session_state.program_df,
-            st.session_state.rates_df,
-            st.session_state.soil_lab_df,
-            st.session_state.rock_lab_df,
-            st.session_state.task_cost_items_df,
+        # Full cost recalculation only when its inputs changed (task edits patch the cost directly)
+        cost_key = cost_inputs_key(
+            st.session_state.program_df, st.session_state.task_cost_items_df, st.session_state.subcontractor_rates_df,
+            st.session_state.soil_lab_df, st.session_state.rock_lab_df,
         )
+        if cost_key != st.session_state.get("cost_inputs_key"):
+            st.session_state.cost_df, st.session_state.cost_summary_df = estimate_program_cost(
+                st.session_state.program_df,
+                st.session_state.rates_df,
+                st.session_state.soil_lab_df,
+                st.session_state.rock_lab_df,
+                st.session_state.task_cost_items_df,
+            )
+            st.session_state.cost_inputs_key = cost_key
 
         plot_df = normalize_ai_program_df(st.session_state.program_df)
         plot_df = plot_df.sort_values("Order").reset_index(drop=True)
@@ -2358,13 +3281,16 @@ with tab5:
             start_dt = pd.to_datetime(row["Start"])
             finish_dt = pd.to_datetime(row["Finish"])
             duration_ms = max((finish_dt - start_dt).total_seconds() * 1000, 1)
+            critical = row.get("Critical", False)
+            critical = bool(critical) if pd.notna(critical) else False
             fig.add_trace(go.Bar(
                 x=[duration_ms],
                 y=[row["Y"]],
                 base=[start_dt],
                 orientation="h",
                 width=1.0,
-                marker=dict(color=row["Bar_Color"], line=dict(width=0)),
+                # Critical-path tasks are outlined in red
+                marker=dict(color=row["Bar_Color"], line=dict(width=2 if critical else 0, color="red")),
                 text=[row["Bar_Label"]],
                 textposition="inside",
                 insidetextanchor="middle",
@@ -2425,14 +3351,13 @@ with tab5:
                 fig.add_vrect(x0=d, x1=d + pd.Timedelta(days=1), fillcolor="lightgrey", opacity=0.25, layer="below", line_width=0)
 
         if st.session_state.project_info.get("shade_public_holidays", True):
-            public_holidays = get_public_holidays(
+            holiday_dates, holiday_names = holiday_calendar(
                 start_date_plot,
                 finish_date_plot,
                 st.session_state.project_info.get("public_holiday_state", "VIC"),
                 st.session_state.project_info.get("custom_public_holidays", ""),
             )
-            for holiday_date, holiday_name in sorted(public_holidays.items()):
-                holiday_start = pd.to_datetime(holiday_date)
+            for holiday_start, holiday_name in zip(pd.to_datetime(holiday_dates), holiday_names):
                 fig.add_vrect(x0=holiday_start, x1=holiday_start + pd.Timedelta(days=1), fillcolor="red", opacity=0.28, layer="below", line_width=0)
                 fig.add_annotation(x=holiday_start + pd.Timedelta(hours=12), y=n_tasks + 0.45, text=str(holiday_name), showarrow=False, textangle=-90, font=dict(size=8, color="red"), yanchor="top")
 
@@ -2448,9 +3373,76 @@ with tab5:
                 st.dataframe(st.session_state.cost_summary_df, use_container_width=True)
             total_cost = float(st.session_state.cost_df["Total_Cost"].sum())
             st.metric("Estimated Total Cost", f"${total_cost:,.2f}")
+
+        st.subheader("Schedule Risk (Monte Carlo)")
+        if not st.session_state.get("program_basis"):
+            st.info("Schedule risk simulates the rule-based program. Generate a rule-based program first.")
+        else:
+            st.caption(
+                "Production rates are sampled between Production min and max in the subcontractor rates "
+                "(0 = no variation); manual durations are scaled between the factors below."
+            )
+            risk_col1, risk_col2, risk_col3 = st.columns(3)
+            with risk_col1:
+                risk_runs = st.number_input("Simulations", min_value=100, max_value=100000, value=2000, step=100)
+            with risk_col2:
+                manual_best = st.number_input("Manual duration best case factor", min_value=0.1, max_value=1.0, value=0.9, step=0.05)
+            with risk_col3:
+                manual_worst = st.number_input("Manual duration worst case factor", min_value=1.0, max_value=5.0, value=1.25, step=0.05)
+            if st.button("Run Schedule Risk Simulation"):
+                try:
+                    with st.spinner("Simulating programs..."):
+                        st.session_state.schedule_risk = schedule_risk(
+                            st.session_state.tasks_df,
+                            st.session_state.rates_df,
+                            st.session_state.cost_df,
+                            program_settings(),
+                            n_runs=risk_runs,
+                            manual_spread=(manual_best, manual_worst),
+                        )
+                except ValueError as e:
+                    st.error(str(e))
+            if st.session_state.get("schedule_risk") is not None:
+                risk_summary_df, risk_finish_dates = st.session_state.schedule_risk
+                st.dataframe(risk_summary_df, use_container_width=True, hide_index=True)
+                risk_fig = go.Figure(go.Histogram(x=risk_finish_dates, marker_color="steelblue"))
+                for _, risk_row in risk_summary_df.iterrows():
+                    risk_fig.add_vline(x=pd.to_datetime(risk_row["Finish"]), line_dash="dash",
+                                       line_color="red" if risk_row["Scenario"] != "Deterministic" else "black")
+                risk_fig.update_layout(height=320, xaxis_title="Finish date", yaxis_title="Simulations",
+                                       margin=dict(l=20, r=20, t=30, b=40), plot_bgcolor="white")
+                st.plotly_chart(risk_fig, use_container_width=True)
     else:
         st.info("Generate a rule-based program or load an AI preliminary program to show the editable program and Gantt chart.")
 
+    st.subheader("Scenario Comparison")
+    st.caption(
+        "Each row is a variation on the current project settings and task table (blank = as the base). "
+        "A subcontractor moves the subcontracted tasks and the cost items it prices to that subcontractor."
+    )
+    edited_scenarios_df = st.data_editor(
+        st.session_state.scenarios_df,
+        num_rows="dynamic",
+        use_container_width=True,
+        column_config={
+            "Scenario": st.column_config.TextColumn("Scenario", required=True),
+            "Work_Weekends": st.column_config.SelectboxColumn("Work Weekends", options=["", "Yes", "No"]),
+            "Internal_Resources": st.column_config.NumberColumn("Internal Field Staff", min_value=0, step=1),
+            "External_Resources": st.column_config.NumberColumn("External Crews / Rigs", min_value=0, step=1),
+            "Subcontractor": st.column_config.SelectboxColumn("Subcontractor", options=get_subcontractor_options()),
+        },
+    )
+    st.session_state.scenarios_df = edited_scenarios_df
+    if st.button("Run Scenarios"):
+        base = base_scenario(
+            program_settings(),
+            **{name: st.session_state[name] for name in SCENARIO_INPUTS},
+        )
+        with st.spinner("Generating scenario programs..."):
+            st.session_state.scenario_results = run_scenarios(scenarios_from_table(base, edited_scenarios_df))
+    if st.session_state.scenario_results:
+        st.dataframe(compare_scenarios(st.session_state.scenario_results), use_container_width=True, hide_index=True)
+
     st.subheader("Test Location Plan")
     selected_zone = st.session_state.project_info.get("gda2020_mga_zone", "Zone 55")
     st.write(f"Current coordinate system: GDA2020 MGA {selected_zone} ({GDA2020_MGA_EPSG.get(selected_zone, '')})")
@@ -2516,6 +3508,7 @@ with tab6:
         st.session_state.ai_task_cost_items_df = normalize_task_cost_items_df(pd.DataFrame(loaded.get("ai_task_cost_items", [])))
         st.session_state.ai_program_comments = loaded.get("ai_program_comments", "")
         st.session_state.program_df = normalize_ai_program_df(pd.DataFrame(loaded.get("program", [])))
+        st.session_state.program_basis = None  # not rule-based, so task edits leave it alone
         st.session_state.cost_df = pd.DataFrame(loaded.get("cost", []))
         st.session_state.cost_summary_df = pd.DataFrame(loaded.get("cost_summary", []))
         st.success("Project loaded.")
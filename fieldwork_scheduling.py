@@ -0,0 +1,553 @@
+# -*- coding: utf-8 -*-
+"""
+Scheduling engine for the fieldwork planner.
+
+Works on plain arrays in working-day units (day 0 = first working day of the
+project); the planner app converts task tables to arrays and the results back
+to dates.
+"""
+
+import heapq
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+
+
+# --------------------------------------------------
+# Working-day calendar
+# --------------------------------------------------
+
+def working_calendar(work_weekends: bool, holidays=()) -> np.busdaycalendar:
+    """Business-day calendar: Mon-Fri (or every day) less the given holiday dates."""
+    weekmask = "1111111" if work_weekends else "1111100"
+    return np.busdaycalendar(weekmask=weekmask, holidays=np.sort(np.asarray(holidays, dtype="datetime64[D]")))
+
+
+def working_day_dates(start_date, day_numbers, calendar: np.busdaycalendar) -> np.ndarray:
+    """
+    Dates (datetime64[D]) of working-day numbers, day 0 being the first working
+    day on or after start_date. Vectorised over day_numbers.
+    """
+    first = np.busday_offset(np.datetime64(start_date, "D"), 0, roll="forward", busdaycal=calendar)
+    return np.busday_offset(first, np.asarray(day_numbers, dtype=np.int64), busdaycal=calendar)
+
+
+def working_day_numbers(start_date, dates, calendar: np.busdaycalendar) -> np.ndarray:
+    """Inverse of working_day_dates; a non-working date counts as the next working day."""
+    first = np.busday_offset(np.datetime64(start_date, "D"), 0, roll="forward", busdaycal=calendar)
+    dates = np.busday_offset(np.asarray(dates, dtype="datetime64[D]"), 0, roll="forward", busdaycal=calendar)
+    return np.busday_count(first, dates, busdaycal=calendar)
+
+
+# --------------------------------------------------
+# Dependencies
+# --------------------------------------------------
+
+class Dependencies(NamedTuple):
+    """Dependency edges as parallel arrays of task indices, lags and link types."""
+    pred: np.ndarray
+    succ: np.ndarray
+    lag: np.ndarray            # working days, may be negative
+    start_to_start: np.ndarray  # False = finish-to-start
+
+
+# "BH01", "BH01 SS", "BH01 FS+2", "BH01+2", "BH01 SS-1". The link type must be
+# separated by whitespace, so IDs ending in "ss"/"fs" (e.g. "Access+2") keep it.
+DEPENDENCY_PATTERN = re.compile(
+    r"^(?P<task>.+?)(?:\s+(?P<link>FS|SS))?\s*(?:(?P<lag>[+-]\s*\d+)\s*d?)?$", re.IGNORECASE
+)
+
+
+def parse_dependencies(task_ids, depends_on) -> tuple[Dependencies, list[str]]:
+    """
+    Parse Depends_On text into dependency edges.
+
+    Each entry lists predecessors separated by commas or semicolons, each
+    optionally followed by a space and a link type (FS, the default, or SS) and
+    a lag in working days. An entry that is exactly a Task_ID is always read as that
+    task, so IDs such as "BH-01" are not mistaken for a lag.
+    Returns the edges and a list of error messages (unknown IDs, bad syntax).
+    """
+    position = {task_id: i for i, task_id in enumerate(task_ids)}
+    pred, succ, lag, start_to_start = [], [], [], []
+    errors = []
+    for task, (task_id, text) in enumerate(zip(task_ids, depends_on)):
+        for entry in re.split(r"[,;]", text or ""):
+            entry = entry.strip()
+            if not entry:
+                continue
+            if entry in position:
+                prerequisite, link, days = entry, "FS", 0
+            else:
+                match = DEPENDENCY_PATTERN.match(entry)
+                prerequisite = match.group("task").strip() if match else entry
+                if prerequisite not in position:
+                    errors.append(f"{task_id}: Depends_On references unknown Task_ID '{prerequisite}'.")
+                    continue
+                link = (match.group("link") or "FS").upper()
+                days = int(match.group("lag").replace(" ", "")) if match.group("lag") else 0
+            if position[prerequisite] == task:
+                errors.append(f"{task_id}: a task cannot depend on itself.")
+                continue
+            pred.append(position[prerequisite])
+            succ.append(task)
+            lag.append(days)
+            start_to_start.append(link == "SS")
+
+    dependencies = Dependencies(
+        np.array(pred, dtype=np.int64),
+        np.array(succ, dtype=np.int64),
+        np.array(lag, dtype=np.int64),
+        np.array(start_to_start, dtype=bool),
+    )
+    return dependencies, errors
+
+
+def _outgoing_edges(n_tasks: int, node_of_edge: np.ndarray):
+    # CSR layout: edges sorted by node, with the start offset of every node
+    order = np.argsort(node_of_edge, kind="stable")
+    offsets = np.searchsorted(node_of_edge[order], np.arange(n_tasks + 1))
+    return order, offsets
+
+
+def _gather_edges(order, offsets, nodes):
+    # Indices of all edges leaving the given nodes, without a Python loop
+    counts = offsets[nodes + 1] - offsets[nodes]
+    first = np.repeat(offsets[nodes] - np.cumsum(counts) + counts, counts)
+    return order[first + np.arange(counts.sum())]
+
+
+def topological_levels(n_tasks: int, dependencies: Dependencies) -> np.ndarray:
+    """
+    Kahn's algorithm, one whole frontier per NumPy step (O(V + E) overall).
+
+    Returns each task's level: 0 for tasks without predecessors, otherwise one
+    more than its deepest predecessor. Tasks on or behind a cycle get -1.
+    """
+    indegree = np.bincount(dependencies.succ, minlength=n_tasks)
+    order, offsets = _outgoing_edges(n_tasks, dependencies.pred)
+    levels = np.full(n_tasks, -1, dtype=np.int64)
+    frontier = np.flatnonzero(indegree == 0)
+    level = 0
+    while frontier.size:
+        levels[frontier] = level
+        released = dependencies.succ[_gather_edges(order, offsets, frontier)]
+        np.subtract.at(indegree, released, 1)
+        frontier = np.unique(released[indegree[released] == 0])
+        level += 1
+    return levels
+
+
+def find_cycle(levels: np.ndarray, dependencies: Dependencies) -> list[int]:
+    """
+    One dependency cycle as task indices (first task repeated at the end).
+
+    Every unlevelled task still has an unlevelled predecessor, so walking
+    predecessors from any of them must come back round to a task already seen.
+    """
+    blocked = levels < 0
+    if not blocked.any():
+        return []
+    inside = blocked[dependencies.pred] & blocked[dependencies.succ]
+    predecessor_of = dict(zip(dependencies.succ[inside].tolist(), dependencies.pred[inside].tolist()))
+    path = [int(np.flatnonzero(blocked)[0])]
+    seen = {path[0]: 0}
+    while True:
+        task = predecessor_of[path[-1]]
+        if task in seen:
+            cycle = path[seen[task]:][::-1]
+            return cycle + [cycle[0]]
+        seen[task] = len(path)
+        path.append(task)
+
+
+# --------------------------------------------------
+# Resource-constrained list scheduling
+# --------------------------------------------------
+
+def resource_constrained_schedule(
+    durations,
+    dependencies: Dependencies,
+    resource_needs,
+    capacities: list[int],
+    priority=None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Schedule tasks on limited resource pools with a priority-queue event loop.
+
+    durations: working days per task (>= 1).
+    dependencies: FS edges hold a task until its predecessor has finished plus
+        the lag, SS edges until the predecessor has started plus the lag.
+    resource_needs: bool array (tasks x pools), True where a task occupies one
+        unit of that pool (e.g. one field engineer, one drill rig) for its duration.
+    capacities: units per pool; 0 means the pool is not constrained.
+    priority: lower values are scheduled first among tasks ready at the same
+        time (defaults to table order).
+
+    Ready tasks are taken in (earliest start, priority) order and given the
+    first units of each pool they need to become free. Returns the start day of
+    every task and the 1-based unit used in each pool (0 where not needed).
+    Tasks on or behind a dependency cycle are never ready and keep start -1.
+    """
+    # Plain lists in the loop: NumPy scalar indexing is slower than list access
+    durations = np.asarray(durations, dtype=np.int64).tolist()
+    n_tasks = len(durations)
+    needs = np.asarray(resource_needs, dtype=bool).reshape(n_tasks, len(capacities))
+    priority = list(range(n_tasks)) if priority is None else np.asarray(priority).tolist()
+
+    successors = [[] for _ in range(n_tasks)]
+    remaining = [0] * n_tasks
+    for pred, succ, lag, start_to_start in zip(*(field.tolist() for field in dependencies)):
+        successors[pred].append((succ, lag, start_to_start))
+        remaining[succ] += 1
+
+    earliest = [0] * n_tasks
+    ready = [(0, priority[task], task) for task in range(n_tasks) if remaining[task] == 0]
+    heapq.heapify(ready)
+
+    # One heap of (free from day, unit number) per constrained pool
+    pools = [[(0, unit) for unit in range(1, capacity + 1)] if capacity > 0 else None
+             for capacity in capacities]
+    pool_needs = [[pool for pool in np.flatnonzero(row).tolist() if pools[pool] is not None] for row in needs]
+
+    starts = [-1] * n_tasks
+    units = np.zeros((n_tasks, len(capacities)), dtype=np.int64)
+    while ready:
+        start, _, task = heapq.heappop(ready)
+        taken = []
+        for pool in pool_needs[task]:
+            free_from, unit = heapq.heappop(pools[pool])
+            start = max(start, free_from)
+            taken.append((pool, unit))
+
+        finish = start + durations[task]
+        for pool, unit in taken:
+            heapq.heappush(pools[pool], (finish, unit))
+            units[task, pool] = unit
+        starts[task] = start
+        for succ, lag, start_to_start in successors[task]:
+            earliest[succ] = max(earliest[succ], (start if start_to_start else finish) + lag)
+            remaining[succ] -= 1
+            if remaining[succ] == 0:
+                heapq.heappush(ready, (earliest[succ], priority[succ], succ))
+
+    return np.array(starts, dtype=np.int64), units
+
+
+# --------------------------------------------------
+# Incremental rescheduling
+# --------------------------------------------------
+
+def downstream_mask(n_tasks: int, dependencies: Dependencies, changed) -> np.ndarray:
+    """True for the changed tasks and every task that depends on them, directly or not."""
+    order, offsets = _outgoing_edges(n_tasks, dependencies.pred)
+    affected = np.zeros(n_tasks, dtype=bool)
+    frontier = np.unique(np.asarray(changed, dtype=np.int64))
+    while frontier.size:
+        affected[frontier] = True
+        reached = dependencies.succ[_gather_edges(order, offsets, frontier)]
+        frontier = np.unique(reached[~affected[reached]])
+    return affected
+
+
+def reschedule_downstream(durations, dependencies: Dependencies, levels: np.ndarray, starts, affected) -> np.ndarray:
+    """
+    Earliest starts with only the affected tasks recomputed, level by level;
+    every other task keeps its start. Exact when resources are not limited
+    (affected must be closed downstream, see downstream_mask).
+    """
+    durations = np.asarray(durations, dtype=np.int64)
+    starts = np.array(starts, dtype=np.int64)
+    pred, succ, lag, start_to_start = dependencies
+    starts[affected] = 0
+    into_affected = np.flatnonzero(affected[succ])
+    for edges in _edges_by_level(levels, succ[into_affected])[1:]:
+        edges = into_affected[edges]
+        bound = starts[pred[edges]] + np.where(start_to_start[edges], 0, durations[pred[edges]]) + lag[edges]
+        np.maximum.at(starts, succ[edges], bound)
+    return starts
+
+
+# --------------------------------------------------
+# Critical path
+# --------------------------------------------------
+
+def _edges_by_level(levels: np.ndarray, nodes: np.ndarray):
+    # Edge indices grouped by the level of the given end of each edge
+    order = np.argsort(levels[nodes], kind="stable")
+    bounds = np.searchsorted(levels[nodes][order], np.arange(levels.max() + 2))
+    return [order[bounds[level]:bounds[level + 1]] for level in range(levels.max() + 1)]
+
+
+def forward_pass(durations, dependencies: Dependencies, levels: np.ndarray) -> np.ndarray:
+    """
+    Earliest start day of every task, ignoring resources (vectorised per level).
+
+    durations may also be 2-D (tasks x runs) to push many sampled programs
+    through the network at once.
+    """
+    durations = np.asarray(durations, dtype=np.int64)
+    pred, succ, lag, start_to_start = dependencies
+    extra_axes = (1,) * (durations.ndim - 1)
+    early_start = np.zeros(durations.shape, dtype=np.int64)
+    for edges in _edges_by_level(levels, succ)[1:]:
+        link_days = np.where(start_to_start[edges].reshape(-1, *extra_axes), 0, durations[pred[edges]])
+        bound = early_start[pred[edges]] + link_days + lag[edges].reshape(-1, *extra_axes)
+        np.maximum.at(early_start, succ[edges], bound)
+    return early_start
+
+
+def backward_pass(durations, dependencies: Dependencies, levels: np.ndarray, starts) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Latest start and total float of every task for the given start days.
+
+    Latest finishes are pulled back from the program finish through the
+    dependencies, so with starts from forward_pass this is the classic CPM
+    backward pass; with resource-levelled starts the float is what each task
+    can slip, logic-wise, without moving the levelled finish date.
+    """
+    durations = np.asarray(durations, dtype=np.int64)
+    starts = np.asarray(starts, dtype=np.int64)
+    pred, succ, lag, start_to_start = dependencies
+    late_finish = np.full(len(durations), int((starts + durations).max()), dtype=np.int64)
+    for edges in _edges_by_level(levels, pred)[::-1]:
+        late_start_succ = late_finish[succ[edges]] - durations[succ[edges]]
+        bound = late_start_succ - lag[edges] + np.where(start_to_start[edges], durations[pred[edges]], 0)
+        np.minimum.at(late_finish, pred[edges], bound)
+    late_start = late_finish - durations
+    return late_start, late_start - starts
+
+
+# --------------------------------------------------
+# Schedule risk simulation
+# --------------------------------------------------
+
+class SimulationModel(NamedTuple):
+    """
+    Everything a Monte Carlo worker needs, as plain arrays (picklable).
+
+    A task's duration is work / rate rounded up to whole days, the rate being
+    drawn from a triangular (rate_low, rate_mode, rate_high) distribution:
+    metres over metres per day for production items, or days over a
+    productivity factor around 1 for manually entered durations.
+    """
+    work: np.ndarray
+    rate_low: np.ndarray
+    rate_mode: np.ndarray
+    rate_high: np.ndarray
+    dependencies: Dependencies
+    levels: np.ndarray
+    resource_needs: np.ndarray
+    capacities: list
+    priority: np.ndarray
+    daily_cost: np.ndarray  # time-related cost per task per working day
+
+
+def sample_durations(model: SimulationModel, n_runs: int, rng: np.random.Generator) -> np.ndarray:
+    """Sampled durations (tasks x runs) in whole working days."""
+    low = np.minimum(model.rate_low, model.rate_mode)
+    high = np.maximum(model.rate_high, model.rate_mode)
+    varies = high > low
+    rates = np.repeat(model.rate_mode[:, None], n_runs, axis=1)
+    if varies.any():
+        shape = (n_runs, int(varies.sum()))
+        rates[varies] = rng.triangular(low[varies], model.rate_mode[varies], high[varies], size=shape).T
+    # +0.499 then round: up to the next whole day, as in the deterministic estimate
+    return np.maximum(1, np.round(model.work[:, None] / rates + 0.499)).astype(np.int64)
+
+
+def simulate_schedule_chunk(model: SimulationModel, n_runs: int, seed) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Finish day (working days after the start) and extra time-related cost of
+    n_runs sampled programs. Runs in a worker process.
+
+    Without crew limits all runs go through one vectorised forward pass;
+    with limits each run is list-scheduled.
+    """
+    rng = np.random.default_rng(seed)
+    durations = sample_durations(model, n_runs, rng)
+    base = np.maximum(1, np.round(model.work / model.rate_mode + 0.499)).astype(np.int64)
+    extra_cost = model.daily_cost @ (durations - base[:, None])
+
+    limited = any(capacity > 0 and model.resource_needs[:, pool].any()
+                  for pool, capacity in enumerate(model.capacities))
+    if not limited:
+        starts = forward_pass(durations, model.dependencies, model.levels)
+        return (starts + durations).max(axis=0), extra_cost
+
+    finish = np.empty(n_runs, dtype=np.int64)
+    for run in range(n_runs):
+        starts, _ = resource_constrained_schedule(
+            durations[:, run], model.dependencies, model.resource_needs, model.capacities, model.priority,
+        )
+        finish[run] = (starts + durations[:, run]).max()
+    return finish, extra_cost
+
+
+def simulate_schedule(model: SimulationModel, n_runs: int, workers=None, seed=None, chunk_runs: int = 250):
+    """
+    Run n_runs Monte Carlo programs in chunks on a process pool (in-process
+    when workers == 1). Chunks get independent random streams from one seed,
+    so a given seed, run count and chunk size always give the same results.
+    """
+    chunks = [min(chunk_runs, n_runs - first) for first in range(0, n_runs, chunk_runs)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    if workers == 1 or len(chunks) == 1:
+        results = [simulate_schedule_chunk(model, runs, s) for runs, s in zip(chunks, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(simulate_schedule_chunk, [model] * len(chunks), chunks, seeds))
+    finish = np.concatenate([finish for finish, _ in results])
+    extra_cost = np.concatenate([cost for _, cost in results])
+    return finish, extra_cost
+
+
+# --------------------------------------------------
+# Route optimisation
+# --------------------------------------------------
+
+def distance_matrix(xy) -> np.ndarray:
+    """Pairwise straight-line distances between (easting, northing) points, in metres."""
+    xy = np.asarray(xy, dtype=float)
+    return np.hypot(xy[:, None, 0] - xy[None, :, 0], xy[:, None, 1] - xy[None, :, 1])
+
+
+def route_length(route, dist: np.ndarray) -> float:
+    """Travel along an open route (no return to the start)."""
+    route = np.asarray(route)
+    return float(dist[route[:-1], route[1:]].sum())
+
+
+def nearest_neighbour_route(dist: np.ndarray, start: int = 0) -> np.ndarray:
+    """Greedy open route: always travel to the closest unvisited location."""
+    n = len(dist)
+    route = np.empty(n, dtype=np.int64)
+    visited = np.zeros(n, dtype=bool)
+    current = start
+    for step in range(n):
+        route[step] = current
+        visited[current] = True
+        if step < n - 1:
+            current = int(np.argmin(np.where(visited, np.inf, dist[current])))
+    return route
+
+
+def _two_opt_pass(route: np.ndarray, dist: np.ndarray, deadline: float) -> bool:
+    # Best segment reversal route[i:j+1] for each i, all j at once; the start stays fixed
+    n = len(route)
+    improved = False
+    for i in range(1, n - 1):
+        if time.perf_counter() >= deadline:
+            break
+        a, b = route[i - 1], route[i]
+        c = route[i + 1:]
+        after = np.append(route[i + 2:], -1)  # -1: route end, nothing to reconnect
+        old = dist[a, b] + np.where(after >= 0, dist[c, after], 0.0)
+        new = dist[a, c] + np.where(after >= 0, dist[b, after], 0.0)
+        gain = old - new
+        j = int(np.argmax(gain))
+        if gain[j] > 1e-9:
+            route[i:i + j + 2] = route[i:i + j + 2][::-1]
+            improved = True
+    return improved
+
+
+def _or_opt_pass(route: np.ndarray, dist: np.ndarray, deadline: float, max_segment: int = 3) -> bool:
+    # Move a run of 1-3 locations (either way round) to the cheapest gap elsewhere on the route
+    improved = False
+    for k in range(1, max_segment + 1):
+        i = 1
+        while i + k <= len(route) and time.perf_counter() < deadline:
+            segment = route[i:i + k]
+            before = route[i - 1]
+            after = route[i + k] if i + k < len(route) else -1
+            removed = dist[before, segment[0]] + (dist[segment[-1], after] if after >= 0 else 0.0)
+            removed -= dist[before, after] if after >= 0 else 0.0
+            rest = np.concatenate([route[:i], route[i + k:]])
+            u, v = rest[:-1], rest[1:]
+            forward = dist[u, segment[0]] + dist[segment[-1], v] - dist[u, v]
+            backward = dist[u, segment[-1]] + dist[segment[0], v] - dist[u, v]
+            # Appending at the end of the open route only costs the one new leg
+            tail = min(dist[rest[-1], segment[0]], dist[rest[-1], segment[-1]])
+            best = int(np.argmin(np.minimum(forward, backward)))
+            cost = min(forward[best], backward[best])
+            if min(cost, tail) < removed - 1e-9:
+                if tail <= cost:
+                    piece = segment if dist[rest[-1], segment[0]] <= dist[rest[-1], segment[-1]] else segment[::-1]
+                    route[:] = np.concatenate([rest, piece])
+                else:
+                    piece = segment if forward[best] <= backward[best] else segment[::-1]
+                    route[:] = np.concatenate([rest[:best + 1], piece, rest[best + 1:]])
+                improved = True
+            i += 1
+    return improved
+
+
+def optimise_route(xy, start: int = 0, time_budget: float = 2.0) -> np.ndarray:
+    """
+    Short open visiting order for the points in xy, starting at index start.
+
+    A nearest-neighbour route is improved with 2-opt and Or-opt passes until
+    neither finds a shorter route or time_budget seconds have passed.
+    """
+    deadline = time.perf_counter() + time_budget
+    n = len(xy)
+    if n <= 2:
+        return np.arange(n) if start == 0 else np.array([start] + [i for i in range(n) if i != start])
+    dist = distance_matrix(xy)
+    route = nearest_neighbour_route(dist, start)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = _two_opt_pass(route, dist, deadline)
+        improved = _or_opt_pass(route, dist, deadline) or improved
+    return route
+
+
+# --------------------------------------------------
+# Spatial clustering
+# --------------------------------------------------
+
+def _first_seen_labels(labels: np.ndarray) -> np.ndarray:
+    # Renumber clusters 0, 1, 2... in order of their first point
+    _, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[np.argsort(first)] = np.arange(len(first))
+    return rank[inverse]
+
+
+def grid_clusters(xy, cell_size: float) -> np.ndarray:
+    """Cluster label per point: points in the same cell_size x cell_size square share a label."""
+    cells = np.floor(np.asarray(xy, dtype=float) / cell_size).astype(np.int64)
+    _, labels = np.unique(cells, axis=0, return_inverse=True)
+    return _first_seen_labels(labels.ravel())
+
+
+def kmeans_clusters(xy, k: int, seed=0, max_iter: int = 100) -> np.ndarray:
+    """
+    Cluster label per point from k-means (k-means++ seeding, Lloyd iterations
+    with all point-centre distances computed at once).
+    """
+    xy = np.asarray(xy, dtype=float)
+    k = max(1, min(int(k), len(xy)))
+    rng = np.random.default_rng(seed)
+    centres = xy[[rng.integers(len(xy))]]
+    while len(centres) < k:
+        nearest = ((xy[:, None, :] - centres[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+        if nearest.sum() == 0:  # fewer distinct points than k
+            break
+        centres = np.vstack([centres, xy[rng.choice(len(xy), p=nearest / nearest.sum())]])
+
+    labels = np.full(len(xy), -1)
+    for _ in range(max_iter):
+        new_labels = ((xy[:, None, :] - centres[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+        if (new_labels == labels).all():
+            break
+        labels = new_labels
+        counts = np.bincount(labels, minlength=len(centres))
+        for axis in range(2):
+            sums = np.bincount(labels, weights=xy[:, axis], minlength=len(centres))
+            centres[:, axis] = np.where(counts > 0, sums / np.maximum(counts, 1), centres[:, axis])
+    return _first_seen_labels(labels)
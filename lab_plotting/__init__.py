@@ -0,0 +1,45 @@
+"""
+Shared plotting library behind the Lab, Soil and Rock results pages.
+
+Submodules are imported on first use, so a page only pays for the plotters it
+touches:
+
+    from lab_plotting import psd            # imports lab_plotting.psd only
+    import lab_plotting
+    lab_plotting.moisture.moisture_content_figures(df)   # loads moisture here
+"""
+
+import importlib
+
+
+_SUBMODULES = (
+    "benchmarks",
+    "boreholes",
+    "cache",
+    "cli",
+    "common",
+    "layout",
+    "loaders",
+    "moisture",
+    "plasticity",
+    "psd",
+    "rock_strength",
+    "screening",
+    "statistics",
+    "templates",
+    "widgets",
+)
+
+__all__ = list(_SUBMODULES)
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        module = importlib.import_module(f"{__name__}.{name}")
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_SUBMODULES))
@@ -0,0 +1,238 @@
+"""
+Common benchmark harness for every plot type.
+
+Each figure builder is timed on synthetic data for build + JSON serialisation
+(the server-side part of time-to-interactive) and the payload sent to the
+browser. Run with ``python -m lab_plotting.benchmarks``.
+"""
+
+import math
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from . import templates
+from .templates import scatter_trace
+
+
+SIEVE_SIZES = [75, 63, 37.5, 19, 9.5, 4.75, 2.36, 1.18, 0.6, 0.425, 0.3, 0.15, 0.075]
+
+
+def synthetic_lab_frames(n_samples=500, n_units=4, n_boreholes=20, seed=0):
+    # Frames shaped like the workbook sheets, one row per sample
+    rng = np.random.default_rng(seed)
+
+    def base():
+        from_m = rng.uniform(0, 30, n_samples).round(2)
+        return pd.DataFrame({
+            "ID": rng.choice([f"BH{i:02d}" for i in range(1, n_boreholes + 1)], n_samples),
+            "From (m)": from_m,
+            "To (m)": (from_m + 0.5).round(2),
+            "Geology Unit": rng.choice([f"Unit {i:02d}" for i in range(n_units)], n_samples),
+        })
+
+    psd = base()
+    passing = np.sort(rng.uniform(0, 100, (n_samples, len(SIEVE_SIZES))), axis=1)[:, ::-1]
+    passing[:, 0] = 100
+    for size, values in zip(SIEVE_SIZES, passing.T):
+        psd[size] = values.round(1)
+
+    atterberg = base()
+    atterberg["LL"] = rng.uniform(15, 90, n_samples).round(0)
+    atterberg["PI"] = (rng.uniform(0, 0.8, n_samples) * (atterberg["LL"] - 8)).clip(0).round(0)
+    atterberg["PL"] = atterberg["LL"] - atterberg["PI"]
+
+    moisture = base()
+    moisture["Elevation (m)"] = (300 - moisture["From (m)"]).round(2)
+    moisture["Moisture Content (%)"] = rng.uniform(5, 60, n_samples).round(1)
+
+    rock = base()
+    rock["Elevation (m)"] = (300 - rock["From (m)"]).round(2)
+    rock["Is(50) corrected (MPa)"] = rng.lognormal(0, 1, n_samples).round(2)
+    rock["UCS (MPa)"] = np.where(rng.random(n_samples) < 0.4,
+                                 (rock["Is(50) corrected (MPa)"] * rng.normal(20, 3, n_samples)).round(1), np.nan)
+    return {"PSD": psd, "Atterberg Limits": atterberg, "Moisture Content": moisture, "Rock Results": rock}
+
+
+def _first_unit(df):
+    return sorted(df["Geology Unit"].unique())[0]
+
+
+def _psd_curves(frames):
+    from .psd import psd_figure
+    return psd_figure(frames["PSD"], _first_unit(frames["PSD"]))
+
+
+def _psd_envelope(frames):
+    from .psd import psd_figure
+    return psd_figure(frames["PSD"], _first_unit(frames["PSD"]), mode="Envelope")
+
+
+def _casagrande(frames):
+    from .plasticity import casagrande_figure, prepare_atterberg
+    return casagrande_figure(prepare_atterberg(frames["Atterberg Limits"]))
+
+
+def _moisture(frames):
+    from .moisture import moisture_content_figures
+    df = frames["Moisture Content"]
+    return moisture_content_figures(df, [_first_unit(df)])[_first_unit(df)]
+
+
+def _pli(frames):
+    from .rock_strength import generate_pli_figure
+    return generate_pli_figure(frames["Rock Results"], _first_unit(frames["Rock Results"]))
+
+
+def _ucs(frames):
+    from .rock_strength import generate_ucs_figure
+    return generate_ucs_figure(frames["Rock Results"], _first_unit(frames["Rock Results"]))
+
+
+def _strength_classes(frames):
+    from .rock_strength import classify_rock_strength, strength_class_figure
+    return strength_class_figure(classify_rock_strength(frames["Rock Results"]), "Is(50)")
+
+
+def _small_multiples(frames):
+    from .layout import small_multiples_figure
+    return small_multiples_figure(frames["Moisture Content"], "Moisture Content (%)")
+
+
+# Plot type -> builder taking the synthetic frames and returning one figure
+PLOT_BENCHMARKS = {
+    "PSD curves": _psd_curves,
+    "PSD envelope": _psd_envelope,
+    "Casagrande": _casagrande,
+    "Moisture Content": _moisture,
+    "PLI": _pli,
+    "UCS": _ucs,
+    "Strength classes": _strength_classes,
+    "Small multiples": _small_multiples,
+}
+
+
+def time_figure(build):
+    # Build + serialise time (s), payload (kB) and trace count of one figure
+    start = time.perf_counter()
+    fig = build()
+    payload = fig.to_json()
+    return time.perf_counter() - start, len(payload) / 1024, len(fig.data)
+
+
+def benchmark_plot_types(sample_counts=(100, 1000, 5000), plot_types=None, n_units=4, seed=0):
+    plot_types = list(PLOT_BENCHMARKS) if plot_types is None else plot_types
+    rows = []
+    for n_samples in sample_counts:
+        frames = synthetic_lab_frames(n_samples, n_units=n_units, seed=seed)
+        for plot_type in plot_types:
+            seconds, payload_kb, n_traces = time_figure(lambda: PLOT_BENCHMARKS[plot_type](frames))
+            rows.append({
+                "Plot Type": plot_type,
+                "Samples": n_samples,
+                "Traces": n_traces,
+                "Build + Serialise (s)": round(seconds, 4),
+                "Payload (kB)": round(payload_kb, 1),
+            })
+    return pd.DataFrame(rows)
+
+
+def benchmark_render_size(point_counts=(500, 2000, 5000, 20000, 100000), threshold=None):
+    # Build a synthetic Casagrande-style scatter at each size and report the trace
+    # type picked by scatter_trace, build time and serialised figure size
+    threshold = templates.SCATTERGL_THRESHOLD if threshold is None else threshold
+    rng = np.random.default_rng(0)
+    rows = []
+    for n_points in point_counts:
+        ll = rng.uniform(10, 100, n_points)
+        pi = rng.uniform(0, 60, n_points)
+        for variant, variant_threshold in [("auto", threshold), ("svg", math.inf), ("webgl", -1)]:
+            seconds, payload_kb, _ = time_figure(
+                lambda: go.Figure(scatter_trace(n_points, variant_threshold, x=ll, y=pi, mode='markers')))
+            rows.append({
+                "Points": n_points,
+                "Variant": variant,
+                "Trace Type": "scattergl" if n_points > variant_threshold else "scatter",
+                "Build + Serialise (s)": round(seconds, 4),
+                "Payload (kB)": round(payload_kb, 1),
+            })
+    return pd.DataFrame(rows)
+
+
+def benchmark_small_multiples(unit_counts=(5, 10, 30), points_per_unit=200):
+    # Separate figure per unit vs one small-multiples figure: total JSON shipped to
+    # the browser and build + serialise time
+    from .layout import small_multiples_figure
+    from .moisture import moisture_content_figures
+
+    rows = []
+    for n_units in unit_counts:
+        df = synthetic_lab_frames(n_units * points_per_unit, n_units=n_units)["Moisture Content"]
+
+        start = time.perf_counter()
+        payloads = [fig.to_json() for fig in moisture_content_figures(df, trend_bin_size=None).values()]
+        rows.append({"Units": n_units, "Layout": "separate", "Figures": len(payloads),
+                     "Build + Serialise (s)": round(time.perf_counter() - start, 4),
+                     "Payload (kB)": round(sum(map(len, payloads)) / 1024, 1)})
+
+        seconds, payload_kb, _ = time_figure(lambda: small_multiples_figure(df, "Moisture Content (%)"))
+        rows.append({"Units": n_units, "Layout": "small multiples", "Figures": 1,
+                     "Build + Serialise (s)": round(seconds, 4),
+                     "Payload (kB)": round(payload_kb, 1)})
+    return pd.DataFrame(rows)
+
+
+def write_lab_exports(frames, directory):
+    # The same frames as an Excel workbook and as single-table CSV/Parquet exports
+    # with a Sheet column; returns format -> path
+    from .loaders import SHEET_COLUMN
+
+    paths = {fmt: os.path.join(directory, f"lab.{fmt}") for fmt in ("xlsx", "csv", "parquet")}
+    with pd.ExcelWriter(paths["xlsx"]) as writer:
+        for sheet, df in frames.items():
+            df.to_excel(writer, sheet_name=sheet, index=False)
+    table = pd.concat([df.assign(**{SHEET_COLUMN: sheet}) for sheet, df in frames.items()], ignore_index=True)
+    table.columns = table.columns.map(str)
+    table.to_csv(paths["csv"], index=False)
+    table.to_parquet(paths["parquet"], index=False)
+    return paths
+
+
+def benchmark_load_formats(sample_counts=(5000, 50000), sheet_names=("Rock Results",)):
+    # Load time of the sheets one plot needs from xlsx, CSV and Parquet holding the
+    # same dataset (every sheet at each sample count)
+    from .loaders import read_lab_sheets
+
+    rows = []
+    for n_samples in sample_counts:
+        frames = synthetic_lab_frames(n_samples)
+        with tempfile.TemporaryDirectory() as directory:
+            for fmt, path in write_lab_exports(frames, directory).items():
+                with open(path, "rb") as f:
+                    file_bytes = f.read()
+                start = time.perf_counter()
+                loaded = read_lab_sheets(file_bytes, path, list(sheet_names))
+                rows.append({
+                    "Format": fmt,
+                    "Rows per Sheet": n_samples,
+                    "File (kB)": round(len(file_bytes) / 1024, 1),
+                    "Sheets Read": ", ".join(sheet_names),
+                    "Rows Loaded": sum(len(df) for df in loaded.values()),
+                    "Load (s)": round(time.perf_counter() - start, 4),
+                })
+    return pd.DataFrame(rows)
+
+
+def main():
+    for benchmark in (benchmark_plot_types, benchmark_render_size, benchmark_small_multiples,
+                      benchmark_load_formats):
+        print(benchmark().to_string(index=False))
+        print()
+
+
+if __name__ == "__main__":
+    main()
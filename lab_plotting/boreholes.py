@@ -0,0 +1,127 @@
+"""
+Borehole log-style depth profiles: moisture, LL/PI, fines, Is(50) and UCS side
+by side against depth, for one or many boreholes.
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+from plotly.subplots import make_subplots
+
+from .common import add_flagged_markers, sample_labels, sample_position
+from .cache import frames_fingerprint
+from .psd import psd_contents
+from .templates import get_template, scatter_trace
+
+
+# Panel title -> (sheet, [(column, trace label, marker symbol)], log x-axis)
+PROFILE_PANELS = {
+    "Moisture Content (%)": ("Moisture Content", [("Moisture Content (%)", "MC", "circle")], False),
+    "LL / PI (%)": ("Atterberg Limits", [("LL", "LL", "triangle-up"), ("PI", "PI", "triangle-down")], False),
+    "Fines (%)": ("PSD", [("Fines Content", "Fines", "square")], False),
+    "Is(50) (MPa)": ("Rock Results", [("Is(50) corrected (MPa)", "Is(50)", "diamond")], True),
+    "UCS (MPa)": ("Rock Results", [("UCS (MPa)", "UCS", "star")], True),
+}
+PROFILE_SHEETS = sorted({sheet for sheet, _, _ in PROFILE_PANELS.values()})
+PROFILE_PANEL_WIDTH = 220
+PROFILE_HEIGHT = 700
+
+_BOREHOLE_INDEX_CACHE = {}
+
+
+class BoreholeIndex:
+    # Each sheet sorted once by ID and depth, with the row range of every borehole,
+    # so a borehole is a positional slice instead of a filter over the whole sheet
+
+    def __init__(self, frames, dataset_hash=None):
+        self.dataset_hash = dataset_hash
+        self.frames = {}
+        self.ranges = {}
+        for sheet in PROFILE_SHEETS:
+            df = frames.get(sheet)
+            if df is None or df.empty or "ID" not in df.columns:
+                continue
+            df = df.dropna(subset=["ID"])
+            if sheet == "PSD":
+                df = pd.concat([df, psd_contents(df)], axis=1)
+            df = df.assign(**{"Depth (m)": sample_position(df, "Depth (m)"), "ID": df["ID"].astype(str)})
+            df = df.sort_values(["ID", "Depth (m)"], kind="stable").reset_index(drop=True)
+
+            ids, starts = np.unique(df["ID"].to_numpy(), return_index=True)
+            stops = np.append(starts[1:], len(df))
+            self.frames[sheet] = df
+            self.ranges[sheet] = dict(zip(ids, zip(starts, stops)))
+
+    @property
+    def borehole_ids(self):
+        return sorted(set().union(*[ranges.keys() for ranges in self.ranges.values()]))
+
+    def rows(self, sheet, borehole_id):
+        # Rows of one borehole on one sheet (empty frame when it has none)
+        if sheet not in self.frames:
+            return pd.DataFrame()
+        start, stop = self.ranges[sheet].get(str(borehole_id), (0, 0))
+        return self.frames[sheet].iloc[start:stop]
+
+
+def borehole_index(frames, cache=None):
+    # Built once per dataset; uploaded frames are keyed on their load-time fingerprint
+    cache = _BOREHOLE_INDEX_CACHE if cache is None else cache
+    key = frames_fingerprint({sheet: frames[sheet] for sheet in PROFILE_SHEETS if sheet in frames})
+    if key not in cache:
+        cache.clear()  # only the current dataset is worth keeping
+        cache[key] = BoreholeIndex(frames, key)
+    return cache[key]
+
+
+def borehole_profile_figure(index, borehole_ids, depth_range=None, threshold=None):
+    # One subplot row, one column per parameter, sharing the (downward) depth axis.
+    # Each borehole keeps its colour across the panels and one legend entry.
+    panels = list(PROFILE_PANELS.items())
+    fig = make_subplots(rows=1, cols=len(panels), shared_yaxes=True, horizontal_spacing=0.02,
+                        subplot_titles=[title for title, _ in panels])
+    colors = px.colors.qualitative.Dark24
+    n_points = sum(len(index.rows(sheet, bh)) for bh in borehole_ids for sheet in PROFILE_SHEETS)
+
+    for b, bh in enumerate(borehole_ids):
+        color = colors[b % len(colors)]
+        in_legend = True
+        for col, (title, (sheet, columns, _)) in enumerate(panels, start=1):
+            rows = index.rows(sheet, bh)
+            for value_col, label, symbol in columns:
+                if value_col not in rows.columns:
+                    continue
+                data = rows.dropna(subset=[value_col, "Depth (m)"])
+                if data.empty:
+                    continue
+                hover = sample_labels(data) if {"From (m)", "To (m)"} <= set(data.columns) else None
+                fig.add_trace(scatter_trace(
+                    n_points, threshold,
+                    x=data[value_col], y=data["Depth (m)"],
+                    mode='lines+markers',
+                    marker=dict(symbol=symbol, size=7, color=color),
+                    line=dict(color=color, width=1, dash='dot' if label == "PI" else None),
+                    name=str(bh),
+                    legendgroup=str(bh),
+                    showlegend=in_legend,
+                    text=hover,
+                    hovertemplate=f'%{{text}}<br>{label}: %{{x}}<br>Depth: %{{y}} m<extra></extra>'
+                                  if hover is not None else None,
+                ), row=1, col=col)
+                in_legend = False
+                add_flagged_markers(fig, data, value_col, "Depth (m)", row=1, col=col)
+
+    for col, (title, (_, _, log_x)) in enumerate(panels, start=1):
+        fig.update_xaxes(type='log' if log_x else 'linear', row=1, col=col)
+    fig.update_yaxes(autorange=False if depth_range else 'reversed',
+                     range=list(depth_range)[::-1] if depth_range else None)
+    fig.update_yaxes(title_text="Depth (m)", col=1)
+    fig.update_layout(
+        title=dict(text=f"Lab Results vs Depth: {', '.join(map(str, borehole_ids))}", x=0.5, xanchor='center'),
+        height=PROFILE_HEIGHT,
+        width=PROFILE_PANEL_WIDTH * len(panels),
+        legend=dict(title='Borehole ID', orientation='h', y=-0.08, yanchor='top'),
+        margin=dict(l=60, r=30, t=80, b=60),
+        template=get_template("lab"),
+    )
+    return fig
@@ -0,0 +1,130 @@
+"""
+Figure memoisation: serialised figure JSON kept in an LRU with a memory cap,
+keyed on the input data slice and the style parameters of the plot.
+"""
+
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.io as pio
+
+from .loaders import lab_dataset_hash
+
+
+FIGURE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+FINGERPRINT_ATTR = "lab_fingerprint"
+
+
+def set_frame_fingerprint(df, fingerprint):
+    # Tags a loaded frame with an identifier of its content (e.g. upload hash and sheet),
+    # computed once at load. Pandas carries attrs over to slices and derived frames.
+    df.attrs[FINGERPRINT_ATTR] = fingerprint
+    return df
+
+
+def frame_fingerprint(df):
+    # Tagged frames: their source's fingerprint plus the shape and first/last row labels
+    # of the slice, so a cache hit costs O(1). The rest of what selects a slice (unit,
+    # filters) is in the figure key. Untagged frames are hashed in full.
+    source = df.attrs.get(FINGERPRINT_ATTR)
+    if source is None:
+        return lab_dataset_hash({"data": df})
+    ends = (df.index[0], df.index[-1]) if len(df) else ()
+    return f"{source}:{len(df)}:{ends!r}:{hash(tuple(map(str, df.columns)))}"
+
+
+def frames_fingerprint(frames):
+    # One key for a dict of sheet frames, from each frame's fingerprint
+    return "|".join(f"{sheet}={frame_fingerprint(frames[sheet])}" for sheet in sorted(frames))
+
+
+def figure_key(data, plot_type, unit=None, **style):
+    # data is the DataFrame (or dict of frames) the figure is built from, or an
+    # already computed hash. The WebGL threshold changes the traces, so callers pass it in the style.
+    if isinstance(data, pd.DataFrame):
+        data_hash = frame_fingerprint(data)
+    elif isinstance(data, dict):
+        data_hash = lab_dataset_hash(data)
+    else:
+        data_hash = str(data)
+    frozen_style = tuple(sorted((name, repr(value)) for name, value in style.items()))
+    return (data_hash, plot_type, unit, frozen_style)
+
+
+class FigureCache:
+    # Thread-safe: Streamlit runs each session on its own thread
+
+    def __init__(self, max_bytes=FIGURE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get_json(self, key):
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put_json(self, key, payload):
+        size = len(payload)
+        with self._lock:
+            if key in self._entries:
+                self.size_bytes -= len(self._entries.pop(key))
+            if size > self.max_bytes:
+                return
+            self._entries[key] = payload
+            self.size_bytes += size
+            while self.size_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= len(evicted)
+                self.evictions += 1
+
+    def get(self, key):
+        payload = self.get_json(key)
+        return None if payload is None else pio.from_json(payload, skip_invalid=True)
+
+    def put(self, key, fig):
+        self.put_json(key, fig.to_json())
+
+    def get_or_build(self, key, build):
+        # Cached figure for key, or build() it and store the result
+        fig = self.get(key)
+        if fig is None:
+            fig = build()
+            self.put(key, fig)
+        return fig
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_kb": round(self.size_bytes / 1024, 1),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Shared by every page and session in the process
+FIGURE_CACHE = FigureCache()
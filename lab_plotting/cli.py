@@ -0,0 +1,223 @@
+"""
+Headless batch renderer: every PSD, Casagrande, moisture, PLI and UCS chart
+of a workbook written to static files, without Streamlit.
+
+    python -m lab_plotting project.xlsx out/ --formats png pdf
+
+Figures are built and exported on a process pool. A manifest in the output
+directory records the hash of each figure's input slice, so re-runs only
+re-render the charts whose data changed.
+"""
+
+import argparse
+import importlib.util
+import json
+import math
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .loaders import lab_dataset_hash, lab_sheet_names, read_lab_sheets
+from .screening import screen_lab_frames
+
+
+IMAGE_FORMATS = ("png", "svg", "pdf")
+EXPORT_FORMATS = IMAGE_FORMATS + ("html",)
+PLOT_TYPES = ("psd", "casagrande", "moisture", "pli", "ucs")
+MANIFEST_NAME = ".render_manifest.json"
+RENDER_VERSION = 2  # bump when the figure builders change so old outputs are re-rendered
+
+# Plot type -> (sheet, columns a sample needs to be plotted)
+PLOT_INPUTS = {
+    "psd": ("PSD", []),
+    "casagrande": ("Atterberg Limits", ["LL", "PI"]),
+    "moisture": ("Moisture Content", ["Elevation (m)", "Moisture Content (%)"]),
+    "pli": ("Rock Results", ["Elevation (m)", "Is(50) corrected (MPa)"]),
+    "ucs": ("Rock Results", ["Elevation (m)", "UCS (MPa)"]),
+}
+
+
+def _safe_name(text):
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", str(text)).strip("_") or "unnamed"
+
+
+def build_figure(plot_type, df, unit, threshold=None):
+    # Same builders as the Streamlit pages; axes fitted to the data for reports
+    if plot_type == "psd":
+        from .psd import psd_figure
+        return psd_figure(df, unit, threshold=threshold)
+    if plot_type == "casagrande":
+        from .plasticity import casagrande_figure, prepare_atterberg
+        return casagrande_figure(prepare_atterberg(df), [unit], threshold=threshold)
+    if plot_type == "moisture":
+        from .moisture import moisture_content_figures
+        return moisture_content_figures(df, [unit], threshold=threshold)[unit]
+    if plot_type == "pli":
+        from .rock_strength import generate_pli_figure
+        return generate_pli_figure(df, unit, elevation_range=None, threshold=threshold)
+    if plot_type == "ucs":
+        from .rock_strength import generate_ucs_figure
+        return generate_ucs_figure(df, unit, elevation_range=None, threshold=threshold)
+    raise ValueError(f"Unknown plot type '{plot_type}'")
+
+
+def plan_jobs(frames, plot_types, sheet_names=None):
+    # One job per (plot type, geology unit) with the hash of the rows it plots
+    sheet_names = sheet_names or {}
+    jobs = []
+    for plot_type in plot_types:
+        default_sheet, required = PLOT_INPUTS[plot_type]
+        df = frames.get(sheet_names.get(default_sheet, default_sheet))
+        if df is None or df.empty or "Geology Unit" not in df.columns:
+            continue
+        df = df.dropna(subset=["Geology Unit"] + [col for col in required if col in df.columns])
+        for unit, df_unit in df.groupby("Geology Unit", sort=True):
+            jobs.append({
+                "plot_type": plot_type,
+                "unit": unit,
+                "stem": f"{plot_type}_{_safe_name(unit)}",
+                "hash": lab_dataset_hash({plot_type: df_unit}),
+                "data": df_unit,
+            })
+    return jobs
+
+
+def _render_job(job, out_dir, formats, scale):
+    # Runs in a worker process. Static exports have no interactivity, so always draw SVG traces
+    fig = build_figure(job["plot_type"], job["data"], job["unit"], threshold=math.inf)
+    paths = []
+    for fmt in formats:
+        path = os.path.join(out_dir, f"{job['stem']}.{fmt}")
+        if fmt == "html":
+            fig.write_html(path, include_plotlyjs="cdn")
+        else:
+            fig.write_image(path, format=fmt, scale=scale)
+        paths.append(path)
+    return job["stem"], paths
+
+
+def load_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def _job_signature(job, scale):
+    return f"{RENDER_VERSION}:{job['hash']}:{scale}"
+
+
+def _is_current(job, manifest, out_dir, formats, scale):
+    entry = manifest.get(job["stem"])
+    if not entry or entry.get("signature") != _job_signature(job, scale):
+        return False
+    return all(os.path.exists(os.path.join(out_dir, f"{job['stem']}.{fmt}")) for fmt in formats)
+
+
+def render_workbook(workbook, out_dir, formats=("png",), plot_types=PLOT_TYPES, workers=None,
+                    force=False, scale=2, rock_sheet="Rock Results", log=print):
+    # Returns a summary dict; raises RuntimeError when image export is unavailable
+    formats = list(dict.fromkeys(formats))
+    if any(fmt in IMAGE_FORMATS for fmt in formats) and importlib.util.find_spec("kaleido") is None:
+        raise RuntimeError("PNG/SVG/PDF export needs the optional 'kaleido' package: pip install kaleido "
+                           "(or use --formats html)")
+
+    start = time.perf_counter()
+    with open(workbook, "rb") as f:
+        file_bytes = f.read()
+    sheet_names = {"Rock Results": rock_sheet}
+    wanted = {sheet_names.get(PLOT_INPUTS[p][0], PLOT_INPUTS[p][0]) for p in plot_types}
+    available = lab_sheet_names(file_bytes, workbook)
+    missing = sorted(wanted - set(available))
+    for sheet in missing:
+        log(f"Skipping sheet '{sheet}': not in workbook")
+    # QA screened, so the flagged samples are marked in the exported charts too
+    frames = screen_lab_frames(read_lab_sheets(file_bytes, workbook, sorted(wanted & set(available))))
+    load_seconds = time.perf_counter() - start
+
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {} if force else load_manifest(out_dir)
+    jobs = plan_jobs(frames, plot_types, sheet_names)
+    todo = [job for job in jobs if force or not _is_current(job, manifest, out_dir, formats, scale)]
+    skipped = len(jobs) - len(todo)
+
+    render_start = time.perf_counter()
+    failures = []
+    rendered = 0
+    if todo:
+        by_stem = {job["stem"]: job for job in todo}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_render_job, job, out_dir, formats, scale): job["stem"] for job in todo}
+            for future in as_completed(futures):
+                stem = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    failures.append((stem, str(e)))
+                    log(f"Failed {stem}: {e}")
+                    continue
+                rendered += 1
+                manifest[stem] = {"signature": _job_signature(by_stem[stem], scale),
+                                  "formats": formats}
+        save_manifest(out_dir, manifest)
+    render_seconds = time.perf_counter() - render_start
+
+    return {
+        "figures": len(jobs),
+        "rendered": rendered,
+        "skipped": skipped,
+        "failed": len(failures),
+        "files": rendered * len(formats),
+        "load_seconds": load_seconds,
+        "render_seconds": render_seconds,
+        "figures_per_second": rendered / render_seconds if rendered and render_seconds > 0 else 0.0,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m lab_plotting",
+        description="Render every lab chart in a workbook to static files.",
+    )
+    parser.add_argument("workbook", help="Excel workbook (or CSV/Parquet export) with the PSD/Atterberg/"
+                                         "Moisture/Rock sheets")
+    parser.add_argument("out_dir", help="output directory (created if missing)")
+    parser.add_argument("--formats", nargs="+", choices=EXPORT_FORMATS, default=["png"],
+                        help="export formats (default: png)")
+    parser.add_argument("--plots", nargs="+", choices=PLOT_TYPES, default=list(PLOT_TYPES),
+                        help="plot types to render (default: all)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--scale", type=float, default=2, help="image scale factor for PNG (default: 2)")
+    parser.add_argument("--rock-sheet", default="Rock Results", help="sheet holding PLI/UCS results")
+    parser.add_argument("--force", action="store_true", help="re-render figures even if their data is unchanged")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        summary = render_workbook(args.workbook, args.out_dir, formats=args.formats, plot_types=args.plots,
+                                  workers=args.workers, force=args.force, scale=args.scale,
+                                  rock_sheet=args.rock_sheet)
+    except (RuntimeError, OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    print(f"{summary['rendered']} rendered, {summary['skipped']} unchanged, {summary['failed']} failed "
+          f"of {summary['figures']} figures ({summary['files']} files)")
+    print(f"workbook load {summary['load_seconds']:.2f} s, render {summary['render_seconds']:.2f} s, "
+          f"{summary['figures_per_second']:.1f} figures/sec")
+    return 1 if summary["failed"] else 0
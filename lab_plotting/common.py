@@ -0,0 +1,72 @@
+"""
+Sample labelling and marker helpers used across the plot types.
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from . import templates
+from .screening import QA_FLAGS_COLUMN, is_flagged
+
+
+def sample_labels(df):
+    return df['ID'].astype(str) + ": " + df['From (m)'].astype(str) + " - " + df['To (m)'].astype(str) + "m"
+
+
+def sample_position(df, bin_by):
+    if bin_by == "Depth (m)":
+        # Sample mid-depth, or whichever of From/To is recorded
+        depths = [pd.to_numeric(df[col], errors='coerce') for col in ['From (m)', 'To (m)'] if col in df.columns]
+        if depths:
+            return pd.concat(depths, axis=1).mean(axis=1)
+    elif bin_by in df.columns:
+        return pd.to_numeric(df[bin_by], errors='coerce')
+    return pd.Series(np.nan, index=df.index)
+
+
+def add_sample_markers(fig, df, x_col, showlegend=False, y_col="Elevation (m)", threshold=None):
+    # One trace per sample keeps the per-sample legend; above the threshold the
+    # samples collapse into a single WebGL trace with the label on hover
+    threshold = templates.SCATTERGL_THRESHOLD if threshold is None else threshold
+    labels = sample_labels(df)
+    if len(df) > threshold:
+        fig.add_trace(go.Scattergl(
+            x=df[x_col],
+            y=df[y_col],
+            mode='markers',
+            marker=dict(symbol='circle', size=8),
+            text=labels,
+            hovertemplate='%{text}<br>%{x}<br>%{y}<extra></extra>',
+            name=x_col,
+            showlegend=False
+        ))
+        return
+
+    for label, x, y in zip(labels, df[x_col], df[y_col]):
+        fig.add_trace(go.Scatter(
+            x=[x],
+            y=[y],
+            mode='markers',
+            marker=dict(symbol='circle', size=8),
+            name=label,
+            showlegend=showlegend
+        ))
+
+
+def add_flagged_markers(fig, df, x_col, y_col="Elevation (m)", **subplot):
+    # Red ring over every sample whose x or y value failed the QA screening
+    flagged = df[is_flagged(df, [x_col, y_col])].dropna(subset=[x_col, y_col])
+    if flagged.empty:
+        return
+    fig.add_trace(go.Scatter(
+        x=flagged[x_col],
+        y=flagged[y_col],
+        mode='markers',
+        marker=dict(symbol='circle-open', size=14, color='red', line=dict(width=2)),
+        text=flagged[QA_FLAGS_COLUMN],
+        hovertemplate='QA: %{text}<extra></extra>',
+        name="QA flagged",
+        legendgroup="QA flagged",
+        showlegend=not subplot
+    ), **subplot)
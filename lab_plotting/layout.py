@@ -0,0 +1,69 @@
+"""
+Small-multiples layout: every geology unit as a panel of one subplot figure.
+"""
+
+import math
+
+from plotly.subplots import make_subplots
+
+from .common import add_flagged_markers, sample_labels
+from .templates import get_template, scatter_trace
+
+
+SMALL_MULTIPLES_COLUMNS = 3
+SMALL_MULTIPLES_PAGE_SIZE = 12  # panels rendered up front; the rest load on demand
+SMALL_MULTIPLES_PANEL_HEIGHT = 300
+
+
+def small_multiples_figure(df, x_col, y_col="Elevation (m)", units=None, columns=SMALL_MULTIPLES_COLUMNS,
+                           reference_lines=None, x_title=None, y_title="Elevation (m AHD)", x_range=None,
+                           title=None, panel_height=SMALL_MULTIPLES_PANEL_HEIGHT, threshold=None):
+    # One subplot figure, one trace per geology unit panel, a single shared layout
+    # and template in place of a separate figure per unit
+    df = df.dropna(subset=["Geology Unit", x_col, y_col])
+    units = sorted(df["Geology Unit"].unique()) if units is None else list(units)
+    n_rows = max(1, math.ceil(len(units) / columns))
+    fig = make_subplots(
+        rows=n_rows, cols=columns,
+        subplot_titles=[str(unit) for unit in units],
+        shared_xaxes='all',
+        horizontal_spacing=0.06,
+        vertical_spacing=min(0.08, 0.3 / n_rows),
+    )
+
+    groups = df.groupby("Geology Unit", sort=False)
+    for i, unit in enumerate(units):
+        if unit not in groups.groups:
+            continue
+        df_unit = groups.get_group(unit)
+        hover = sample_labels(df_unit) if {'ID', 'From (m)', 'To (m)'} <= set(df_unit.columns) else None
+        fig.add_trace(scatter_trace(
+            len(df), threshold,
+            x=df_unit[x_col], y=df_unit[y_col],
+            mode='markers',
+            marker=dict(size=5, color='steelblue'),
+            text=hover,
+            hovertemplate='%{text}<br>%{x}<br>%{y}<extra></extra>' if hover is not None else None,
+            name=str(unit),
+            showlegend=False
+        ), row=i // columns + 1, col=i % columns + 1)
+        add_flagged_markers(fig, df_unit, x_col, y_col, row=i // columns + 1, col=i % columns + 1)
+
+    for val in reference_lines or []:
+        fig.add_vline(x=val, line=dict(dash='dash', color='red', width=1), row='all', col='all')
+
+    fig.update_xaxes(showline=True, linecolor='black', mirror=True, showgrid=True, gridcolor='lightgray')
+    fig.update_yaxes(showline=True, linecolor='black', mirror=True, showgrid=True, gridcolor='lightgray')
+    if x_range is not None:
+        fig.update_xaxes(range=x_range)
+    # Axis titles only on the outer panels
+    fig.update_xaxes(title_text=x_title or x_col, row=n_rows)
+    fig.update_yaxes(title_text=y_title, col=1)
+    fig.update_layout(
+        title=dict(text=title, x=0.5, xanchor='center') if title else None,
+        height=panel_height * n_rows,
+        font=dict(family='Arial'),
+        margin=dict(l=60, r=30, t=80 if title else 40, b=50),
+        template=get_template("lab"),
+    )
+    return fig
@@ -0,0 +1,190 @@
+"""
+Workbook reading shared by the pages: only the requested sheets are parsed,
+through a single workbook handle. CSV and Parquet exports of the lab database
+are read with only the columns the plots use.
+"""
+
+import hashlib
+from io import BytesIO
+
+import openpyxl
+import pandas as pd
+
+
+# Columns coerced to float on load; text in these cells becomes NaN
+NUMERIC_COLUMNS = [
+    'From (m)', 'To (m)', 'Elevation (m)', 'LL', 'PL', 'PI',
+    'Moisture Content (%)', 'Is(50) corrected (MPa)', 'UCS (MPa)',
+]
+
+TABLE_EXTENSIONS = (".csv", ".parquet")
+# In a CSV/Parquet export of several sheets, this column names the sheet of each row
+SHEET_COLUMN = "Sheet"
+CSV_CHUNK_ROWS = 50_000
+
+# Columns each sheet's plots read; numeric headers (PSD sieve sizes) are kept
+# for "PSD". Other sheet names get every column listed here.
+_SAMPLE_COLUMNS = ['ID', 'From (m)', 'To (m)', 'Elevation (m)', 'Geology Unit']
+SHEET_COLUMNS = {
+    "PSD": ['ID', 'From (m)', 'To (m)', 'Geology Unit'],
+    "Atterberg Limits": _SAMPLE_COLUMNS + ['LL', 'PL', 'PI'],
+    "Moisture Content": _SAMPLE_COLUMNS + ['Moisture Content (%)'],
+    "Rock Results": _SAMPLE_COLUMNS + ['Is(50) corrected (MPa)', 'UCS (MPa)'],
+}
+
+
+def _excel_value(value):
+    # Match pd.read_excel: whole-number floats come back as int
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _header_value(header):
+    # Text headers from CSV/Parquet: "0.075" -> 0.075 and "63" -> 63, as Excel gives them
+    try:
+        return _excel_value(float(header))
+    except (TypeError, ValueError):
+        return header
+
+
+def _typed_frame(df):
+    df = df.dropna(how='all').reset_index(drop=True)
+    for col in df.columns:
+        if col in NUMERIC_COLUMNS or not isinstance(col, str):
+            # Named numeric columns plus the numeric sieve-size headers on the PSD sheet
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def _typed_sheet_frame(rows):
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame()
+
+    header = [_excel_value(h) for h in header]
+    keep = [i for i, h in enumerate(header) if h is not None]
+    records = [[row[i] if i < len(row) else None for i in keep] for row in rows]
+    return _typed_frame(pd.DataFrame(records, columns=[header[i] for i in keep]))
+
+
+def _projected_columns(header, sheet_names):
+    # Header names (as in the file) that the requested sheets' plots read
+    wanted = {SHEET_COLUMN}
+    sieves = False
+    for sheet in sheet_names:
+        wanted.update(SHEET_COLUMNS.get(sheet, NUMERIC_COLUMNS + _SAMPLE_COLUMNS))
+        sieves = sieves or sheet == "PSD" or sheet not in SHEET_COLUMNS
+    return [h for h in header
+            if h in wanted or (sieves and not isinstance(_header_value(h), str))]
+
+
+def _split_sheets(df, sheet_names, frames):
+    # Rows go to their sheet when the export has a Sheet column, else to every sheet
+    if SHEET_COLUMN not in df.columns:
+        for sheet in sheet_names:
+            frames.setdefault(sheet, []).append(df)
+        return
+    for sheet, rows in df[df[SHEET_COLUMN].isin(sheet_names)].groupby(SHEET_COLUMN, sort=False):
+        frames.setdefault(sheet, []).append(rows.drop(columns=SHEET_COLUMN))
+
+
+def _pyarrow_parquet():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Reading Parquet needs the optional 'pyarrow' package: pip install pyarrow")
+    return pq
+
+
+def read_lab_table(file_bytes, file_name, sheet_names):
+    # CSV/Parquet export: one sheet, or several with a Sheet column. Only the
+    # projected columns are read; CSVs are streamed in chunks so the unused
+    # rows of other sheets are never held in memory at once.
+    parts = {}
+    multi_sheet = False
+    if str(file_name).lower().endswith(".parquet"):
+        pq = _pyarrow_parquet()
+        columns = _projected_columns(pq.read_schema(BytesIO(file_bytes)).names, sheet_names)
+        # Row groups of other sheets are filtered out by pyarrow before conversion
+        multi_sheet = SHEET_COLUMN in columns
+        filters = [(SHEET_COLUMN, "in", list(sheet_names))] if multi_sheet else None
+        table = pq.read_table(BytesIO(file_bytes), columns=columns, filters=filters)
+        _split_sheets(table.to_pandas(), sheet_names, parts)
+    else:
+        header = pd.read_csv(BytesIO(file_bytes), nrows=0).columns
+        columns = _projected_columns(header, sheet_names)
+        multi_sheet = SHEET_COLUMN in columns
+        dtype = {SHEET_COLUMN: str, 'ID': str, 'Geology Unit': str}
+        for chunk in pd.read_csv(BytesIO(file_bytes), usecols=columns, chunksize=CSV_CHUNK_ROWS,
+                                 dtype={col: t for col, t in dtype.items() if col in columns}):
+            _split_sheets(chunk, sheet_names, parts)
+
+    frames = {}
+    for sheet in sheet_names:
+        if sheet not in parts:
+            raise ValueError(f"Sheet '{sheet}' not found in {file_name}")
+        df = pd.concat(parts[sheet], ignore_index=True)
+        if multi_sheet:
+            # The shared table also carries the other sheets' columns, empty on these rows
+            df = df[_projected_columns(df.columns, [sheet])].dropna(axis=1, how='all')
+        frames[sheet] = _typed_frame(df.rename(columns=_header_value))
+    return frames
+
+
+def read_lab_sheets(file_bytes, file_name, sheet_names):
+    # Parse the requested sheets through one workbook handle
+    if str(file_name).lower().endswith(TABLE_EXTENSIONS):
+        return read_lab_table(file_bytes, file_name, sheet_names)
+    if str(file_name).lower().endswith(".xls"):
+        # Legacy .xls is not readable by openpyxl
+        with pd.ExcelFile(BytesIO(file_bytes)) as workbook:
+            frames = {}
+            for sheet in sheet_names:
+                if sheet not in workbook.sheet_names:
+                    raise ValueError(f"Worksheet named '{sheet}' not found")
+                frames[sheet] = _typed_frame(workbook.parse(sheet).rename(columns=_header_value))
+            return frames
+
+    workbook = openpyxl.load_workbook(BytesIO(file_bytes), read_only=True, data_only=True)
+    try:
+        frames = {}
+        for sheet in sheet_names:
+            if sheet not in workbook.sheetnames:
+                raise ValueError(f"Worksheet named '{sheet}' not found")
+            frames[sheet] = _typed_sheet_frame(workbook[sheet].iter_rows(values_only=True))
+        return frames
+    finally:
+        workbook.close()
+
+
+def lab_dataset_hash(frames):
+    # Content hash of the loaded sheets, independent of the file they came from
+    digest = hashlib.md5()
+    for sheet in sorted(frames):
+        df = frames[sheet]
+        digest.update(str(sheet).encode())
+        digest.update("|".join(map(str, df.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def lab_sheet_names(file_bytes, file_name):
+    # Sheets available in a workbook, or in a CSV/Parquet export's Sheet column.
+    # An export without one is a single sheet, offered under every known sheet name.
+    name = str(file_name).lower()
+    if name.endswith(".parquet"):
+        columns = _pyarrow_parquet().read_schema(BytesIO(file_bytes)).names
+        if SHEET_COLUMN not in columns:
+            return list(SHEET_COLUMNS)
+        sheets = pd.read_parquet(BytesIO(file_bytes), columns=[SHEET_COLUMN])[SHEET_COLUMN]
+        return sorted(sheets.dropna().unique())
+    if name.endswith(".csv"):
+        if SHEET_COLUMN not in pd.read_csv(BytesIO(file_bytes), nrows=0).columns:
+            return list(SHEET_COLUMNS)
+        sheets = set()
+        for chunk in pd.read_csv(BytesIO(file_bytes), usecols=[SHEET_COLUMN], dtype=str, chunksize=CSV_CHUNK_ROWS):
+            sheets.update(chunk[SHEET_COLUMN].dropna().unique())
+        return sorted(sheets)
+    with pd.ExcelFile(BytesIO(file_bytes)) as workbook:
+        return workbook.sheet_names
@@ -0,0 +1,92 @@
+"""
+Moisture content versus elevation, per borehole with a binned trend.
+"""
+
+import numpy as np
+import plotly.graph_objects as go
+
+from .common import add_flagged_markers
+from .templates import get_template, scatter_trace
+
+
+MOISTURE_TREND_BIN_SIZE = 2.0  # m
+MOISTURE_TREND_AUTO_POINTS = 500  # units with more samples default to the trend only
+
+
+def binned_trend(df, x_col, y_col="Elevation (m)", bin_size=MOISTURE_TREND_BIN_SIZE):
+    # Median and P10/P90 of x_col per y_col bin, all bins in one groupby
+    data = df[[x_col, y_col]].dropna()
+    bins = np.floor(data[y_col] / bin_size) * bin_size + bin_size / 2
+    grouped = data[x_col].groupby(bins.rename(y_col))
+    trend = grouped.quantile([0.1, 0.5, 0.9]).unstack()
+    trend.columns = ["P10", "P50", "P90"]
+    trend["Count"] = grouped.size()
+    return trend.reset_index()
+
+
+def add_trend_traces(fig, trend, y_col="Elevation (m)", name="Median", color="black"):
+    # Shaded P10-P90 band with the median line on top
+    band_x = np.concatenate([trend["P10"].to_numpy(), trend["P90"].to_numpy()[::-1]])
+    band_y = np.concatenate([trend[y_col].to_numpy(), trend[y_col].to_numpy()[::-1]])
+    fig.add_trace(go.Scatter(
+        x=band_x, y=band_y, fill='toself', mode='lines', line=dict(width=0),
+        fillcolor='rgba(0,0,0,0.12)', name="P10-P90", hoverinfo='skip'
+    ))
+    fig.add_trace(go.Scatter(
+        x=trend["P50"], y=trend[y_col], mode='lines+markers', name=name,
+        line=dict(color=color, width=2), marker=dict(size=5),
+        customdata=trend[["P10", "P90", "Count"]],
+        hovertemplate="Median: %{x:.1f}%<br>P10-P90: %{customdata[0]:.1f}-%{customdata[1]:.1f}%"
+                      "<br>n = %{customdata[2]}<br>Elevation: %{y}<extra></extra>"
+    ))
+
+
+def moisture_content_figures(df, units=None, show_samples=True, trend_bin_size=MOISTURE_TREND_BIN_SIZE,
+                             threshold=None):
+    # One figure per unit. The frame is sorted once and split into per-borehole
+    # series by a single groupby instead of masking the unit frame per borehole.
+    required_cols = ['Geology Unit', 'ID', 'Elevation (m)', 'Moisture Content (%)']
+    df = df.dropna(subset=required_cols)
+    if units is not None:
+        df = df[df["Geology Unit"].isin(units)]
+    df = df.sort_values(['Geology Unit', 'ID', 'Elevation (m)'], kind='stable')
+    unit_sizes = df.groupby("Geology Unit", sort=False).size()
+
+    figures = {}
+    for unit in (units if units is not None else unit_sizes.index):
+        if unit in unit_sizes.index:
+            figures[unit] = go.Figure()
+
+    if show_samples:
+        for (unit, bh_id), bh_data in df.groupby(['Geology Unit', 'ID'], sort=False):
+            figures[unit].add_trace(scatter_trace(
+                unit_sizes[unit], threshold,
+                x=bh_data['Moisture Content (%)'],
+                y=bh_data['Elevation (m)'],
+                mode='markers',
+                name=str(bh_id),
+                marker=dict(size=6),
+                line=dict(width=1),
+                opacity=0.8
+            ))
+
+    if trend_bin_size:
+        for unit, df_unit in df.groupby('Geology Unit', sort=False):
+            add_trend_traces(figures[unit], binned_trend(df_unit, 'Moisture Content (%)', bin_size=trend_bin_size),
+                             name=f"Median ({trend_bin_size:g} m bins)")
+
+    for unit, df_unit in df.groupby('Geology Unit', sort=False):
+        add_flagged_markers(figures[unit], df_unit, 'Moisture Content (%)')
+
+    for unit, fig in figures.items():
+        fig.update_layout(
+            title=dict(text=f"Elevation vs Moisture Content – {unit}", x=0.5, xanchor="center"),
+            xaxis=dict(title="Moisture Content (%)", range=[0, 100], dtick=10),
+            yaxis=dict(title="Elevation (m)", autorange=True),
+            height=600,
+            width=800,
+            legend=dict(yanchor="bottom",y=-0.3, orientation="h"),
+            margin=dict(t=40, b=40, l=40, r=40),
+            template=get_template("default"),
+        )
+    return figures
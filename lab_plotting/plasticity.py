@@ -0,0 +1,135 @@
+"""
+Casagrande plasticity chart and zone classification of Atterberg limits.
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from .common import add_flagged_markers
+from .templates import get_template, scatter_trace
+
+
+# A-line and U-line functions
+def a_line(ll): return 0.73 * (ll - 20)
+def u_line(ll): return 0.9 * (ll - 8)
+
+
+CASAGRANDE_CLASSES = ["CL", "CI", "CH", "CL-ML", "ML", "MH", "Above U-line"]
+
+
+def classify_casagrande(ll, pi):
+    # Zone for every LL/PI pair using array comparisons against the A-line/U-line
+    ll = np.asarray(ll, dtype=float)
+    pi = np.asarray(pi, dtype=float)
+    above_a_line = pi >= a_line(ll)
+    clay = above_a_line & (pi >= 7.5)
+
+    conditions = [
+        np.isnan(ll) | np.isnan(pi),
+        pi > u_line(ll),
+        clay & (ll < 35),
+        clay & (ll < 50),
+        clay,
+        above_a_line & (pi >= 4),
+        ll < 50,
+    ]
+    choices = ["", "Above U-line", "CL", "CI", "CH", "CL-ML", "ML"]
+    return np.select(conditions, choices, default="MH")
+
+
+def prepare_atterberg(df_atterberg):
+    # Numeric LL/PI, complete rows only, with the Casagrande zone of each sample
+    df_atterberg = df_atterberg.copy()
+    df_atterberg['LL'] = pd.to_numeric(df_atterberg['LL'], errors='coerce')
+    df_atterberg['PI'] = pd.to_numeric(df_atterberg['PI'], errors='coerce')
+    df_atterberg = df_atterberg.dropna(subset=['ID', 'From (m)', 'LL', 'PI', 'Geology Unit'])
+    df_atterberg['Casagrande Class'] = classify_casagrande(df_atterberg['LL'], df_atterberg['PI'])
+    return df_atterberg
+
+
+def casagrande_class_counts(df_atterberg):
+    # Samples per zone for each geology unit
+    counts = pd.crosstab(df_atterberg['Geology Unit'], df_atterberg['Casagrande Class'])
+    ordered = [c for c in CASAGRANDE_CLASSES if c in counts.columns]
+    counts = counts[ordered]
+    counts['Total'] = counts.sum(axis=1)
+    return counts
+
+
+def casagrande_figure(df_atterberg, units=None, threshold=None):
+    # Expects prepare_atterberg output; one trace per unit in the given order
+    units = sorted(df_atterberg['Geology Unit'].unique()) if units is None else list(units)
+
+    # A-line and U-line values
+    A_ll_vals = np.linspace((4 / 0.73) + 20, 100, 200)
+    U_ll_vals = np.linspace((7.5 / 0.9) + 8, 100, 200)
+    a_line_vals = a_line(A_ll_vals)
+    u_line_vals = u_line(U_ll_vals)
+
+    fig = go.Figure()
+
+    # Plot filtered data, one trace per unit; hover text is assembled client-side from customdata
+    unit_groups = dict(tuple(df_atterberg.groupby('Geology Unit', sort=False)))
+    for unit in units:
+        unit_data = unit_groups.get(unit)
+        if unit_data is None:
+            continue
+        fig.add_trace(scatter_trace(
+            len(df_atterberg), threshold,
+            x=unit_data['LL'],
+            y=unit_data['PI'],
+            mode='markers',
+            name=unit,
+            customdata=np.column_stack([
+                unit_data['ID'].astype(str), unit_data['From (m)'],
+                unit_data['To (m)'], unit_data['Casagrande Class'],
+            ]),
+            hovertemplate=(
+                '<b>Sample:</b> %{customdata[0]}@%{customdata[1]:.2f}-%{customdata[2]:.2f}'
+                '<br>LL: %{x:.1f}<br>PI: %{y:.1f}<br>Class: %{customdata[3]}<extra></extra>'
+            ),
+            opacity=0.6
+        ))
+
+    add_flagged_markers(fig, df_atterberg[df_atterberg['Geology Unit'].isin(units)], 'LL', 'PI')
+
+    # A-line and U-line
+    fig.add_trace(go.Scatter(x=A_ll_vals, y=a_line_vals, mode='lines', name='A-line', line=dict(color='black')))
+    fig.add_trace(go.Scatter(x=U_ll_vals, y=u_line_vals, mode='lines', name='U-line', line=dict(color='black', dash='dot')))
+
+    # Horizontal CL & ML lines
+    a_line_cl_x = (7.5 / 0.73) + 20
+    a_line_ml_x = (4 / 0.73) + 20
+    fig.add_trace(go.Scatter(x=[0, a_line_cl_x], y=[7.5, 7.5], mode='lines', name='PI = 7.5', line=dict(color='black', dash='dot')))
+    fig.add_trace(go.Scatter(x=[0, a_line_ml_x], y=[4, 4], mode='lines', name='PI = 4', line=dict(color='black', dash='dot')))
+
+    # Vertical LL markers
+    fig.add_shape(type='line', x0=35, x1=35, y0=a_line(35), y1=u_line(35), line=dict(color='black'))
+    fig.add_shape(type='line', x0=50, x1=50, y0=0, y1=u_line(50), line=dict(color='black'))
+
+    # Annotations
+    annotations = [
+        dict(x=70, y=45, text="CH or OH", showarrow=False),
+        dict(x=80, y=20, text="MH or OH", showarrow=False),
+        dict(x=43, y=24, text="CI or OI", showarrow=False),
+        dict(x=29, y=14, text="CL or OL", showarrow=False),
+        dict(x=40, y=5, text="CL - ML", showarrow=False),
+        dict(x=17, y=6, text="ML or OL", showarrow=False),
+        dict(x=90, y=a_line(90)-2, text="A-line", showarrow=False, textangle=-42.5),
+        dict(x=60, y=u_line(60)+2, text="U-line", showarrow=False, textangle=-45.5),
+    ]
+    fig.update_layout(annotations=annotations)
+
+    # Axes and layout
+    title = "Casagrande Plasticity Chart" + (f" - {units[0]}" if len(units) == 1 else "")
+    fig.update_layout(
+        title=dict(text=title, x=0.5,xanchor="center"),
+        xaxis=dict(title="Liquid Limit (%)", range=[0, 100], showgrid=True, dtick=10, showline=True, mirror=True),
+        yaxis=dict(title="Plasticity Index (%)", range=[0, 80], showgrid=True, showline=True, mirror=True),
+        legend=dict(yanchor="bottom", y=-0.35, orientation="h", bgcolor='rgba(255,255,255,0.7)', borderwidth=1),
+        margin=dict(t=40, b=40, l=40, r=40),
+        height=600,
+        template=get_template("default")
+    )
+    return fig
@@ -0,0 +1,254 @@
+"""
+Particle size distribution curves, envelopes and gravel/sand/fines contents.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from .templates import get_template, scatter_trace
+
+
+PSD_ENVELOPE_PERCENTILES = [10, 50, 90]
+PSD_ENVELOPE_AUTO_SAMPLES = 30  # units with more samples open in envelope mode
+PSD_META_COLUMNS = ['ID', 'From (m)', 'To (m)', 'Geology Unit', 'QA Flags']
+
+# Ranges
+GRAVEL_RANGE = (2.36, 63)
+SAND_RANGE = (0.075, 2.36)
+FINES_RANGE = (0.001, 0.075)
+
+MINOR_TICKS = [  # log-spaced between 0.001 and 100
+    0.002, 0.003, 0.004, 0.005, 0.006, 0.007, 0.008, 0.009,
+    0.02, 0.03, 0.04, 0.05, 0.06, 0.07, 0.08, 0.09,
+    0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9,
+    2, 3, 4, 5, 6, 7, 8, 9,
+    20, 30, 40, 50, 60, 70, 80, 90
+]
+
+
+def psd_sieve_sizes(df_psd):
+    # Numeric sieve-size columns, largest to smallest
+    sieve_sizes_psd = df_psd.columns.difference(PSD_META_COLUMNS).astype(float)
+    return sorted(sieve_sizes_psd, reverse=True)
+
+
+def psd_sample_labels(df_psd):
+    # Same "ID@From m" label used for the curve legend entries
+    return df_psd['ID'].astype(str) + "@" + df_psd['From (m)'].astype(str) + "m"
+
+
+def psd_sieve_matrix(df_psd, sieve_sizes_psd):
+    # Percentage passing as a float matrix (samples x sieves), blanks/text -> NaN
+    return df_psd[sieve_sizes_psd].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+
+
+def psd_contents(df_psd):
+    # Gravel/sand/fines for every sample at once; NaN where the 2.36 or 0.075 sieve is missing
+    def passing(size):
+        if size not in df_psd.columns:
+            return pd.Series(np.nan, index=df_psd.index)
+        return pd.to_numeric(df_psd[size], errors='coerce')
+
+    passing_236 = passing(2.36)
+    passing_0075 = passing(0.075)
+    return pd.DataFrame({
+        'Gravel Content': 100 - passing_236,
+        'Sand Content': passing_236 - passing_0075,
+        'Fines Content': passing_0075,
+    }, index=df_psd.index)
+
+
+def psd_content_table(df_psd):
+    # ID, depth and gravel/sand/fines percentages ready for display
+    df_display = pd.concat([df_psd[['ID', 'From (m)', 'To (m)']], psd_contents(df_psd)], axis=1)
+    df_display.columns = ['ID', 'From (m)', 'To (m)', 'Gravel (%)', 'Sand (%)', 'Fines (%)']
+    return df_display
+
+
+def compute_psd_envelope(df_psd, sieve_sizes_psd):
+    # Min/max and percentile bands across every curve, one column per sieve
+    matrix = psd_sieve_matrix(df_psd, sieve_sizes_psd)
+    envelope = pd.DataFrame(index=pd.Index(sieve_sizes_psd, name='Sieve (mm)'))
+    envelope['Count'] = np.count_nonzero(~np.isnan(matrix), axis=0)
+    if matrix.size == 0 or envelope['Count'].eq(0).all():
+        for col in ['Min'] + [f"P{p}" for p in PSD_ENVELOPE_PERCENTILES] + ['Max']:
+            envelope[col] = np.nan
+        return envelope
+
+    with np.errstate(all='ignore'):
+        envelope['Min'] = np.nanmin(matrix, axis=0)
+        bands = np.nanpercentile(matrix, PSD_ENVELOPE_PERCENTILES, axis=0)
+        for p, band in zip(PSD_ENVELOPE_PERCENTILES, bands):
+            envelope[f"P{p}"] = band
+        envelope['Max'] = np.nanmax(matrix, axis=0)
+    return envelope
+
+
+def add_psd_envelope_traces(fig, envelope, color='steelblue'):
+    x = envelope.index.to_numpy(dtype=float)
+
+    # Min/max envelope as a light filled band
+    fig.add_trace(go.Scatter(
+        x=x, y=envelope['Max'], mode='lines',
+        line=dict(color=color, width=0.5),
+        name='Max', legendgroup='minmax', showlegend=False,
+        hovertemplate='Max: %{y:.1f}%<extra></extra>'
+    ))
+    fig.add_trace(go.Scatter(
+        x=x, y=envelope['Min'], mode='lines',
+        line=dict(color=color, width=0.5),
+        fill='tonexty', fillcolor='rgba(70,130,180,0.15)',
+        name='Min - Max envelope', legendgroup='minmax',
+        hovertemplate='Min: %{y:.1f}%<extra></extra>'
+    ))
+
+    # P10-P90 band and the median curve
+    fig.add_trace(go.Scatter(
+        x=x, y=envelope['P90'], mode='lines',
+        line=dict(color=color, width=1, dash='dash'),
+        name='P90', legendgroup='p10p90', showlegend=False,
+        hovertemplate='P90: %{y:.1f}%<extra></extra>'
+    ))
+    fig.add_trace(go.Scatter(
+        x=x, y=envelope['P10'], mode='lines',
+        line=dict(color=color, width=1, dash='dash'),
+        fill='tonexty', fillcolor='rgba(70,130,180,0.35)',
+        name='P10 - P90', legendgroup='p10p90',
+        hovertemplate='P10: %{y:.1f}%<extra></extra>'
+    ))
+    fig.add_trace(go.Scatter(
+        x=x, y=envelope['P50'], mode='lines+markers',
+        line=dict(color='black', width=2),
+        name='P50 (median)',
+        customdata=envelope['Count'],
+        hovertemplate='P50: %{y:.1f}%<br>n = %{customdata}<extra></extra>'
+    ))
+
+
+def add_range_box(fig, x_range, label, color, y0=0, y1=10):
+    fig.add_shape(type="rect",
+        x0=x_range[0], x1=x_range[1],
+        y0=y0, y1=y1,
+        line=dict(color='black', width=1),
+        fillcolor=color,
+        opacity=0.3,
+        layer="below"
+    )
+    fig.add_annotation(
+        x=(math.log10(x_range[1]) + math.log10(x_range[0]))*0.5,
+        y=(y0 + y1) / 2,
+        text=label,
+        showarrow=False,
+        font=dict(color='black', size=10),
+        # bgcolor="white"
+    )
+
+
+def _curve_flags(df_psd):
+    # QA screening text per sample, "" when clean or not screened
+    if 'QA Flags' not in df_psd.columns:
+        return pd.Series("", index=df_psd.index)
+    return df_psd['QA Flags'].fillna("").astype(str)
+
+
+def psd_figure(df_psd, selected_unit, mode="Curves", raw_curve_labels=None, average_by_id=False, threshold=None):
+    # Curves: one line per sample, or per borehole with average_by_id.
+    # Envelope: summary bands, plus raw curves only for the samples in raw_curve_labels.
+    sieve_sizes_psd = psd_sieve_sizes(df_psd)
+
+    # Filter data for selected unit
+    df_selected = df_psd[df_psd["Geology Unit"] == selected_unit]
+
+    fig = go.Figure()
+    color_list = px.colors.qualitative.Dark24
+
+    df_curves = df_selected
+    if mode == "Envelope":
+        add_psd_envelope_traces(fig, compute_psd_envelope(df_selected, sieve_sizes_psd))
+        df_curves = df_selected[psd_sample_labels(df_selected).isin(raw_curve_labels or [])]
+
+    if average_by_id:
+        averaged = df_curves.groupby('ID')[sieve_sizes_psd].mean()
+        curve_labels = averaged.index.astype(str)
+        curve_matrix = averaged.to_numpy(dtype=float)
+        curve_flags = (_curve_flags(df_curves).groupby(df_curves['ID'])
+                       .agg(lambda flags: "; ".join(f for f in flags if f)).reindex(averaged.index))
+    else:
+        curve_labels = psd_sample_labels(df_curves)
+        curve_matrix = psd_sieve_matrix(df_curves, sieve_sizes_psd)
+        curve_flags = _curve_flags(df_curves)
+
+    for i, (label, y, flags) in enumerate(zip(curve_labels, curve_matrix, curve_flags)):
+        # Curves that failed the QA screening are dashed, with the reasons on hover
+        fig.add_trace(scatter_trace(
+            curve_matrix.size, threshold,
+            x=sieve_sizes_psd,
+            y=y,
+            mode='lines+markers',
+            name=f"{label} (QA)" if flags else label,
+            line=dict(color=color_list[i % len(color_list)], dash='dash' if flags else None),
+            hovertext=f"QA: {flags}" if flags else None
+        ))
+
+    # Add sand/gravel/fines classification
+    add_range_box(fig, GRAVEL_RANGE, "Gravel (2.36-63mm)", "lightgray")
+    add_range_box(fig, SAND_RANGE, "Sand (0.075-2.36mm)", "lightyellow")
+    add_range_box(fig, FINES_RANGE, "Fines(<0.075mm)", "lightblue")
+
+    fig.update_layout(
+        title=dict(
+            text=f"Particle Size Distribution (PSD) Curves for {selected_unit}",
+            x=0.5,
+            xanchor='center'
+        ),
+        xaxis=dict(
+            title='Particle Size (mm)',
+            type='log',
+            range=[-3, 2],  # Extends to include 0.001 on log scale
+            tickvals=[0.001, 0.01, 0.1, 1, 10, 100],
+            ticktext=['0.001', '0.01', '0.1', '1', '10', '100'],
+            showgrid=True,
+            zeroline=False,
+            mirror=True,
+            showline=True,
+            linecolor='black',
+            linewidth=1,
+        ),
+        yaxis=dict(
+            title='Percentage Passing (%)',
+            range=[0, 100],
+            showgrid=True,
+            zeroline=False,
+            mirror=True,
+            showline=True,
+            linecolor='black',
+            linewidth=1
+        ),
+        legend=dict(
+            title='Borehole ID',
+            traceorder="normal",
+            orientation="h",
+            y=-0.15,
+            yanchor="top",
+            font=dict(size=12),
+            bgcolor='rgba(255,255,255,0.5)',
+        ),
+        margin=dict(l=80, r=80, t=60, b=100),
+        showlegend=True,
+        template=get_template("psd")
+    )
+
+    # Minor gridlines on log x-axis, drawn by the axis itself rather than one shape per line
+    fig.update_xaxes(minor=dict(
+        tickvals=MINOR_TICKS,
+        showgrid=True,
+        gridcolor="lightgray",
+        gridwidth=0.5,
+        griddash="dot"
+    ))
+
+    return fig
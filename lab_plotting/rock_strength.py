@@ -0,0 +1,382 @@
+"""
+Point load (Is50) and UCS strength: elevation profiles, strength classes and
+the fitted PLI to UCS correlation.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from .common import add_flagged_markers, add_sample_markers, sample_labels, sample_position
+from .templates import get_template, scatter_trace
+
+
+# Class boundaries (MPa); each label applies from its line up to the next one
+PLI_STRENGTH_LINES = [0.03, 0.1, 0.3, 1, 3, 10]
+UCS_STRENGTH_LINES = [0.6, 2, 6, 20, 60, 200]
+STRENGTH_LABELS = ["VL", "L", "M", "H", "VH", "EH"]
+STRENGTH_CLASSES = ["EL"] + STRENGTH_LABELS  # EL below the lowest line
+STRENGTH_CLASS_COLORS = {
+    "EL": "#d73027", "VL": "#f46d43", "L": "#fdae61", "M": "#fee08b",
+    "H": "#a6d96a", "VH": "#1a9850", "EH": "#006837",
+}
+STRENGTH_TESTS = {
+    "Is(50)": ("Is(50) corrected (MPa)", PLI_STRENGTH_LINES),
+    "UCS": ("UCS (MPa)", UCS_STRENGTH_LINES),
+}
+
+
+def strength_class(values, strength_lines):
+    # Ordered categorical of strength classes; NaN stays unclassified
+    values = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float)
+    codes = np.searchsorted(strength_lines, values, side='right')
+    codes[np.isnan(values)] = -1
+    return pd.Categorical.from_codes(codes, categories=STRENGTH_CLASSES, ordered=True)
+
+
+def classify_rock_strength(df):
+    # Adds "Is(50) Class" and "UCS Class" columns to a copy of the Rock Results frame
+    df = df.copy()
+    for test, (col, strength_lines) in STRENGTH_TESTS.items():
+        if col in df.columns:
+            df[f"{test} Class"] = strength_class(df[col], strength_lines)
+    return df
+
+
+def strength_class_counts(df):
+    # Samples per strength class for every (test, Geology Unit), from the classified frame
+    class_cols = [f"{test} Class" for test in STRENGTH_TESTS if f"{test} Class" in df.columns]
+    long_df = df.melt(id_vars=["Geology Unit"], value_vars=class_cols, var_name="Test", value_name="Class")
+    long_df = long_df.dropna(subset=["Geology Unit", "Class"])
+    long_df["Test"] = long_df["Test"].str.replace(" Class", "", regex=False)
+    long_df["Class"] = pd.Categorical(long_df["Class"], categories=STRENGTH_CLASSES, ordered=True)
+    counts = pd.crosstab([long_df["Test"], long_df["Geology Unit"]], long_df["Class"], dropna=False)
+    counts = counts.reindex(columns=STRENGTH_CLASSES, fill_value=0)
+    counts["Total"] = counts.sum(axis=1)
+    return counts
+
+
+def strength_histogram_figure(counts, test):
+    # Grouped bars of class counts, one bar series per geology unit
+    test_counts = counts.loc[test, STRENGTH_CLASSES] if test in counts.index.get_level_values(0) else pd.DataFrame()
+    fig = go.Figure()
+    for unit, row in test_counts.iterrows():
+        fig.add_trace(go.Bar(x=STRENGTH_CLASSES, y=row.to_numpy(), name=str(unit)))
+    fig.update_layout(
+        barmode='group',
+        title=dict(text=f"{test} strength classes by geology unit", x=0.5, xanchor='center'),
+        xaxis=dict(title="Strength class", categoryorder='array', categoryarray=STRENGTH_CLASSES),
+        yaxis=dict(title="Number of samples"),
+        font=dict(family='Arial'),
+        template=get_template("lab"),
+        legend=dict(title='Geology Unit')
+    )
+    return fig
+
+
+def strength_class_figure(df, test, geology_unit=None, threshold=None):
+    # All samples of one test in a single trace, coloured by strength class
+    col, strength_lines = STRENGTH_TESTS[test]
+    class_col = f"{test} Class"
+    plot_df = df.dropna(subset=["Elevation (m)", col, class_col])
+    plot_df = plot_df[plot_df[col] > 0]  # log axis
+    if geology_unit is not None:
+        plot_df = plot_df[plot_df["Geology Unit"] == geology_unit]
+
+    fig = go.Figure()
+    fig.add_trace(scatter_trace(
+        len(plot_df), threshold,
+        x=plot_df[col],
+        y=plot_df["Elevation (m)"],
+        mode='markers',
+        marker=dict(size=8, color=plot_df[class_col].map(STRENGTH_CLASS_COLORS).astype(object),
+                    line=dict(width=0.5, color='black')),
+        customdata=np.column_stack([sample_labels(plot_df), plot_df[class_col].astype(str),
+                                    plot_df["Geology Unit"].astype(str)]),
+        hovertemplate='%{customdata[0]}<br>%{customdata[2]}<br>' + test +
+                      ': %{x} MPa (%{customdata[1]})<br>Elevation: %{y}<extra></extra>',
+        showlegend=False
+    ))
+    # Legend-only entries for the class colours
+    for label in STRENGTH_CLASSES:
+        fig.add_trace(go.Scatter(x=[None], y=[None], mode='markers', name=label,
+                                 marker=dict(size=8, color=STRENGTH_CLASS_COLORS[label])))
+    for val, label in zip(strength_lines, STRENGTH_LABELS):
+        fig.add_vline(x=val, line=dict(dash='dash', color='red', width=1),
+                      annotation_text=label, annotation_position="top")
+
+    title = f"Elevation vs {test} strength class" + (f": {geology_unit}" if geology_unit is not None else "")
+    fig.update_layout(
+        title=dict(text=title, x=0.5, xanchor='center', font=dict(family='Arial', size=20)),
+        xaxis=dict(type='log', title=f"{test} (MPa)", showgrid=True, gridcolor='lightgray',
+                   showline=True, linecolor='black', mirror=True),
+        yaxis=dict(title="Elevation (m AHD)", showgrid=True, gridcolor='lightgray',
+                   showline=True, linecolor='black', mirror=True),
+        legend=dict(title='Strength class'),
+        font=dict(family='Arial'),
+        height=600,
+        template=get_template("lab")
+    )
+    return fig
+
+
+TEST_AXIS_TITLES = {"Is(50)": "Is50", "UCS": "UCS"}
+DEFAULT_ELEVATION_RANGE = (250, 305)  # fixed axis used by the Plot All figures
+
+
+def strength_profile_figure(df, geology_unit, test, elevation_range=None, showlegend=False, threshold=None):
+    # Elevation vs Is(50) or UCS for one unit with the strength class lines.
+    # elevation_range=None fits the axis to the data (5 m padding) instead of a fixed range.
+    col, strength_lines = STRENGTH_TESTS[test]
+    axis_title = TEST_AXIS_TITLES[test]
+    filtered_df = df[df["Geology Unit"] == geology_unit].dropna(subset=["Elevation (m)", col])
+
+    if elevation_range is None:
+        line_range = [filtered_df["Elevation (m)"].min() - 5, filtered_df["Elevation (m)"].max() + 5]
+        yaxis_range = dict(autorange=True)
+    else:
+        line_range = list(elevation_range)
+        yaxis_range = dict(autorange=False, range=list(elevation_range))
+
+    fig = go.Figure()
+
+    add_sample_markers(fig, filtered_df, col, showlegend=showlegend, threshold=threshold)
+    add_flagged_markers(fig, filtered_df, col)
+
+    # Strength lines (no legend)
+    for val, label in zip(strength_lines, STRENGTH_LABELS):
+        fig.add_trace(go.Scatter(
+            x=[val, val],
+            y=line_range,
+            mode='lines',
+            line=dict(dash='dash', color='red'),
+            name=f"{label} ({val} MPa)",
+            showlegend=False
+        ))
+
+    fig.update_layout(
+        margin=dict(l=80, r=80, t=60, b=60),
+        title=dict(
+            text=f"Elevation vs {axis_title}: {geology_unit}",
+            x=0.5,
+            xanchor='center',
+            yanchor='top',
+            font=dict(family='Arial', size=20)
+        ),
+        xaxis=dict(
+            showgrid=True,
+            gridcolor='lightgray',
+            gridwidth=1,
+            showline=True,
+            linewidth=1,
+            linecolor='black',
+            mirror=True,
+            title=dict(text=f"{axis_title} (MPa)", font=dict(family="Arial")),
+            tickfont=dict(family='Arial')
+        ),
+        yaxis=dict(
+            **yaxis_range,
+            showgrid=True,
+            gridcolor='lightgray',
+            gridwidth=1,
+            showline=True,
+            linewidth=1,
+            linecolor='black',
+            mirror=True,
+            title=dict(text="Elevation (m AHD)", font=dict(family="Arial")),
+            tickfont=dict(family='Arial')
+        ),
+        legend=dict(
+            title='Borehole ID',
+            traceorder="normal",
+            orientation="h",
+            y=-0.15,
+            yanchor="top",
+            font=dict(size=12),
+            bgcolor='rgba(255,255,255,0.5)',
+        ),
+        font=dict(family='Arial'),
+        height=600,
+        width=800,
+        template=get_template("lab")
+    )
+    return fig
+
+
+def generate_pli_figure(df, geology_unit, elevation_range=DEFAULT_ELEVATION_RANGE, showlegend=False, threshold=None):
+    return strength_profile_figure(df, geology_unit, "Is(50)", elevation_range, showlegend, threshold)
+
+
+def generate_ucs_figure(df, geology_unit, elevation_range=DEFAULT_ELEVATION_RANGE, showlegend=True, threshold=None):
+    return strength_profile_figure(df, geology_unit, "UCS", elevation_range, showlegend, threshold)
+
+
+def plot_factored_pli_ucs(df, geology_unit, pli_factor, threshold=None):
+    # Expects a "Factored PLI" column (Is(50) x pli_factor) next to UCS
+    filtered_df = df[df["Geology Unit"] == geology_unit]
+    y = filtered_df["Elevation (m)"]
+    pli = filtered_df["Factored PLI"]
+    ucs = filtered_df["UCS (MPa)"]
+
+    fig = go.Figure()
+
+    # Plot factored PLI
+    fig.add_trace(scatter_trace(
+        pli.count() + ucs.count(), threshold,
+        x=pli, y=y,
+        mode='markers',
+        name=f"{pli_factor} x PLI",
+        marker=dict(color='blue', symbol='circle', size=8)
+    ))
+
+    # Plot UCS
+    fig.add_trace(scatter_trace(
+        pli.count() + ucs.count(), threshold,
+        x=ucs, y=y,
+        mode='markers',
+        name="UCS",
+        marker=dict(color='green', symbol='square', size=8)
+    ))
+
+    # Consistency lines
+    min_y, max_y = y.min() - 5, y.max() + 5
+
+    for val, label in zip(UCS_STRENGTH_LINES, STRENGTH_LABELS):
+        fig.add_trace(go.Scatter(
+            x=[val, val], y=[min_y, max_y],
+            mode="lines",
+            line=dict(dash="dash", color="red"),
+            name=label,
+            showlegend=False
+        ))
+
+    fig.update_layout(
+        title=dict(text=f"{pli_factor} x PLI & UCS - {geology_unit}", x=0.5, xanchor='center'),
+        xaxis=dict(
+            title=dict(text="Strength (MPa)", font=dict(family="Arial", size=14)),
+            tickfont=dict(family="Arial", size=12),
+            showgrid=True, gridcolor='lightgray',
+            showline=True, linecolor='black', mirror=True
+        ),
+        yaxis=dict(
+            title=dict(text="Elevation (m AHD)", font=dict(family="Arial", size=14)),
+            tickfont=dict(family="Arial", size=12),
+            autorange=True,
+            showgrid=True, gridcolor='lightgray',
+            showline=True, linecolor='black', mirror=True
+        ),
+        font=dict(family="Arial"),
+        legend=dict(orientation="v", yanchor="top", y=1, xanchor="left", x=1.02),
+        margin=dict(l=60, r=160, t=60, b=40),
+        template=get_template("default")
+    )
+
+    return fig
+
+
+PLI_UCS_PAIR_TOLERANCE = 0.5  # m between a PLI and a UCS test in the same borehole
+PLI_UCS_BOOTSTRAP_SAMPLES = 5000
+PLI_UCS_MIN_PAIRS = 3
+_BOOTSTRAP_CHUNK_CELLS = 5_000_000  # resample matrix cells per chunk, bounds memory
+
+
+def pair_pli_ucs_samples(df_rock, tolerance=PLI_UCS_PAIR_TOLERANCE):
+    # Match every UCS test to the nearest PLI test in the same borehole within tolerance.
+    # A PLI test backs at most one pair (the closest UCS test), so reusing it does not
+    # inflate the pair count and narrow the bootstrap CI.
+    df = df_rock.assign(**{"Depth (m)": sample_position(df_rock, "Depth (m)")})
+    df = df.dropna(subset=["ID", "Depth (m)"]).reset_index(drop=True)
+    pli = df.loc[df["Is(50) corrected (MPa)"] > 0, ["ID", "Depth (m)", "Is(50) corrected (MPa)"]]
+    pli = pli.assign(**{"PLI Depth (m)": pli["Depth (m)"], "_pli_row": pli.index}).sort_values("Depth (m)")
+    ucs = df.loc[df["UCS (MPa)"] > 0, ["ID", "Geology Unit", "Depth (m)", "UCS (MPa)"]].sort_values("Depth (m)")
+
+    pairs = pd.merge_asof(ucs, pli, on="Depth (m)", by="ID", direction="nearest", tolerance=tolerance)
+    pairs = pairs.dropna(subset=["Is(50) corrected (MPa)", "Geology Unit"])
+    gap = (pairs["Depth (m)"] - pairs["PLI Depth (m)"]).abs()
+    pairs = pairs.iloc[np.argsort(gap.to_numpy(), kind="stable")].drop_duplicates("_pli_row")
+    pairs = pairs.drop(columns="_pli_row")
+    return pairs.sort_values(["Geology Unit", "ID", "Depth (m)"]).reset_index(drop=True)
+
+
+def bootstrap_origin_factor(pli, ucs, n_boot=PLI_UCS_BOOTSTRAP_SAMPLES, rng=None):
+    # UCS = k x Is(50) through the origin (k = sum(xy) / sum(x^2)) for n_boot resamples at once
+    rng = np.random.default_rng(rng)
+    pli = np.asarray(pli, dtype=float)
+    ucs = np.asarray(ucs, dtype=float)
+    n = len(pli)
+    chunk = max(1, _BOOTSTRAP_CHUNK_CELLS // max(n, 1))
+    factors = []
+    for start in range(0, n_boot, chunk):
+        idx = rng.integers(0, n, size=(min(chunk, n_boot - start), n))
+        x, y = pli[idx], ucs[idx]
+        factors.append((x * y).sum(axis=1) / (x * x).sum(axis=1))
+    return np.concatenate(factors)
+
+
+def _fit_unit_factor(unit, pairs, n_boot, confidence, seed):
+    x = pairs["Is(50) corrected (MPa)"].to_numpy(dtype=float)
+    y = pairs["UCS (MPa)"].to_numpy(dtype=float)
+    row = {"Geology Unit": unit, "Pairs": len(x), "Factor": np.nan, "CI Lower": np.nan,
+           "CI Upper": np.nan, "R²": np.nan}
+    if len(x) < PLI_UCS_MIN_PAIRS:
+        return row
+
+    factor = (x * y).sum() / (x * x).sum()
+    boot = bootstrap_origin_factor(x, y, n_boot, np.random.default_rng(seed))
+    tail = (1 - confidence) / 2 * 100
+    ss_tot = ((y - y.mean()) ** 2).sum()
+    row.update({
+        "Factor": factor,
+        "CI Lower": np.percentile(boot, tail),
+        "CI Upper": np.percentile(boot, 100 - tail),
+        "R²": 1 - ((y - factor * x) ** 2).sum() / ss_tot if ss_tot > 0 else np.nan,
+    })
+    return row
+
+
+def fit_pli_ucs_factors(df_rock, tolerance=PLI_UCS_PAIR_TOLERANCE, n_boot=PLI_UCS_BOOTSTRAP_SAMPLES,
+                        confidence=0.95, seed=0, max_workers=None):
+    # Fitted UCS/Is(50) factor with a bootstrap confidence interval per Geology Unit.
+    # Units are fitted on worker threads; NumPy releases the GIL for the resample maths.
+    pairs = pair_pli_ucs_samples(df_rock, tolerance)
+    units = [(unit, group) for unit, group in pairs.groupby("Geology Unit", sort=True)]
+    seeds = np.random.SeedSequence(seed).spawn(len(units))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_fit_unit_factor, unit, group, n_boot, confidence, unit_seed)
+                   for (unit, group), unit_seed in zip(units, seeds)]
+        rows = [future.result() for future in futures]
+    columns = ["Geology Unit", "Pairs", "Factor", "CI Lower", "CI Upper", "R²"]
+    return pd.DataFrame(rows, columns=columns), pairs
+
+
+def plot_pli_ucs_fit(pairs, fits, threshold=None):
+    fig = go.Figure()
+    colors = px.colors.qualitative.Plotly
+    x_max = pairs["Is(50) corrected (MPa)"].max() if not pairs.empty else 1
+    for i, (_, fit) in enumerate(fits.iterrows()):
+        unit = fit["Geology Unit"]
+        color = colors[i % len(colors)]
+        unit_pairs = pairs[pairs["Geology Unit"] == unit]
+        fig.add_trace(scatter_trace(
+            len(unit_pairs), threshold, x=unit_pairs["Is(50) corrected (MPa)"], y=unit_pairs["UCS (MPa)"],
+            mode='markers', name=unit, legendgroup=unit, marker=dict(color=color, size=7),
+            text=unit_pairs["ID"], hovertemplate="%{text}<br>Is(50): %{x} MPa<br>UCS: %{y} MPa<extra></extra>"
+        ))
+        if np.isfinite(fit["Factor"]):
+            fig.add_trace(go.Scatter(
+                x=[0, x_max], y=[0, fit["Factor"] * x_max], mode='lines', legendgroup=unit,
+                name=f"{unit}: UCS = {fit['Factor']:.1f} x Is(50)", line=dict(color=color, dash='dash')
+            ))
+    fig.update_layout(
+        title=dict(text="UCS vs Is(50) - fitted factors", x=0.5, xanchor='center'),
+        xaxis=dict(title=dict(text="Is(50) corrected (MPa)"), showgrid=True, gridcolor='lightgray',
+                   showline=True, linecolor='black', mirror=True, rangemode='tozero'),
+        yaxis=dict(title=dict(text="UCS (MPa)"), showgrid=True, gridcolor='lightgray',
+                   showline=True, linecolor='black', mirror=True, rangemode='tozero'),
+        font=dict(family="Arial"),
+        margin=dict(l=60, r=40, t=60, b=40)
+    )
+    return fig
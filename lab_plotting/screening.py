@@ -0,0 +1,194 @@
+"""
+Outlier screening between load and plot: physical-range checks, per-unit
+robust z-scores and PSD monotonicity, giving each sample a "QA Flags" text.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .loaders import lab_dataset_hash
+
+
+QA_FLAGS_COLUMN = "QA Flags"
+
+# Physically plausible range per column; anything outside is almost certainly a typo
+SCREENING_RANGES = {
+    "Moisture Content (%)": (0, 150),
+    "LL": (0, 150),
+    "PL": (0, 100),
+    "PI": (0, 100),
+    "Is(50) corrected (MPa)": (0, 15),
+    "UCS (MPa)": (0, 350),
+}
+PSD_PASSING_RANGE = (0, 100)
+# Strength is roughly log-normal, so its z-scores are taken on log10 values
+SCREENING_LOG_COLUMNS = ["Is(50) corrected (MPa)", "UCS (MPa)"]
+ROBUST_Z_THRESHOLD = 3.5  # modified z-score cut-off (Iglewicz and Hoaglin)
+ROBUST_Z_MIN_SAMPLES = 5  # smaller units are only range checked
+PSD_MONOTONIC_TOLERANCE = 1.0  # % passing a finer sieve may exceed a coarser one by
+
+SCREENING_CACHE_MAX_ENTRIES = 32  # screened sheets kept per process, least recently used dropped first
+
+_SCREENING_CACHE = OrderedDict()
+_SCREENING_CACHE_LOCK = threading.Lock()
+
+
+def robust_z_scores(values, groups):
+    # Modified z-score 0.6745 (x - median) / MAD within each group, NaN where the
+    # group is too small or has no spread
+    grouped = values.groupby(groups)
+    median = grouped.transform("median")
+    deviation = (values - median).abs()
+    mad = deviation.groupby(groups).transform("median")
+    count = grouped.transform("count")
+    z = 0.6745 * (values - median) / mad.where(mad > 0)
+    return z.where(count >= ROBUST_Z_MIN_SAMPLES)
+
+
+def _column_reasons(values, low, high, z):
+    # Text is only formatted for the few flagged values
+    out_of_range = (values < low) | (values > high)
+    outlier = (z.abs() > ROBUST_Z_THRESHOLD) & ~out_of_range
+    reasons = pd.Series("", index=values.index, dtype=object)
+    reasons[out_of_range] = f"outside {low}-{high}"
+    reasons[outlier] = "robust z " + z[outlier].round(1).astype(str)
+    return reasons
+
+
+def _sieve_columns(df):
+    # Numeric headers are sieve sizes (mm), as on the PSD sheet
+    return sorted((col for col in df.columns if not isinstance(col, str)), key=float, reverse=True)
+
+
+def psd_monotonicity_violations(matrix, tolerance=PSD_MONOTONIC_TOLERANCE):
+    # matrix is samples x sieves, coarsest first; a value is a violation when it
+    # passes more than the smallest value on any coarser sieve. Blanks are ignored.
+    coarser_min = np.fmin.accumulate(matrix, axis=1)
+    previous = np.full_like(matrix, np.nan)
+    previous[:, 1:] = coarser_min[:, :-1]
+    return matrix > previous + tolerance
+
+
+def _cached_screening(cache, key):
+    if cache is not None:
+        return cache.get(key)
+    with _SCREENING_CACHE_LOCK:
+        result = _SCREENING_CACHE.get(key)
+        if result is not None:
+            _SCREENING_CACHE.move_to_end(key)
+        return result
+
+
+def _store_screening(cache, key, result):
+    if cache is not None:
+        cache[key] = result
+        return
+    with _SCREENING_CACHE_LOCK:
+        _SCREENING_CACHE[key] = result
+        _SCREENING_CACHE.move_to_end(key)
+        while len(_SCREENING_CACHE) > SCREENING_CACHE_MAX_ENTRIES:
+            _SCREENING_CACHE.popitem(last=False)
+
+
+def screen_sheet(df, cache=None):
+    # Reason text per screened value (samples x screened columns, "" when clean).
+    # Cached per content hash, so a dataset is only screened once; without a cache
+    # dict the results go in a small process-wide LRU.
+    df = df.drop(columns=[QA_FLAGS_COLUMN], errors="ignore")
+    key = lab_dataset_hash({"sheet": df})
+    cached = _cached_screening(cache, key)
+    if cached is not None:
+        return cached
+
+    groups = df["Geology Unit"] if "Geology Unit" in df.columns else pd.Series("", index=df.index)
+    reasons = {}
+    for col, (low, high) in SCREENING_RANGES.items():
+        if col not in df.columns:
+            continue
+        values = pd.to_numeric(df[col], errors="coerce")
+        in_range = values.where((values >= low) & (values <= high))
+        if col in SCREENING_LOG_COLUMNS:
+            in_range = np.log10(in_range.where(in_range > 0))
+        # Out-of-range values are left out of the medians they would otherwise drag
+        reasons[col] = _column_reasons(values, low, high, robust_z_scores(in_range, groups))
+
+    sieves = _sieve_columns(df)
+    if sieves:
+        passing = df[sieves].apply(pd.to_numeric, errors="coerce")
+        low, high = PSD_PASSING_RANGE
+        increasing = psd_monotonicity_violations(passing.to_numpy(dtype=float))
+        for i, size in enumerate(sieves):
+            values = passing[size]
+            reasons[size] = pd.Series(np.select(
+                [(values < low) | (values > high), increasing[:, i]],
+                [f"outside {low}-{high}", "passing above a coarser sieve"], ""
+            ), index=df.index)
+
+    result = pd.DataFrame(reasons, index=df.index)
+    _store_screening(cache, key, result)
+    return result
+
+
+def qa_flags(reasons):
+    # "UCS (MPa): outside 0-350; PI: robust z 4.2" per sample, built column by column
+    flags = pd.Series("", index=reasons.index, dtype=object)
+    flagged = reasons[(reasons != "").any(axis=1)]
+    text = pd.Series("", index=flagged.index, dtype=object)
+    for col in flagged.columns:
+        label = f"{col} mm" if not isinstance(col, str) else col
+        part = np.where(flagged[col] != "", label + ": " + flagged[col], "")
+        text = text + np.where((text != "") & (part != ""), "; ", "") + part
+    flags[text.index] = text
+    return flags
+
+
+def screen_lab_frames(frames, cache=None):
+    # Adds the QA Flags column to every loaded sheet
+    screened = {}
+    for sheet, df in frames.items():
+        df = df.copy()
+        df[QA_FLAGS_COLUMN] = qa_flags(screen_sheet(df, cache))
+        screened[sheet] = df
+    return screened
+
+
+def mask_flagged_values(df, cache=None):
+    # Flagged values become NaN so the plots and statistics skip them; the rest of
+    # the sample (e.g. its PLI when only the UCS is suspect) is kept
+    reasons = screen_sheet(df, cache)
+    df = df.copy()
+    for col in reasons.columns:
+        df[col] = df[col].mask(reasons[col] != "")
+    return df
+
+
+def is_flagged(df, columns):
+    # True for samples with a flag on any of the given columns
+    if QA_FLAGS_COLUMN not in df.columns:
+        return pd.Series(False, index=df.index)
+    flags = df[QA_FLAGS_COLUMN].fillna("")
+    mask = pd.Series(False, index=df.index)
+    for col in columns:
+        mask |= flags.str.contains(f"{col}:", regex=False)
+    return mask
+
+
+def flagged_samples_table(frames):
+    # One row per flagged sample across the screened sheets
+    parts = []
+    for sheet, df in frames.items():
+        if QA_FLAGS_COLUMN not in df.columns:
+            continue
+        flagged = df[df[QA_FLAGS_COLUMN].fillna("") != ""]
+        if flagged.empty:
+            continue
+        columns = [col for col in ["Geology Unit", "ID", "From (m)", "To (m)", QA_FLAGS_COLUMN]
+                   if col in flagged.columns]
+        parts.append(flagged[columns].assign(Sheet=sheet))
+    if not parts:
+        return pd.DataFrame(columns=["Sheet", "Geology Unit", "ID", "From (m)", "To (m)", QA_FLAGS_COLUMN])
+    table = pd.concat(parts, ignore_index=True)
+    return table[["Sheet"] + [col for col in table.columns if col != "Sheet"]]
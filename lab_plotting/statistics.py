@@ -0,0 +1,102 @@
+"""
+Count, mean, std, percentiles and characteristic values of the lab parameters
+per geology unit and elevation/depth bin.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .cache import frames_fingerprint
+from .common import sample_position
+from .loaders import lab_sheet_names, read_lab_sheets
+from .psd import psd_contents
+
+
+# Parameters summarised by compute_lab_statistics: sheet -> {source column: parameter name}
+STATISTICS_PARAMETERS = {
+    "Rock Results": {"Is(50) corrected (MPa)": "Is(50) (MPa)", "UCS (MPa)": "UCS (MPa)"},
+    "Moisture Content": {"Moisture Content (%)": "Moisture Content (%)"},
+    "Atterberg Limits": {"LL": "LL (%)", "PL": "PL (%)", "PI": "PI (%)"},
+    "PSD": {"Gravel Content": "Gravel (%)", "Sand Content": "Sand (%)", "Fines Content": "Fines (%)"},
+}
+STATISTICS_BIN_OPTIONS = ["Elevation (m)", "Depth (m)"]
+STATISTICS_PERCENTILES = [10, 50, 90]
+CHARACTERISTIC_STD_FACTOR = 0.5  # characteristic value = mean -/+ 0.5 x std (Schneider)
+STATISTICS_CACHE_MAX_ENTRIES = 16  # tables kept per cache, least recently used dropped first
+
+def lab_parameters_long(frames, bin_by="Elevation (m)"):
+    # One row per (sample, parameter) across every sheet in STATISTICS_PARAMETERS
+    parts = []
+    for sheet, columns in STATISTICS_PARAMETERS.items():
+        df = frames.get(sheet)
+        if df is None or df.empty or "Geology Unit" not in df.columns:
+            continue
+        if sheet == "PSD":
+            df = pd.concat([df, psd_contents(df)], axis=1)
+        available = {col: name for col, name in columns.items() if col in df.columns}
+        if not available:
+            continue
+
+        block = df[list(available)].apply(pd.to_numeric, errors='coerce').rename(columns=available)
+        block["Geology Unit"] = df["Geology Unit"]
+        block["Position"] = sample_position(df, bin_by)
+        parts.append(block.melt(id_vars=["Geology Unit", "Position"], var_name="Parameter", value_name="Value"))
+
+    if not parts:
+        return pd.DataFrame(columns=["Geology Unit", "Position", "Parameter", "Value"])
+    long_df = pd.concat(parts, ignore_index=True)
+    return long_df.dropna(subset=["Geology Unit", "Value"])
+
+
+def compute_lab_statistics(frames, bin_by="Elevation (m)", bin_size=5.0, cache=None):
+    # Count/mean/std/percentiles/characteristic values per parameter, Geology Unit and
+    # bin, plus an "All" row per unit. With a cache dict (e.g. the session's), results
+    # are kept per dataset fingerprint and binning; without one (batch runs) nothing is kept.
+    key = None
+    if cache is not None:
+        key = (frames_fingerprint(frames), bin_by, float(bin_size))
+        if key in cache:
+            cache[key] = cache.pop(key)  # most recently used last
+            return cache[key].copy()
+
+    long_df = lab_parameters_long(frames, bin_by)
+    binned = long_df.assign(**{"Bin From": np.floor(long_df["Position"] / bin_size) * bin_size})
+    binned = binned.dropna(subset=["Bin From"])
+    # The unit-wide rows go through the same groupby under an infinite bin key, which sorts last
+    stacked = pd.concat([binned, long_df.assign(**{"Bin From": np.inf})], ignore_index=True)
+
+    grouped = stacked.groupby(["Parameter", "Geology Unit", "Bin From"], sort=True)["Value"]
+    stats = grouped.agg(["count", "mean", "std", "min", "max"])
+    quantiles = grouped.quantile([p / 100 for p in STATISTICS_PERCENTILES]).unstack()
+    quantiles.columns = [f"P{p}" for p in STATISTICS_PERCENTILES]
+
+    stats = stats.join(quantiles).reset_index()
+    stats["Bin From"] = stats["Bin From"].replace(np.inf, np.nan)
+    stats = stats.rename(columns={"count": "Count", "mean": "Mean", "std": "Std", "min": "Min", "max": "Max"})
+    stats["Char. Lower"] = stats["Mean"] - CHARACTERISTIC_STD_FACTOR * stats["Std"]
+    stats["Char. Upper"] = stats["Mean"] + CHARACTERISTIC_STD_FACTOR * stats["Std"]
+    stats["Bin To"] = stats["Bin From"] + bin_size
+    stats.insert(2, "Bin", np.where(
+        stats["Bin From"].isna(), "All",
+        stats["Bin From"].map("{:g}".format) + " to " + stats["Bin To"].map("{:g}".format) + " m"))
+
+    columns = ["Parameter", "Geology Unit", "Bin", "Bin From", "Bin To", "Count", "Mean", "Std", "Min"]
+    columns += [f"P{p}" for p in STATISTICS_PERCENTILES] + ["Max", "Char. Lower", "Char. Upper"]
+    stats = stats[columns]
+    if cache is None:
+        return stats
+    cache[key] = stats
+    while len(cache) > STATISTICS_CACHE_MAX_ENTRIES:
+        del cache[next(iter(cache))]
+    return stats.copy()
+
+
+def compute_workbook_statistics(file_path, bin_by="Elevation (m)", bin_size=5.0):
+    # Batch entry point: statistics straight from a workbook path, using whichever
+    # of the statistics sheets the workbook has
+    with open(file_path, "rb") as f:
+        file_bytes = f.read()
+    sheet_names = lab_sheet_names(file_bytes, file_path)
+    wanted = [sheet for sheet in STATISTICS_PARAMETERS if sheet in sheet_names]
+    frames = read_lab_sheets(file_bytes, file_path, wanted)
+    return compute_lab_statistics(frames, bin_by=bin_by, bin_size=bin_size)
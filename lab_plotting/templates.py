@@ -0,0 +1,39 @@
+"""
+Figure templates and trace-type selection shared by every plot type.
+"""
+
+from functools import lru_cache
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+
+# Default points per figure above which WebGL (Scattergl) traces are used. Never
+# changed at runtime: a user's setting is passed to the figure builders as threshold=.
+SCATTERGL_THRESHOLD = 2000
+
+
+def scatter_trace(n_points, threshold=None, **kwargs):
+    # SVG Scatter for small figures, WebGL Scattergl once the figure carries many points
+    threshold = SCATTERGL_THRESHOLD if threshold is None else threshold
+    trace_type = go.Scattergl if n_points > threshold else go.Scatter
+    return trace_type(**kwargs)
+
+
+AXIS_STYLE = dict(showgrid=True, gridcolor='lightgray', showline=True, linecolor='black', mirror=True)
+
+# Template name -> (Plotly base template, layout defaults layered on top)
+TEMPLATE_SPECS = {
+    "default": ("plotly", {}),
+    "lab": ("simple_white", dict(font=dict(family='Arial'), xaxis=AXIS_STYLE, yaxis=AXIS_STYLE)),
+    "psd": ("plotly_white", {}),
+}
+
+
+@lru_cache(maxsize=None)
+def get_template(name="lab"):
+    # Built once per process; figures get their own copy when the template is assigned
+    base, layout = TEMPLATE_SPECS[name]
+    template = go.layout.Template(pio.templates[base])
+    template.layout.update(layout)
+    return template
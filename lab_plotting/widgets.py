@@ -0,0 +1,371 @@
+"""
+Streamlit sections shared by the Lab, Soil and Rock pages. This is the only
+module in the package that imports Streamlit; the plot submodules are imported
+inside each section so a page only loads the plotters it renders.
+"""
+
+import hashlib
+
+import streamlit as st
+
+from . import loaders, screening, templates
+from .cache import FIGURE_CACHE, figure_key, set_frame_fingerprint
+
+
+MULTI_UNIT_LAYOUTS = ["Separate charts", "Small multiples"]
+
+
+def scattergl_threshold():
+    # This session's WebGL point threshold (set by scattergl_threshold_input)
+    return st.session_state.get("scattergl_threshold", templates.SCATTERGL_THRESHOLD)
+
+
+def cached_figure(data, plot_type, build, unit=None, **style):
+    # Repeat views of the same slice and style are a cache lookup instead of a rebuild.
+    # build is called with the session's WebGL threshold, which is part of the key.
+    threshold = scattergl_threshold()
+    return FIGURE_CACHE.get_or_build(figure_key(data, plot_type, unit, threshold=threshold, **style),
+                                     lambda: build(threshold))
+
+
+def figure_cache_sidebar():
+    stats = FIGURE_CACHE.stats()
+    st.sidebar.caption(
+        f"Figure cache: {stats['entries']} figures, {stats['size_kb']} kB, "
+        f"{stats['hits']} hits / {stats['misses']} misses"
+    )
+
+
+def scattergl_threshold_input():
+    # Kept per session in st.session_state["scattergl_threshold"], not in the shared templates module
+    return st.sidebar.number_input(
+        "WebGL point threshold", min_value=0, value=templates.SCATTERGL_THRESHOLD, step=500,
+        key="scattergl_threshold",
+        help="Plots with more points than this switch to WebGL (Scattergl) rendering."
+    )
+
+
+def qa_screening_sidebar():
+    return st.sidebar.checkbox(
+        "Hide QA-flagged values", value=False,
+        help="Values outside their physical range, per-unit robust z-score outliers and PSD "
+             "points passing more than a coarser sieve are left out of the plots and statistics."
+    )
+
+
+def qa_flags_section(frames):
+    table = screening.flagged_samples_table(frames)
+    if table.empty:
+        return
+    with st.expander(f"QA screening: {len(table)} flagged samples"):
+        st.dataframe(table, use_container_width=True, hide_index=True)
+
+
+def load_uploaded_sheets(uploaded_file, sheet_names, hide_flagged=False):
+    # Sheets are memoised per upload, so switching plot type never re-parses a sheet.
+    # Each sheet is QA screened once, when it is first parsed.
+    file_bytes = uploaded_file.getvalue()
+    dataset_hash = hashlib.md5(file_bytes).hexdigest()
+
+    cache = st.session_state.get("lab_workbook_cache")
+    if cache is None or cache["hash"] != dataset_hash:
+        cache = {"hash": dataset_hash, "frames": {}}
+        st.session_state["lab_workbook_cache"] = cache
+
+    missing = [sheet for sheet in sheet_names if sheet not in cache["frames"]]
+    if missing:
+        screened = screening.screen_lab_frames(loaders.read_lab_sheets(file_bytes, uploaded_file.name, missing))
+        # The figure cache keys on this fingerprint instead of re-hashing the rows on every view
+        cache["frames"].update({sheet: set_frame_fingerprint(df, f"{dataset_hash}:{sheet}")
+                                for sheet, df in screened.items()})
+
+    if hide_flagged:
+        return {sheet: set_frame_fingerprint(screening.mask_flagged_values(cache["frames"][sheet]),
+                                             f"{dataset_hash}:{sheet}:masked")
+                for sheet in sheet_names}
+    # Copies keep the in-place edits done by the plotters out of the cache
+    return {sheet: cache["frames"][sheet].copy() for sheet in sheet_names}
+
+
+def _show_content_table(df_display, heading):
+    st.markdown(heading)
+    st.dataframe(df_display.style.format({
+        'Gravel (%)': '{:.1f}',
+        'Sand (%)': '{:.1f}',
+        'Fines (%)': '{:.1f}'
+    }), use_container_width=True)
+
+
+def psd_section(df_psd, average_by_id=False):
+    from .psd import PSD_ENVELOPE_AUTO_SAMPLES, psd_content_table, psd_figure, psd_sample_labels
+
+    geology_units = sorted(df_psd["Geology Unit"].dropna().unique())
+    selected_unit = st.selectbox("Select Geology Unit", geology_units)
+
+    # Large units default to the statistical envelope instead of one curve per sample
+    df_unit_psd = df_psd[df_psd["Geology Unit"] == selected_unit]
+    psd_mode = st.radio("PSD display", ["Curves", "Envelope"], horizontal=True,
+                        index=1 if len(df_unit_psd) > PSD_ENVELOPE_AUTO_SAMPLES else 0)
+    raw_curve_labels = []
+    if psd_mode == "Envelope":
+        raw_curve_labels = st.multiselect("Overlay raw curves for samples",
+                                          psd_sample_labels(df_unit_psd).tolist())
+    fig = cached_figure(
+        df_unit_psd, "PSD",
+        lambda threshold: psd_figure(df_psd, selected_unit, mode=psd_mode, raw_curve_labels=raw_curve_labels,
+                                     average_by_id=average_by_id, threshold=threshold),
+        unit=selected_unit, mode=psd_mode, raw_curve_labels=tuple(raw_curve_labels), average_by_id=average_by_id
+    )
+
+    _show_content_table(psd_content_table(df_unit_psd), "### PSD Table")
+    if st.button("Calculate Contents for All Samples"):
+        _show_content_table(psd_content_table(df_psd), "### Gravel, Sand, and Fines Content for All Samples")
+
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def atterberg_section(df_atterberg):
+    from .plasticity import casagrande_class_counts, casagrande_figure, prepare_atterberg
+
+    df_atterberg = prepare_atterberg(df_atterberg)
+
+    # Get list of unique geology units
+    units = df_atterberg['Geology Unit'].unique()
+    selected_units = st.multiselect("Select Geology Unit(s) to Display", sorted(units), default=units)
+
+    # Filter based on selection
+    df_filtered = df_atterberg[df_atterberg['Geology Unit'].isin(selected_units)]
+    fig = cached_figure(df_filtered, "Atterberg Limits",
+                        lambda threshold: casagrande_figure(df_filtered, selected_units, threshold=threshold),
+                        units=tuple(selected_units))
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Per-unit zone counts
+    st.markdown("### Casagrande Classification Counts")
+    st.dataframe(casagrande_class_counts(df_filtered), use_container_width=True)
+
+
+def show_small_multiples(df, x_col, key, page_size=None, **kwargs):
+    # Streamlit cannot see the scroll position, so panels are rendered a page at a
+    # time and the rest are only built when asked for
+    from .layout import SMALL_MULTIPLES_PAGE_SIZE, small_multiples_figure
+
+    page_size = SMALL_MULTIPLES_PAGE_SIZE if page_size is None else page_size
+    units = sorted(df["Geology Unit"].dropna().unique())
+    shown_key = f"{key}_panels_shown"
+    shown = st.session_state.get(shown_key, page_size)
+    fig = cached_figure(df, "Small multiples",
+                        lambda threshold: small_multiples_figure(df, x_col, units=units[:shown], threshold=threshold,
+                                                                 **kwargs),
+                        x_col=x_col, units=tuple(units[:shown]), **kwargs)
+    st.plotly_chart(fig, use_container_width=True)
+    if shown < len(units):
+        st.caption(f"Showing {shown} of {len(units)} geology units")
+        if st.button("Load more panels", key=f"{key}_more"):
+            st.session_state[shown_key] = shown + page_size
+            st.rerun()
+
+
+def moisture_section(df, layout="Separate charts"):
+    from .moisture import MOISTURE_TREND_AUTO_POINTS, MOISTURE_TREND_BIN_SIZE, moisture_content_figures
+
+    required_cols = ['Geology Unit', 'ID', 'Elevation (m)', 'Moisture Content (%)']
+    df = df.dropna(subset=required_cols)
+
+    # Let user select units
+    unique_units = df["Geology Unit"].dropna().unique()
+    selected_units = st.multiselect("Select Geology Unit(s)", sorted(unique_units), default=unique_units)
+
+    if layout == "Small multiples":
+        show_small_multiples(df[df["Geology Unit"].isin(selected_units)], 'Moisture Content (%)', key="moisture",
+                             x_range=[0, 100], title="Elevation vs Moisture Content", y_title="Elevation (m)")
+        return
+
+    # Large units open as a binned trend rather than every sample
+    largest_unit = df[df["Geology Unit"].isin(selected_units)].groupby("Geology Unit").size().max()
+    col1, col2 = st.columns(2)
+    show_samples = col1.checkbox("Plot individual samples",
+                                 value=not largest_unit > MOISTURE_TREND_AUTO_POINTS)
+    show_trend = col2.checkbox("Show binned median and P10-P90 trend", value=True)
+    trend_bin_size = None
+    if show_trend:
+        trend_bin_size = st.number_input("Trend bin size (m)", min_value=0.5,
+                                         value=MOISTURE_TREND_BIN_SIZE, step=0.5)
+
+    # Units already in the figure cache are looked up; the rest are built together in one pass
+    unit_slices = dict(tuple(df.groupby("Geology Unit", sort=False)))
+    threshold = scattergl_threshold()
+    keys = {unit: figure_key(unit_slices[unit], "Moisture Content", unit, show_samples=show_samples,
+                             trend_bin_size=trend_bin_size, threshold=threshold)
+            for unit in selected_units if unit in unit_slices}
+    figures = {unit: FIGURE_CACHE.get(key) for unit, key in keys.items()}
+    missing = [unit for unit, fig in figures.items() if fig is None]
+    if missing:
+        built = moisture_content_figures(df, missing, show_samples, trend_bin_size, threshold=threshold)
+        for unit, fig in built.items():
+            FIGURE_CACHE.put(keys[unit], fig)
+            figures[unit] = fig
+    for fig in figures.values():
+        st.plotly_chart(fig, use_container_width=True)
+
+
+def strength_profile_section(df_rock, geology_unit, test, showlegend=False, save_html=None):
+    # Single-unit elevation profile with the axis fitted to the data
+    from .rock_strength import STRENGTH_TESTS, strength_profile_figure
+
+    col, _ = STRENGTH_TESTS[test]
+    filtered_df = df_rock.dropna(subset=["Elevation (m)", col, "Geology Unit"])
+    if filtered_df[filtered_df["Geology Unit"] == geology_unit].empty:
+        st.warning(f"No data found for geology unit '{geology_unit}'.")
+        return
+
+    unit_df = filtered_df[filtered_df["Geology Unit"] == geology_unit]
+    fig = cached_figure(
+        unit_df, "Strength profile",
+        lambda threshold: strength_profile_figure(unit_df, geology_unit, test, elevation_range=None,
+                                                  showlegend=showlegend, threshold=threshold),
+        unit=geology_unit, test=test, showlegend=showlegend
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Optional save
+    if save_html:
+        fig.write_html(save_html)
+        st.success(f"Plot saved to {save_html}")
+
+
+def strength_plot_all_section(df_rock, geology_units, test, layout="Separate charts", showlegend=None):
+    from .rock_strength import STRENGTH_TESTS, TEST_AXIS_TITLES, generate_pli_figure, generate_ucs_figure
+
+    st.info(f"Generating plots for {len(geology_units)} geology units...")
+    if layout == "Small multiples":
+        from .layout import small_multiples_figure
+
+        # All units in one figure; "Plot All" does not survive a rerun, so no paging here
+        col, strength_lines = STRENGTH_TESTS[test]
+        axis_title = TEST_AXIS_TITLES[test]
+        fig = cached_figure(
+            df_rock, "Strength small multiples",
+            lambda threshold: small_multiples_figure(df_rock, col, units=sorted(geology_units),
+                                                     reference_lines=strength_lines, x_title=f"{axis_title} (MPa)",
+                                                     title=f"Elevation vs {axis_title}", threshold=threshold),
+            test=test, units=tuple(sorted(geology_units))
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        return
+
+    generate_figure = generate_pli_figure if test == "Is(50)" else generate_ucs_figure
+    label = "PLI" if test == "Is(50)" else "UCS"
+    kwargs = {} if showlegend is None else {"showlegend": showlegend}
+    unit_slices = dict(tuple(df_rock.groupby("Geology Unit", sort=False)))
+    for unit in geology_units:
+        st.subheader(f"Elevation vs {label} - {unit}")
+        unit_df = unit_slices[unit]
+        fig = cached_figure(unit_df, f"{label} all",
+                            lambda threshold: generate_figure(unit_df, unit, threshold=threshold, **kwargs),
+                            unit=unit, **kwargs)
+        st.plotly_chart(fig, use_container_width=True)
+
+
+def factored_pli_ucs_section(df_rock):
+    from .loaders import lab_dataset_hash
+    from .rock_strength import (PLI_UCS_BOOTSTRAP_SAMPLES, PLI_UCS_MIN_PAIRS, PLI_UCS_PAIR_TOLERANCE,
+                                fit_pli_ucs_factors, plot_factored_pli_ucs, plot_pli_ucs_fit)
+
+    geology_units = df_rock["Geology Unit"].dropna().unique()
+
+    # Fitted UCS/Is(50) factors are the defaults; refitted only when the rock data changes
+    rock_hash = lab_dataset_hash({"Rock Results": df_rock})
+    fit_cache = st.session_state.get("pli_ucs_fit_cache")
+    if fit_cache is None or fit_cache["hash"] != rock_hash:
+        fits, pairs = fit_pli_ucs_factors(df_rock)
+        fit_cache = {"hash": rock_hash, "fits": fits, "pairs": pairs}
+        st.session_state["pli_ucs_fit_cache"] = fit_cache
+    fits, pairs = fit_cache["fits"], fit_cache["pairs"]
+    fitted = fits.set_index("Geology Unit")["Factor"].dropna().to_dict()
+
+    with st.expander("Fitted PLI to UCS factors", expanded=True):
+        st.caption(f"UCS = factor x Is(50) through the origin. PLI and UCS tests are paired by ID "
+                   f"within {PLI_UCS_PAIR_TOLERANCE} m, each PLI test at most once; 95% CI from "
+                   f"{PLI_UCS_BOOTSTRAP_SAMPLES} bootstrap resamples. Units with fewer than {PLI_UCS_MIN_PAIRS} pairs are not fitted.")
+        st.dataframe(fits.round(3), use_container_width=True, hide_index=True)
+        if not pairs.empty:
+            st.plotly_chart(plot_pli_ucs_fit(pairs, fits, threshold=scattergl_threshold()), use_container_width=True)
+
+    st.write("### Enter a factor for each geology unit")
+    factors = {}
+    for unit in sorted(geology_units):
+        default = round(float(fitted.get(unit, 1.0)), 2)
+        factor = st.number_input(f"Factor for {unit}", min_value=0.0, value=default, step=0.1,
+                                 key=f"factor_{unit}_{rock_hash}")
+        factors[unit] = factor
+
+    if st.button("Plot"):
+        for unit in geology_units:
+            unit_df = df_rock[df_rock["Geology Unit"] == unit].copy()
+            unit_df["Factored PLI"] = unit_df["Is(50) corrected (MPa)"] * factors[unit]
+
+            st.subheader(f"{factors[unit]} x PLI & UCS - {unit}")
+            fig = cached_figure(unit_df, "Factored PLI and UCS",
+                                lambda threshold: plot_factored_pli_ucs(unit_df, unit, factors[unit], threshold=threshold),
+                                unit=unit, pli_factor=factors[unit])
+            st.plotly_chart(fig, use_container_width=True)
+
+
+def strength_classes_section(df_rock, selected_unit=None):
+    from .rock_strength import (STRENGTH_TESTS, classify_rock_strength, strength_class_counts,
+                                strength_class_figure, strength_histogram_figure)
+
+    # Every Is(50) and UCS value is classified in one pass over the frame
+    df_classified = classify_rock_strength(df_rock)
+    counts = strength_class_counts(df_classified)
+    test = st.radio("Test", list(STRENGTH_TESTS), horizontal=True)
+    st.plotly_chart(strength_histogram_figure(counts, test), use_container_width=True)
+    st.dataframe(counts.loc[[test]] if test in counts.index.get_level_values(0) else counts,
+                 use_container_width=True)
+    unit = selected_unit if selected_unit is not None and st.checkbox("Selected unit only") else None
+    fig = cached_figure(df_rock, "Strength classes",
+                        lambda threshold: strength_class_figure(df_classified, test, unit, threshold=threshold),
+                        unit=unit, test=test)
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def borehole_profile_section(frames):
+    from .boreholes import borehole_index, borehole_profile_figure
+
+    # The per-borehole index is built once per dataset for the session
+    index = borehole_index(frames, cache=st.session_state.setdefault("borehole_index_cache", {}))
+    borehole_ids = index.borehole_ids
+    if not borehole_ids:
+        st.warning("No borehole IDs found in the lab sheets.")
+        return
+    selected = st.multiselect("Select Borehole(s)", borehole_ids, default=borehole_ids[:1])
+    if not selected:
+        return
+    fig = cached_figure(
+        index.dataset_hash, "Borehole profile",
+        lambda threshold: borehole_profile_figure(index, selected, threshold=threshold), boreholes=tuple(selected)
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def statistics_section(frames):
+    from .statistics import CHARACTERISTIC_STD_FACTOR, STATISTICS_BIN_OPTIONS, compute_lab_statistics
+
+    st.subheader("Parameter Statistics")
+    bin_by = st.radio("Bin samples by", STATISTICS_BIN_OPTIONS, horizontal=True)
+    bin_size = st.number_input("Bin size (m)", min_value=0.5, value=5.0, step=0.5)
+    # Cached per upload fingerprint and binning for the session, so re-running the page is free
+    stats_cache = st.session_state.setdefault("lab_statistics_cache", {})
+    df_stats = compute_lab_statistics(frames, bin_by=bin_by, bin_size=bin_size, cache=stats_cache)
+
+    parameters = st.multiselect("Parameters", df_stats["Parameter"].unique().tolist())
+    if parameters:
+        df_stats = df_stats[df_stats["Parameter"].isin(parameters)]
+    if st.checkbox("Unit-wide rows only (Bin = All)"):
+        df_stats = df_stats[df_stats["Bin"] == "All"]
+    st.caption(f"Characteristic values are mean -/+ {CHARACTERISTIC_STD_FACTOR} x std. "
+               f"Samples without a {bin_by.lower()} only appear in the 'All' rows.")
+    st.dataframe(df_stats, use_container_width=True, hide_index=True)
+    st.download_button("Download statistics (CSV)", df_stats.to_csv(index=False).encode("utf-8"),
+                       file_name="lab_statistics.csv", mime="text/csv")